@@ -97,7 +97,16 @@ DATABASES = {
         'OPTIONS': {
             'options': f"-c search_path={os.environ.get('DB_SCHEMA')},public"
         }
-    }
+    },
+    # e-commerce database, read by `store.services.import_stores.EcommStores`
+    'live_ecomm': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'HOST': os.environ.get('ECOMM_DB_HOST'),
+        'NAME': os.environ.get('ECOMM_DB_NAME'),
+        'USER': os.environ.get('ECOMM_DB_USER'),
+        'PASSWORD': os.environ.get('ECOMM_DB_PASS'),
+        'PORT': os.environ.get('ECOMM_DB_PORT', '5432'),
+    },
 }
 
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
@@ -135,6 +144,16 @@ CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
 CELERY_RESULT_EXPIRES = 3600
 
+CIGAM_API = {
+    'user': os.environ.get('CIGAM_USER'),
+    'password': os.environ.get('CIGAM_PASSWORD'),
+    'pool_size': int(os.environ.get('CIGAM_POOL_SIZE', 10)),
+    # seconds ObterCarga responses stay cached, per GUID or 'default'
+    'cache_ttl': {
+        'default': int(os.environ.get('CIGAM_CACHE_TTL', 900)),
+    },
+}
+
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
@@ -208,5 +227,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # httpx logs every request at INFO
+        'httpx': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
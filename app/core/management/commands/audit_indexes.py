@@ -0,0 +1,276 @@
+"""
+Django command to audit the query plans of the store tables.
+
+The store tables are unmanaged, so their indexes are created by hand. This
+command EXPLAINs the queries the importers and services run, flags
+sequential scans on non-trivial tables and checks that every ON CONFLICT
+target has the unique index PostgreSQL requires, printing the CREATE INDEX
+statements that would fix what it finds.
+"""
+import json
+from datetime import timedelta
+from typing import (
+    Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set,
+)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from store import models
+from store.services import export, geo, search
+
+
+class AuditQuery(NamedTuple):
+    label: str
+    queryset: Callable
+    # columns an index for this query should cover, in order
+    columns: Sequence[str]
+    # whether the query only reads rows with deleted_at IS NULL
+    partial: bool = False
+    # table whose scans are checked, default the queryset's model table
+    table: Optional[str] = None
+
+
+class ConflictTarget(NamedTuple):
+    model: type
+    columns: Sequence[str]
+    used_by: str
+
+
+SAMPLE_CNPJS = ['11222333000181', '11444777000161']
+
+
+def _sample_since():
+    return timezone.now() - timedelta(days=1)
+
+
+QUERIES: List[AuditQuery] = [
+    AuditQuery(
+        'store lookup by cnpj',
+        lambda: models.Stores.all_objects.filter(cnpj__in=SAMPLE_CNPJS),
+        ['cnpj'],
+    ),
+    AuditQuery(
+        'store lookup by cigam id',
+        lambda: models.Stores.all_objects.filter(cigam_id__in=['1', '2']),
+        ['cigam_id'],
+    ),
+    AuditQuery(
+        'active stores by franchise',
+        lambda: models.Stores.objects.filter(franchise_id=1).order_by('id'),
+        ['franchise_id', 'id'],
+        partial=True,
+    ),
+    AuditQuery(
+        'store social by cnpj',
+        lambda: models.StoreSocial.all_objects.filter(
+            store_cnpj__in=SAMPLE_CNPJS
+        ),
+        ['store_cnpj'],
+    ),
+    AuditQuery(
+        'store addresses by store (ingest replace)',
+        lambda: models.StoreAdresses.objects.filter(store_id__in=[1, 2]),
+        ['store_id'],
+        partial=True,
+    ),
+    AuditQuery(
+        'store list by status',
+        lambda: models.Stores.objects.filter(status=True).order_by('id'),
+        ['status', 'id'],
+        partial=True,
+    ),
+    AuditQuery(
+        'store list by cnpj',
+        lambda: models.Stores.objects.filter(
+            cnpj=SAMPLE_CNPJS[0]
+        ).order_by('id'),
+        ['cnpj'],
+        partial=True,
+    ),
+    AuditQuery(
+        'store list by updated_since',
+        lambda: models.Stores.objects.filter(
+            updated_at__gte=_sample_since()
+        ).order_by('id'),
+        ['updated_at'],
+        partial=True,
+    ),
+    AuditQuery(
+        'store export: social join',
+        lambda: export.export_queryset(),
+        ['store_id'],
+        partial=True,
+        table=models.StoreSocial._meta.db_table,
+    ),
+    AuditQuery(
+        'store export: address join',
+        lambda: export.export_queryset(),
+        ['store_id'],
+        partial=True,
+        table=models.StoreAdresses._meta.db_table,
+    ),
+    AuditQuery(
+        'geo index: changed address rows',
+        lambda: geo.rows_queryset(since=_sample_since()),
+        ['updated_at'],
+    ),
+    AuditQuery(
+        'geo index: changed stores',
+        lambda: geo.rows_queryset(since=_sample_since()),
+        ['updated_at'],
+        table=models.Stores._meta.db_table,
+    ),
+    AuditQuery(
+        'search index build',
+        search.index_queryset,
+        ['id'],
+        partial=True,
+    ),
+]
+
+CONFLICT_TARGETS: List[ConflictTarget] = [
+    ConflictTarget(models.Stores, ['cigam_id'], 'CigamStores upsert'),
+    ConflictTarget(models.Stores, ['cnpj'], 'EcommStores upsert'),
+    ConflictTarget(models.StoreSocial, ['store_cnpj'], 'store social upsert'),
+]
+
+
+def seq_scans(plan: Dict) -> Iterator[Dict]:
+    """Yield every Seq Scan node of an EXPLAIN (FORMAT JSON) plan."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+def has_unique_index(constraints: Dict, columns: Sequence[str]) -> bool:
+    """Whether introspected `constraints` hold a full unique index on
+    exactly `columns`, usable as an ON CONFLICT target.
+
+    Partial indexes, flagged with a true 'partial' key, only back an
+    ON CONFLICT that repeats their predicate, which the upserts do not.
+    """
+    for constraint in constraints.values():
+        if (constraint['unique'] or constraint['primary_key']) and \
+                not constraint.get('partial') and \
+                list(constraint['columns']) == list(columns):
+            return True
+    return False
+
+
+def index_statement(table: str, columns: Sequence[str], unique: bool = False,
+                    partial: bool = False) -> str:
+    """CREATE INDEX statement for `columns` of `table`."""
+    name = f"{table}_{'_'.join(columns)}_{'uniq' if unique else 'idx'}"
+    if partial:
+        name += '_live'
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY "
+        f"IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+    if partial:
+        statement += ' WHERE deleted_at IS NULL'
+    return statement + ';'
+
+
+class Command(BaseCommand):
+    '''Audit store query plans and suggest indexes'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to audit'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Ignore sequential scans on tables estimated smaller'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        suggestions = []
+
+        with connection.cursor() as cursor:
+            for query in QUERIES:
+                suggestion = self.audit_query(
+                    cursor, query, options['database'], options['min_rows']
+                )
+                if suggestion:
+                    suggestions.append(suggestion)
+
+            for target in CONFLICT_TARGETS:
+                table = target.model._meta.db_table
+                constraints = connection.introspection.get_constraints(
+                    cursor, table
+                )
+                # introspection does not report index predicates
+                for name in self.partial_indexes(cursor, table):
+                    if name in constraints:
+                        constraints[name]['partial'] = True
+                if has_unique_index(constraints, target.columns):
+                    continue
+                self.stdout.write(self.style.WARNING(
+                    f"{table} ({', '.join(target.columns)}): no unique "
+                    f"index for the ON CONFLICT target of {target.used_by}"
+                ))
+                suggestions.append(
+                    index_statement(table, target.columns, unique=True)
+                )
+
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found'))
+            return
+
+        self.stdout.write('\nSuggested indexes:')
+        for statement in dict.fromkeys(suggestions):
+            self.stdout.write(statement)
+
+    def partial_indexes(self, cursor, table: str) -> Set[str]:
+        cursor.execute(
+            "SELECT c.relname FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = %s::regclass AND i.indpred IS NOT NULL",
+            [table]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def table_rows(self, cursor, table: str) -> float:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE relname = %s", [table]
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def audit_query(self, cursor, query: AuditQuery, using: str,
+                    min_rows: int):
+        """EXPLAIN one query; return a CREATE INDEX suggestion or None."""
+        queryset = query.queryset().using(using)
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]['Plan']
+
+        table = query.table or queryset.model._meta.db_table
+        scans = [
+            node for node in seq_scans(plan)
+            if node.get('Relation Name') == table
+        ]
+        rows = self.table_rows(cursor, table)
+        if not scans or rows < min_rows:
+            self.stdout.write(
+                f"ok    {query.label} (cost {plan['Total Cost']})"
+            )
+            return None
+
+        self.stdout.write(self.style.WARNING(
+            f"SCAN  {query.label}: sequential scan on {table} "
+            f"(~{int(rows)} rows, cost {plan['Total Cost']})"
+        ))
+        return index_statement(table, query.columns, partial=query.partial)
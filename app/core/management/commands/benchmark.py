@@ -0,0 +1,200 @@
+"""
+Django command to benchmark hot code paths with synthetic data.
+"""
+import datetime
+import random
+import re
+import string
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import documents
+from store import models
+from store.serializers import StoreSerializer, store_rows
+from store.services.search import SearchEntry, StoreSearchIndex
+
+
+def _random_document(rng, length):
+    """Return a random CPF/CNPJ with valid check digits."""
+    if length == 11:
+        base = ''.join(rng.choices('0123456789', k=9))
+        for _ in range(2):
+            total = sum(
+                int(digit) * weight
+                for digit, weight in zip(base, range(len(base) + 1, 1, -1))
+            )
+            base += str(total * 10 % 11 % 10)
+        return base
+    base = ''.join(rng.choices('0123456789', k=12))
+    return base + documents.cnpj.calc_check_digits(base)
+
+
+def _document_inputs(size, seed=42):
+    """Mixed import-like input: formatted, duplicated and broken values."""
+    rng = random.Random(seed)
+    pool = [_random_document(rng, rng.choice((11, 14))) for _ in range(
+        max(1, size // 10)
+    )]
+    values = []
+    for _ in range(size):
+        value = rng.choice(pool)
+        roll = rng.random()
+        if roll < 0.3:
+            value = documents.cnpj.format(value) if len(value) == 14 \
+                else documents.cpf.format(value)
+        elif roll < 0.35:
+            value = value[:-1] + str((int(value[-1]) + 1) % 10)
+        elif roll < 0.4:
+            value = value[:rng.randint(0, 10)]
+        values.append(value)
+    return values
+
+
+def _store_rows(size, seed=42):
+    """Stores as `store_rows.lookups` tuples, like values_list() returns."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = []
+    for i in range(1, size + 1):
+        changed = now - datetime.timedelta(seconds=rng.randrange(10 ** 7))
+        values = {
+            'id': i,
+            'cnpj': f"{rng.randrange(10 ** 14):014d}",
+            'cigam_id': str(i),
+            'name': f"Loja {i}",
+            'name_legal': f"Loja {i} LTDA",
+            'franchise_id': rng.randint(1, 10),
+            'status': rng.random() < 0.9,
+            'inaugurated_at': changed.date(),
+            'created_at': changed,
+            'updated_at': changed,
+        }
+        rows.append(tuple(values[lookup] for lookup in store_rows.lookups))
+    return rows
+
+
+def _search_entries(size, seed=42):
+    """Stores with three-word names drawn from a synthetic vocabulary."""
+    rng = random.Random(seed)
+    words = [
+        ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(max(10, size // 15))
+    ]
+    entries = [
+        SearchEntry(
+            i, f"{rng.randrange(10 ** 14):014d}",
+            ' '.join(rng.choices(words, k=3)), True, None
+        )
+        for i in range(size)
+    ]
+    return entries, words
+
+
+class Command(BaseCommand):
+    '''Benchmark hot code paths'''
+
+    targets = ('documents', 'serializers', 'search')
+    default_sizes = {
+        'documents': 1_000_000, 'serializers': 10_000, 'search': 50_000,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            required=True,
+            choices=self.targets,
+            help='Code path to benchmark'
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            help='Number of synthetic inputs (1M documents, 10k stores '
+                 'to serialize, 50k stores to search)'
+        )
+
+    def timed(self, label, func, size):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<32} {elapsed:8.3f}s {size / elapsed:>12,.0f}/s"
+        )
+        return result
+
+    def handle(self, *args, **options):
+        target = options['target']
+        size = options['size'] or self.default_sizes[target]
+        if size < 1:
+            raise CommandError('--size must be positive')
+        getattr(self, f'bench_{target}')(size)
+
+    def bench_documents(self, size):
+        values = self.timed(
+            'generate inputs', lambda: _document_inputs(size), size
+        )
+
+        def baseline():
+            cleaned = []
+            for value in values:
+                digits = re.sub(r'[^0-9]', '', str(value))
+                if len(digits) in (11, 14):
+                    cleaned.append(digits)
+            return cleaned
+
+        self.timed('re.sub + length (no checks)', baseline, size)
+        documents.clear_cache()
+        self.timed(
+            'normalize_documents (cold)',
+            lambda: documents.normalize_documents(values), size
+        )
+        batch = self.timed(
+            'normalize_documents (warm)',
+            lambda: documents.normalize_documents(values), size
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(batch.valid)} unique valid, {len(batch.rejected)} rejected"
+        ))
+
+    def bench_serializers(self, size):
+        rows = self.timed('generate rows', lambda: _store_rows(size), size)
+        instances = [
+            models.Stores(**dict(zip(store_rows.lookups, row)))
+            for row in rows
+        ]
+
+        slow = self.timed(
+            'StoreSerializer (instances)',
+            lambda: StoreSerializer(instances, many=True).data, size
+        )
+        store_rows.many(rows[:1])
+        fast = self.timed(
+            'store_rows (values_list rows)',
+            lambda: store_rows.many(rows), size
+        )
+        if [dict(item) for item in slow] != fast:
+            raise CommandError('store_rows output differs from the serializer')
+        self.stdout.write(self.style.SUCCESS('Outputs match'))
+
+    def bench_search(self, size):
+        entries, words = self.timed(
+            'generate stores', lambda: _search_entries(size), size
+        )
+        index = self.timed(
+            'build index', lambda: StoreSearchIndex(entries), size
+        )
+        typo = words[1][:2] + words[1][3:] if len(words[1]) > 3 \
+            else words[1]
+        queries = [
+            ('name prefix', words[0][:3]),
+            ('cnpj fragment', '123.45'),
+            ('two words with a typo', f"{words[2]}x {words[3]}"),
+            ('one-word typo', typo),
+        ]
+        for label, query in queries:
+            runs = 20
+            started = time.perf_counter()
+            for _ in range(runs):
+                index.search(query)
+            elapsed = (time.perf_counter() - started) / runs
+            self.stdout.write(f"{label:<32} {elapsed * 1000:8.2f}ms/query")
@@ -12,13 +12,25 @@ class Command(BaseCommand):
             required=True,
             help='Specify what to import (any string is allowed)'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only write stores whose content changed since the last run'
+        )
 
     def handle(self, *args, **options):
         import_type = options['type']
         
         if import_type == 'stores':
-            result = CigamStores().run_cigam_stores()
-            self.stdout.write(self.style.SUCCESS("Cigam Stores imported successfully"))
+            result = CigamStores().run_cigam_stores(
+                incremental=options['incremental']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                "Cigam Stores imported successfully "
+                "({inserted} inserted, {updated} updated, "
+                "{unchanged} unchanged, {rejected} rejected, "
+                "{deactivated} deactivated)".format(**result)
+            ))
         elif import_type == 'employees':
             result = CigamEmployee().run_cigam_employees()
             print(result)
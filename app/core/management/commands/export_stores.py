@@ -0,0 +1,63 @@
+"""
+Django command to export stores with their social and address data.
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from store.services import export
+
+
+class Command(BaseCommand):
+    '''Stream stores to a CSV or NDJSON file'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=list(export.FORMATS),
+            default='csv',
+            help='Output format'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip the output'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write; standard output when omitted'
+        )
+        parser.add_argument(
+            '--include-deleted',
+            action='store_true',
+            help='Also export soft-deleted stores'
+        )
+        parser.add_argument(
+            '--fetch-size',
+            type=int,
+            default=export.FETCH_SIZE,
+            help='Rows fetched per round trip from the database'
+        )
+
+    def handle(self, *args, **options):
+        rows = export.export_rows(
+            options['include_deleted'], options['fetch_size']
+        )
+        chunks = export.export_stores(
+            options['format'], options['gzip'], rows=rows
+        )
+
+        if not options['output']:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as out:
+            for chunk in chunks:
+                written += out.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported stores to {options['output']} ({written} bytes)"
+        ))
@@ -0,0 +1,57 @@
+"""
+Django command to bulk load store social or address rows from a file.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from store.services import ingest
+
+
+class Command(BaseCommand):
+    '''Upsert StoreSocial or StoreAdresses rows from CSV or NDJSON'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to load')
+        parser.add_argument(
+            '--target',
+            required=True,
+            choices=list(ingest.TARGETS),
+            help='Table to load'
+        )
+        parser.add_argument(
+            '--format',
+            choices=ingest.FORMATS,
+            help='File format, guessed from the extension when omitted'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ingest.CHUNK_SIZE,
+            help='Rows validated and loaded together'
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ingest.guess_format(
+            options['path']
+        )
+        if file_format is None:
+            raise CommandError('Could not guess the format, use --format')
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = ingest.ingest_store_data(
+                    options['target'], file, file_format,
+                    options['chunk_size']
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(
+                f"line {error['line']}: "
+                f"{error['field'] + ': ' if error['field'] else ''}"
+                f"{error['error']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Store {target} loaded ({received} received, {written} written, "
+            "{error_count} errors)".format(target=options['target'], **result)
+        ))
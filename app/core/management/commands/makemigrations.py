@@ -40,7 +40,9 @@ class Command(MakeMigrationsCommand):
 				for operation in migration.operations:
 						new_operations.append(operation)
 						
-						if isinstance(operation, CreateModel):
+						# unmanaged tables are not created here, nor their triggers
+						if isinstance(operation, CreateModel) and \
+								operation.options.get('managed', True):
 								from django.db import models
 								
 								model_options = operation.options
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:26
+
+import core.management.commands.makemigrations
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudienceSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audience_id', models.CharField(max_length=64, unique=True)),
+                ('members', models.BinaryField(help_text='zlib-compressed, newline-separated documents')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_default=django.db.models.functions.datetime.Now())),
+                ('updated_at', models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'db_table': 'audience_sync_state',
+            },
+        ),
+        core.management.commands.makemigrations.CreateUpdatedAtTrigger(
+            table_name='audience_sync_state',
+        ),
+    ]
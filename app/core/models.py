@@ -46,3 +46,20 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+
+
+class AudienceSyncState(models.Model):
+    """Members of a live! pro audience as of its last sync."""
+
+    class Meta:
+        db_table = 'audience_sync_state'
+
+    audience_id = models.CharField(max_length=64, unique=True)
+    members = models.BinaryField(
+        help_text='zlib-compressed, newline-separated documents'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_default=Now())
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    def __str__(self):
+        return f"{self.audience_id}"
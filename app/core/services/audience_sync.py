@@ -0,0 +1,140 @@
+"""
+Delta synchronization of live! pro audiences.
+
+Instead of re-sending the full membership, the desired set of documents is
+compared with the last synced state (or, on the first run, the remote
+audience) and only additions and removals are sent, in batches:
+
+    GET    /audiences/{id}/members                     current membership
+    POST   /audiences/{id}/members {"documents": [...]}  add members
+    DELETE /audiences/{id}/members {"documents": [...]}  remove members
+
+The synced membership is stored in `AudienceSyncState` and kept in the cache
+as a read-through copy, so an evicted cache entry never forces a full re-read
+of the remote audience.
+"""
+import zlib
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.core.cache import cache
+
+from core.models import AudienceSyncState
+from core.services.live_pro_client import LiveProClient, normalize_documents
+
+# Documents sent per add/remove request.
+SYNC_BATCH_SIZE = 500
+
+
+def _extract_documents(payload: Any) -> Set[str]:
+    """Read documents out of the audience members response."""
+    if isinstance(payload, dict):
+        for key in ("data", "documents", "members"):
+            if key in payload:
+                return _extract_documents(payload[key])
+        return set()
+
+    documents = []
+    for item in payload or []:
+        if isinstance(item, dict):
+            item = item.get("document")
+        documents.append(item)
+    return set(normalize_documents(documents)[0])
+
+
+class AudienceSync:
+    """Keep one live! pro audience equal to a locally computed membership."""
+
+    def __init__(self, audience_id, client: Optional[LiveProClient] = None,
+                 batch_size: int = SYNC_BATCH_SIZE):
+        self.audience_id = audience_id
+        self.client = client or LiveProClient()
+        self.batch_size = batch_size
+        self.route = f"/{audience_id}/members"
+        self.state_key = f"live_pro_audience:{audience_id}:members"
+
+    def last_synced(self) -> Optional[Set[str]]:
+        """Membership stored by the previous run, or None if unknown."""
+        compressed = cache.get(self.state_key)
+        if compressed is None:
+            compressed = self._load_state()
+            if compressed is None:
+                return None
+            cache.set(self.state_key, compressed, timeout=None)
+        raw = zlib.decompress(compressed).decode()
+        return set(raw.split("\n")) if raw else set()
+
+    def _load_state(self) -> Optional[bytes]:
+        members = AudienceSyncState.objects.filter(
+            audience_id=str(self.audience_id)
+        ).values_list('members', flat=True).first()
+        return None if members is None else bytes(members)
+
+    def _store_state(self, compressed: bytes) -> None:
+        AudienceSyncState.objects.update_or_create(
+            audience_id=str(self.audience_id),
+            defaults={'members': compressed},
+        )
+
+    def _save(self, members: Set[str]) -> None:
+        raw = "\n".join(sorted(members)).encode()
+        compressed = zlib.compress(raw)
+        self._store_state(compressed)
+        cache.set(self.state_key, compressed, timeout=None)
+
+    def fetch_remote(self) -> Set[str]:
+        """Fetch the full membership from the API."""
+        result = self.client.pro_audiences({}, 'get', self.route)
+        if not result.get("success"):
+            raise Exception(f"Failed to fetch audience {self.audience_id}: "
+                            f"{result.get('error')}")
+        return _extract_documents(result["data"])
+
+    def _send(self, method: str, documents: Iterable[str], errors: list):
+        """Send batches; return the documents the API accepted."""
+        documents = sorted(documents)
+        applied = set()
+        for i in range(0, len(documents), self.batch_size):
+            batch = documents[i:i + self.batch_size]
+            result = self.client.pro_audiences(
+                {"documents": batch}, method, self.route
+            )
+            if result.get("success"):
+                applied.update(batch)
+            else:
+                errors.append({
+                    "method": method,
+                    "documents": len(batch),
+                    "status_code": result.get("status_code"),
+                    "error": result.get("error"),
+                })
+        return applied
+
+    def sync(self, desired: Iterable[str], full: bool = False) -> Dict:
+        """Send only the difference between `desired` and the audience.
+
+        Args:
+            desired: CPF/CNPJs that should be members, formatted or not
+            full: Re-read the remote audience instead of the stored state
+
+        Returns:
+            dict: {"added", "removed", "unchanged", "errors"}
+        """
+        desired = set(normalize_documents(desired)[0])
+        current = None if full else self.last_synced()
+        if current is None:
+            current = self.fetch_remote()
+
+        errors = []
+        added = self._send('post', desired - current, errors)
+        removed = self._send('delete', current - desired, errors)
+
+        # persist what the remote side actually holds, failed batches
+        # included, so they are retried on the next run
+        self._save((current | added) - removed)
+
+        return {
+            "added": len(added),
+            "removed": len(removed),
+            "unchanged": len(desired & current),
+            "errors": errors,
+        }
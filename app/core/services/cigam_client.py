@@ -1,15 +1,56 @@
 """
 Django-native Cigam authentication module using Django's cache framework
 and requests library for HTTP operations.
+
+Every public call has an `a`-prefixed coroutine counterpart (e.g. `aget_data`)
+that runs on the event loop through httpx, for ASGI views and async tasks.
 """
 import base64
+import hashlib
 import json
+import logging
+import threading
+import zlib
+import asyncio
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    Dict, Any, Hashable, Iterable, Iterator, Optional, Tuple, Union
+)
 from django.core.cache import cache
 from django.conf import settings
 from django.core import signing
+from redis.exceptions import LockError
+
+from core.services.http_pool import (
+    DEFAULT_POOL_SIZE, get_async_client, get_session, pool_stats
+)
+from core.services.json_stream import iter_json_array
+from core.services.locks import cache_lock
+from core.services.resilience import CircuitOpenError, Resilience
+
+logger = logging.getLogger(__name__)
+
+# Tokens closer than this to `expiraEm` are never handed out.
+TOKEN_MIN_VALIDITY = timedelta(minutes=1)
+# Tokens closer than this to `expiraEm` are renewed in the background.
+TOKEN_REFRESH_AHEAD = timedelta(minutes=5)
+# Seconds the refresh lock is held at most / waited for at most.
+TOKEN_LOCK_TIMEOUT = 60
+TOKEN_LOCK_WAIT = 10
+
+# In-process (L1) copy of the decrypted token: {cache_key: (token, expires_at)}
+_local_tokens: Dict[str, Tuple[str, datetime]] = {}
+# Held while a refresh-ahead thread runs; acquired without blocking, so the
+# check and the claim are one atomic step.
+_refreshing = threading.Lock()
+
+# Default lifetime of cached ObterCarga responses, see CIGAM_API['cache_ttl'].
+RESPONSE_CACHE_TTL = 15 * 60
 
 
 class CigamClient:
@@ -19,10 +60,15 @@ class CigamClient:
         self.auth_endpoint = "/autenticacao/autenticar"
         self.data_endpoint = "/api/Consulta/ObterCarga"
         self.auth_cache_key = "cigam_auth_token"
+        self.response_cache_prefix = "cigam_response"
         
         cigam_config = settings.CIGAM_API
         self.cigam_user = cigam_config['user']
         self.cigam_password = cigam_config['password']
+        self.pool_size = cigam_config.get('pool_size', DEFAULT_POOL_SIZE)
+        self.cache_ttl = cigam_config.get('cache_ttl') or {}
+        self.session = get_session("cigam", pool_size=self.pool_size)
+        self.resilience = Resilience("cigam")
 
     def _get_headers(self) -> Dict[str, str]:
         """Get base headers for API requests."""
@@ -58,32 +104,21 @@ class CigamClient:
         url = f"{self.base_url}{self.auth_endpoint}"
 
         try:
-            response = requests.post(
+            response = self.resilience.call("autenticar", lambda timeout: self.session.post(
                 url,
                 json=payload,
                 headers=headers,
-                timeout=30
-            )
+                timeout=timeout
+            ))
             response.raise_for_status()
             
             response_data = response.json()
             token = response_data["dados"]["token"]
             expiration = response_data["dados"]["expiraEm"]
-            
+
             expires_at = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
-            current_time = datetime.now(timezone.utc)
-            
-            cache_timeout = max(300, int((expires_at - current_time).total_seconds()) - 300)
-            
-            encrypted_token = self._encrypt_token(token)
-            auth_data = {
-                "token": encrypted_token,
-                "expires_at": expires_at.isoformat(),
-                "name": "Cigam Auth"
-            }
-            
-            cache.set(self.auth_cache_key, auth_data, timeout=cache_timeout)
-            
+            self._store_token(token, expires_at)
+
             return {
                 "status": "success",
                 "message": "Token stored in cache",
@@ -95,6 +130,11 @@ class CigamClient:
                 "error": "HTTP request failed", 
                 "details": str(e)
             }
+        except CircuitOpenError as e:
+            return {
+                "error": "Service unavailable",
+                "details": str(e)
+            }
         except (KeyError, json.JSONDecodeError) as e:
             return {
                 "error": "Invalid response format", 
@@ -106,54 +146,292 @@ class CigamClient:
                 "details": str(e)
             }
 
-    def _get_token(self) -> str:
-        """Get the current Cigam authentication token, refreshing if necessary."""
+    def _store_token(self, token: str, expires_at: datetime) -> None:
+        """Store a fresh token in Redis (L2) and in this process (L1)."""
+        current_time = datetime.now(timezone.utc)
+        cache_timeout = max(60, int((expires_at - current_time).total_seconds()))
+
+        auth_data = {
+            "token": self._encrypt_token(token),
+            "expires_at": expires_at.isoformat(),
+            "name": "Cigam Auth"
+        }
+
+        cache.set(self.auth_cache_key, auth_data, timeout=cache_timeout)
+        _local_tokens[self.auth_cache_key] = (token, expires_at)
+
+    def _load_token(self) -> Optional[Tuple[str, datetime]]:
+        """Return (token, expires_at) from L1, falling back to Redis."""
+        current_time = datetime.now(timezone.utc)
+        entry = _local_tokens.get(self.auth_cache_key)
+        if entry and entry[1] > current_time + TOKEN_MIN_VALIDITY:
+            return entry
+
         auth_data = cache.get(self.auth_cache_key)
-        
-        if auth_data:
+        if not auth_data:
+            return None
+
+        try:
+            entry = (
+                self._decrypt_token(auth_data["token"]),
+                datetime.fromisoformat(auth_data["expires_at"])
+            )
+        except Exception:
+            return None
+
+        _local_tokens[self.auth_cache_key] = entry
+        return entry
+
+    def _refresh_token(
+        self,
+        blocking: bool = True,
+        min_validity: timedelta = TOKEN_MIN_VALIDITY
+    ) -> Optional[str]:
+        """Re-authenticate under a Redis lock so only one worker hits /autenticar.
+
+        Args:
+            blocking: Wait up to TOKEN_LOCK_WAIT seconds for another refresh
+            min_validity: Validity a cached token needs to be reused as is
+
+        Returns:
+            Optional[str]: The token, or None if the lock could not be taken
+        """
+        lock = cache_lock(
+            f"{self.auth_cache_key}:lock",
+            timeout=TOKEN_LOCK_TIMEOUT,
+            blocking_timeout=TOKEN_LOCK_WAIT
+        )
+        if not lock.acquire(blocking=blocking):
+            return None
+
+        try:
+            # another worker may have refreshed while we waited for the lock
+            _local_tokens.pop(self.auth_cache_key, None)
+            entry = self._load_token()
+            if entry and entry[1] > datetime.now(timezone.utc) + min_validity:
+                return entry[0]
+
+            auth_result = self._authenticate()
+            if "error" in auth_result:
+                raise Exception(f"Failed to authenticate with CIGAM: {auth_result['error']}")
+
+            return _local_tokens[self.auth_cache_key][0]
+        finally:
             try:
-                expires_at = datetime.fromisoformat(auth_data["expires_at"])
-                current_time = datetime.now(timezone.utc)
-                
-                if expires_at > current_time + timedelta(minutes=1):
-                    return self._decrypt_token(auth_data["token"])
-                    
-            except Exception as e:
+                lock.release()
+            except LockError:
                 pass
-        
-        auth_result = self._authenticate()
-        
-        if "error" in auth_result:
-            raise Exception(f"Failed to authenticate with CIGAM: {auth_result['error']}")
-        
-        auth_data = cache.get(self.auth_cache_key)
-        if not auth_data:
-            raise Exception("Failed to retrieve token after authentication")
-        
-        return self._decrypt_token(auth_data["token"])
 
-    def get_data(self, guid: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    def refresh_token(self) -> None:
+        """Renew the token if it is within TOKEN_REFRESH_AHEAD of expiring.
+
+        Safe to call from every worker: the refresh is single-flight and the
+        callers that lose the lock return immediately.
+        """
+        entry = self._load_token()
+        current_time = datetime.now(timezone.utc)
+        if entry and entry[1] > current_time + TOKEN_REFRESH_AHEAD:
+            return
+
+        self._refresh_token(blocking=False, min_validity=TOKEN_REFRESH_AHEAD)
+
+    def _refresh_in_background(self) -> None:
+        """Start at most one refresh-ahead thread per process."""
+        if not _refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh_token()
+            except Exception as e:
+                logger.warning("Background CIGAM token refresh failed: %s", e)
+            finally:
+                _refreshing.release()
+
+        try:
+            threading.Thread(target=run, daemon=True).start()
+        except Exception:
+            _refreshing.release()
+            raise
+
+    def _get_token(self) -> str:
+        """Get the current Cigam authentication token, refreshing if necessary."""
+        entry = self._load_token()
+        current_time = datetime.now(timezone.utc)
+
+        if entry and entry[1] > current_time + TOKEN_MIN_VALIDITY:
+            if entry[1] <= current_time + TOKEN_REFRESH_AHEAD:
+                self._refresh_in_background()
+            return entry[0]
+
+        token = self._refresh_token()
+        if token:
+            return token
+
+        # the refresh lock is still held elsewhere; reuse whatever is cached
+        entry = self._load_token()
+        if entry and entry[1] > datetime.now(timezone.utc):
+            return entry[0]
+
+        raise Exception("Failed to retrieve token after authentication")
+
+    def get_data(
+        self, guid: str, body: Dict[str, Any], use_cache: bool = False
+    ) -> Dict[str, Any]:
         """Get data from the Cigam API.
         
         Args:
             guid: The GUID parameter for the API endpoint
             body: The request body/payload
+            use_cache: Serve and store the response in the response cache
             
         Returns:
             Dict[str, Any]: The response data or error information
         """
+        if use_cache:
+            return self.fetch_data(guid, body)["data"]
+        return self._fetch_data(guid, body, self._get_token())
+
+    def fetch_data(
+        self,
+        guid: str,
+        body: Dict[str, Any],
+        use_cache: bool = True,
+        since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get data through the compressed response cache.
+
+        Responses are cached per (guid, body) for CIGAM_API['cache_ttl'][guid]
+        seconds (falling back to the 'default' entry, then
+        RESPONSE_CACHE_TTL). Every successful payload is fingerprinted, so
+        callers can skip their import when nothing changed.
+
+        Args:
+            guid: The GUID parameter for the API endpoint
+            body: The request body/payload
+            use_cache: Read a still valid cached response instead of the API
+            since: Digest the caller last processed; defaults to the digest
+                of the previous fetch of the same request
+
+        Returns:
+            Dict[str, Any]: {"data", "digest", "changed", "cached"}; errors
+            are returned as "data" and never cached
+        """
+        key = self._response_cache_key(guid, body)
+        digest_key = f"{key}:digest"
+
+        if use_cache:
+            compressed = cache.get(key)
+            if compressed is not None:
+                raw = zlib.decompress(compressed)
+                digest = hashlib.sha256(raw).hexdigest()
+                return {
+                    "data": json.loads(raw),
+                    "digest": digest,
+                    "changed": since is not None and since != digest,
+                    "cached": True
+                }
+
+        data = self._fetch_data(guid, body, self._get_token())
+        if isinstance(data, dict) and "error" in data:
+            return {"data": data, "digest": None, "changed": False,
+                    "cached": False}
+
+        raw = json.dumps(
+            data, sort_keys=True, separators=(',', ':'), ensure_ascii=False
+        ).encode()
+        digest = hashlib.sha256(raw).hexdigest()
+        if since is None:
+            since = cache.get(digest_key)
+
+        cache.set(key, zlib.compress(raw), timeout=self._ttl(guid))
+        cache.set(digest_key, digest, timeout=None)
+
+        return {
+            "data": data,
+            "digest": digest,
+            "changed": since != digest,
+            "cached": False
+        }
+
+    def _response_cache_key(self, guid: str, body: Dict[str, Any]) -> str:
+        """Cache key for one (guid, body) request."""
+        request = json.dumps([guid, body], sort_keys=True, default=str)
+        digest = hashlib.sha256(request.encode()).hexdigest()
+        return f"{self.response_cache_prefix}:{guid}:{digest}"
+
+    def _ttl(self, guid: str) -> int:
+        """Response cache lifetime for `guid` in seconds."""
+        return self.cache_ttl.get(
+            guid, self.cache_ttl.get('default', RESPONSE_CACHE_TTL)
+        )
+
+    def get_data_many(
+        self,
+        loads: Union[Mapping[Hashable, Tuple[str, Dict[str, Any]]],
+                     Iterable[Tuple[str, Dict[str, Any]]]],
+        max_workers: int = 4
+    ) -> Dict[Hashable, Any]:
+        """Get several ObterCarga datasets concurrently with one shared token.
+
+        Args:
+            loads: {key: (guid, body)}, or (guid, body) pairs keyed by position
+            max_workers: Maximum number of requests in flight
+
+        Returns:
+            Dict[Hashable, Any]: Data or error information for every key
+        """
+        return dict(self.iter_data_many(loads, max_workers=max_workers))
+
+    def iter_data_many(
+        self,
+        loads: Union[Mapping[Hashable, Tuple[str, Dict[str, Any]]],
+                     Iterable[Tuple[str, Dict[str, Any]]]],
+        max_workers: int = 4
+    ) -> Iterator[Tuple[Hashable, Any]]:
+        """Yield (key, data) for each dataset as soon as it completes.
+
+        A slow or failing dataset never holds up the others: failures are
+        reported as error dicts under their own key, like `get_data` does.
+        """
+        if not isinstance(loads, Mapping):
+            loads = dict(enumerate(loads))
+        if not loads:
+            return
+
+        token = self._get_token()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_data, guid, body, token): key
+                for key, (guid, body) in loads.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {
+                        "error": "Failed to process request",
+                        "details": str(e)
+                    }
+                yield futures[future], result
+
+    def _fetch_data(
+        self, guid: str, body: Dict[str, Any], token: str
+    ) -> Dict[str, Any]:
+        """POST one ObterCarga request with an already resolved token."""
         url = f"{self.base_url}{self.data_endpoint}?guid={guid}"
-        
+
         headers = self._get_headers()
-        headers['Authorization'] = f"Bearer {self._get_token()}"
+        headers['Authorization'] = f"Bearer {token}"
 
         try:
-            response = requests.post(
+            response = self.resilience.call("ObterCarga", lambda timeout: self.session.post(
                 url,
                 json=body,
                 headers=headers,
-                timeout=30
-            )
+                timeout=timeout
+            ))
             response.raise_for_status()
             
             response_data = response.json()
@@ -165,6 +443,11 @@ class CigamClient:
                 "details": str(e),
                 "status_code": getattr(e.response, 'status_code', None)
             }
+        except CircuitOpenError as e:
+            return {
+                "error": "Service unavailable",
+                "details": str(e)
+            }
         except json.JSONDecodeError:
             return {"error": "Invalid JSON response"}
         except Exception as e:
@@ -172,3 +455,139 @@ class CigamClient:
                 "error": "Failed to process request", 
                 "details": str(e)
             }
+
+    async def _aget_token(self) -> str:
+        """Async `_get_token`: served from memory on the event loop.
+
+        Only an actual re-authentication (about once per token lifetime) is
+        delegated to a worker thread, so the single-flight Redis lock and the
+        refresh-ahead behaviour are shared with the blocking client.
+        """
+        entry = _local_tokens.get(self.auth_cache_key)
+        current_time = datetime.now(timezone.utc)
+
+        if entry and entry[1] > current_time + TOKEN_MIN_VALIDITY:
+            if entry[1] <= current_time + TOKEN_REFRESH_AHEAD:
+                self._refresh_in_background()
+            return entry[0]
+
+        return await sync_to_async(self._get_token, thread_sensitive=False)()
+
+    async def aget_data(
+        self, guid: str, body: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Async `get_data`."""
+        return await self._afetch_data(guid, body, await self._aget_token())
+
+    async def aget_data_many(
+        self,
+        loads: Union[Mapping[Hashable, Tuple[str, Dict[str, Any]]],
+                     Iterable[Tuple[str, Dict[str, Any]]]],
+        max_workers: int = 4
+    ) -> Dict[Hashable, Any]:
+        """Async `get_data_many`, bounded by a semaphore instead of threads."""
+        if not isinstance(loads, Mapping):
+            loads = dict(enumerate(loads))
+        if not loads:
+            return {}
+
+        token = await self._aget_token()
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(guid, body):
+            async with semaphore:
+                return await self._afetch_data(guid, body, token)
+
+        results = await asyncio.gather(
+            *(fetch(guid, body) for guid, body in loads.values())
+        )
+        return dict(zip(loads.keys(), results))
+
+    async def _afetch_data(
+        self, guid: str, body: Dict[str, Any], token: str
+    ) -> Dict[str, Any]:
+        """Async `_fetch_data` over the loop's pooled httpx client."""
+        url = f"{self.base_url}{self.data_endpoint}?guid={guid}"
+
+        headers = self._get_headers()
+        headers['Authorization'] = f"Bearer {token}"
+
+        try:
+            client = get_async_client("cigam", pool_size=self.pool_size)
+            response = await self.resilience.acall("ObterCarga", lambda timeout: client.post(
+                url,
+                json=body,
+                headers=headers,
+                timeout=timeout
+            ))
+            response.raise_for_status()
+
+            response_data = response.json()
+            return response_data.get('dados', response_data)
+
+        except httpx.HTTPError as e:
+            status_code = None
+            if isinstance(e, httpx.HTTPStatusError):
+                status_code = e.response.status_code
+            return {
+                "error": "HTTP request failed",
+                "details": str(e),
+                "status_code": status_code
+            }
+        except CircuitOpenError as e:
+            return {
+                "error": "Service unavailable",
+                "details": str(e)
+            }
+        except json.JSONDecodeError:
+            return {"error": "Invalid JSON response"}
+        except Exception as e:
+            return {
+                "error": "Failed to process request",
+                "details": str(e)
+            }
+
+    def iter_data(
+        self,
+        guid: str,
+        body: Dict[str, Any],
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the records of `dados` from the Cigam API one at a time.
+
+        Unlike `get_data`, the response body is never fully loaded, so peak
+        memory does not depend on the size of the load.
+
+        Args:
+            guid: The GUID parameter for the API endpoint
+            body: The request body/payload
+            chunk_size: Bytes read from the socket at a time
+
+        Yields:
+            Dict[str, Any]: One record of the `dados` array
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+            CircuitOpenError: If the Cigam circuit is open
+            ValueError: If the response is not the expected JSON document
+        """
+        url = f"{self.base_url}{self.data_endpoint}?guid={guid}"
+
+        headers = self._get_headers()
+        headers['Authorization'] = f"Bearer {self._get_token()}"
+
+        with self.resilience.call("ObterCarga", lambda timeout: self.session.post(
+            url,
+            json=body,
+            headers=headers,
+            timeout=timeout,
+            stream=True
+        )) as response:
+            response.raise_for_status()
+            yield from iter_json_array(
+                response.iter_content(chunk_size=chunk_size), 'dados'
+            )
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Connections opened versus reused by this process' Cigam session."""
+        return pool_stats("cigam")
@@ -0,0 +1,149 @@
+"""
+Bulk normalization and validation of CPF/CNPJ document numbers.
+
+Values are stripped down to their digits, matched to a document kind by
+length and, optionally, checked against their check digits with
+`python-stdnum`. Results are memoized per raw value, so the repeated values
+of an import (every run sees mostly the same stores) skip the work entirely.
+"""
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from stdnum.br import cnpj, cpf
+from stdnum.exceptions import InvalidChecksum, ValidationError
+
+CPF = 'cpf'
+CNPJ = 'cnpj'
+DOCUMENT_KINDS = (CPF, CNPJ)
+
+# Rejection reasons
+EMPTY = 'empty'
+INVALID_LENGTH = 'invalid_length'
+INVALID_FORMAT = 'invalid_format'
+INVALID_CHECKSUM = 'invalid_checksum'
+
+# Distinct raw values remembered per (kinds, check_digits); the memo is reset
+# when an insert would go past it.
+DOCUMENT_CACHE_SIZE = 2 ** 19
+
+_LENGTHS = {11: CPF, 14: CNPJ}
+_VALIDATORS = {CPF: cpf.validate, CNPJ: cnpj.validate}
+_non_digits = re.compile(r'[^0-9]+').sub
+
+_Result = Tuple[Optional[str], Optional[str]]
+_memos: Dict[Tuple[Tuple[str, ...], bool], Dict[str, _Result]] = {}
+
+
+class DocumentBatch(NamedTuple):
+    """Result of `normalize_documents`."""
+
+    valid: List[str]
+    rejected: List[Tuple[Any, str]]
+
+
+def _check(raw: str, kinds: Tuple[str, ...], check_digits: bool) -> _Result:
+    document = raw if raw.isascii() and raw.isdigit() else _non_digits('', raw)
+    if not document:
+        return None, EMPTY
+
+    kind = _LENGTHS.get(len(document))
+    if kind not in kinds:
+        return None, INVALID_LENGTH
+
+    if check_digits:
+        # a single repeated digit passes the CPF checksum but is never issued
+        if document.count(document[0]) == len(document):
+            return None, INVALID_FORMAT
+        try:
+            _VALIDATORS[kind](document)
+        except InvalidChecksum:
+            return None, INVALID_CHECKSUM
+        except ValidationError:
+            return None, INVALID_FORMAT
+
+    return document, None
+
+
+def _memo(kinds: Tuple[str, ...], check_digits: bool) -> Dict[str, _Result]:
+    memo = _memos.get((kinds, check_digits))
+    if memo is None:
+        memo = _memos[(kinds, check_digits)] = {}
+    return memo
+
+
+def _remember(memo: Dict[str, _Result], raw: str, kinds: Tuple[str, ...],
+              check_digits: bool) -> _Result:
+    """Check a value missing from `memo` and store it, within the cap."""
+    if len(memo) >= DOCUMENT_CACHE_SIZE:
+        memo.clear()
+    result = memo[raw] = _check(raw, kinds, check_digits)
+    return result
+
+
+def clear_cache() -> None:
+    """Forget every memoized result."""
+    _memos.clear()
+
+
+def clean_document(raw: Any, kinds: Iterable[str] = DOCUMENT_KINDS,
+                   check_digits: bool = True
+                   ) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Normalize one CPF/CNPJ.
+
+    Args:
+        raw: Formatted or unformatted document, any type
+        kinds: Accepted document kinds, e.g. `(CNPJ,)`
+        check_digits: Reject values whose check digits do not match
+
+    Returns:
+        tuple: (digits, None) when valid, (None, reason) otherwise
+    """
+    if raw is None:
+        return None, EMPTY
+    kinds = tuple(kinds)
+    raw = str(raw)
+    memo = _memo(kinds, check_digits)
+    result = memo.get(raw)
+    if result is None:
+        result = _remember(memo, raw, kinds, check_digits)
+    return result
+
+
+def normalize_documents(values: Iterable[Any],
+                        kinds: Iterable[str] = DOCUMENT_KINDS,
+                        check_digits: bool = True,
+                        unique: bool = True) -> DocumentBatch:
+    """
+    Normalize a batch of CPF/CNPJs, keeping the input order.
+
+    Args:
+        values: Raw documents
+        kinds: Accepted document kinds
+        check_digits: Reject values whose check digits do not match
+        unique: Drop repeated documents instead of returning them again
+
+    Returns:
+        DocumentBatch: cleaned documents and (raw value, reason) rejections
+    """
+    kinds = tuple(kinds)
+    memo = _memo(kinds, check_digits)
+    lookup = memo.get
+    valid, rejected, seen = [], [], set()
+    for raw in values:
+        if raw is None:
+            rejected.append((raw, EMPTY))
+            continue
+        key = raw if type(raw) is str else str(raw)
+        result = lookup(key)
+        if result is None:
+            result = _remember(memo, key, kinds, check_digits)
+        document, reason = result
+        if reason:
+            rejected.append((raw, reason))
+        elif not unique:
+            valid.append(document)
+        elif document not in seen:
+            seen.add(document)
+            valid.append(document)
+    return DocumentBatch(valid, rejected)
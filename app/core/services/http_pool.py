@@ -0,0 +1,171 @@
+"""
+Per-process pooled HTTP sessions for outbound integrations.
+
+Sessions are keyed by name and by process id, so Celery prefork children never
+share sockets inherited from the parent, while every task executed by the same
+worker process reuses the same keep-alive connections. Async clients are kept
+per event loop instead.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+DEFAULT_POOL_SIZE = 10
+
+_sessions: Dict[Tuple[int, str], requests.Session] = {}
+_stats: Dict[Tuple[int, str], "PoolStats"] = {}
+_lock = threading.Lock()
+# httpx.AsyncClient instances are bound to the event loop that created them.
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class PoolStats:
+    """Counters for connections opened versus requests served by a session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.requests = 0
+
+    def record_open(self):
+        with self._lock:
+            self.opened += 1
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def reused(self) -> int:
+        """Requests that were served over an already open connection."""
+        return max(0, self.requests - self.opened)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "requests": self.requests,
+        }
+
+
+def _counting_pool(base, stats: PoolStats):
+    """Build a urllib3 pool class that reports every new connection."""
+
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.record_open()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools keep track of opened and reused connections."""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, *args, **kwargs):
+        self.stats.record_request()
+        return super().send(request, *args, **kwargs)
+
+
+def get_session(
+    name: str, pool_size: int = DEFAULT_POOL_SIZE
+) -> requests.Session:
+    """Return the keep-alive session registered under `name` for this process.
+
+    Args:
+        name: Logical name of the integration (e.g. "cigam")
+        pool_size: Maximum number of connections kept alive per host
+
+    Returns:
+        requests.Session: A session shared by every caller in this process
+    """
+    key = (os.getpid(), name)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            stats = PoolStats()
+            adapter = CountingHTTPAdapter(
+                stats,
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                pool_block=False,
+            )
+            session = requests.Session()
+            session.headers["Connection"] = "keep-alive"
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+            _stats[key] = stats
+    return session
+
+
+def get_async_client(
+    name: str, pool_size: int = DEFAULT_POOL_SIZE
+) -> httpx.AsyncClient:
+    """Return the keep-alive AsyncClient for `name` on the running loop.
+
+    Args:
+        name: Logical name of the integration (e.g. "cigam")
+        pool_size: Maximum number of connections kept alive
+
+    Returns:
+        httpx.AsyncClient: A client shared by every coroutine on this loop
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            ),
+            headers={"Connection": "keep-alive"},
+        )
+        clients[name] = client
+    return client
+
+
+async def close_async_clients():
+    """Close every AsyncClient owned by the running loop."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def pool_stats(name: str) -> Dict[str, int]:
+    """Return connection counters for the session `name` in this process."""
+    stats = _stats.get((os.getpid(), name))
+    return stats.as_dict() if stats else PoolStats().as_dict()
+
+
+def close_sessions():
+    """Close and forget every session owned by this process."""
+    pid = os.getpid()
+    with _lock:
+        for key in [k for k in _sessions if k[0] == pid]:
+            _sessions.pop(key).close()
+            _stats.pop(key, None)
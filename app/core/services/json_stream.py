@@ -0,0 +1,143 @@
+"""
+Incremental JSON parsing for large API responses.
+
+Only the array stored under one top-level key is streamed; every element is
+decoded on its own with `json.JSONDecoder.raw_decode`, so at most one element
+plus one network chunk is held in memory at a time.
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = ' \t\r\n'
+# Characters that may continue a number cut at a chunk boundary ('' is the
+# end of the buffer).
+_NUMBER_CONTINUATIONS = ('', '.', 'e', 'E', '+', '-') + tuple('0123456789')
+
+
+class _ChunkBuffer:
+    """Text buffer refilled on demand from an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping what was already consumed."""
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            new = self.decoder.decode(b'', final=True)
+        else:
+            new = self.decoder.decode(chunk)
+        self.text = self.text[self.pos:] + new
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character ('' at end of input)."""
+        while True:
+            while self.pos < len(self.text) and \
+                    self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                f"Expected {char!r} in JSON stream, found {found!r}"
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the buffer may continue in the next
+            # chunk, even when its prefix ("12.", "1e") is cut short
+            if not self.eof and isinstance(value, (int, float)) and \
+                    not isinstance(value, bool) and \
+                    self.text[end:end + 1] in _NUMBER_CONTINUATIONS:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """Yield the elements of `document[key]` from a chunked JSON document.
+
+    A top-level array is streamed as is. Keys other than `key` are decoded and
+    discarded, and reading stops as soon as the array is closed.
+
+    Args:
+        chunks: Raw response bytes, e.g. `response.iter_content(...)`
+        key: Top-level key holding the array
+
+    Raises:
+        ValueError: If the document is malformed or truncated, or `key` is
+            missing, null or not an array
+    """
+    buffer = _ChunkBuffer(chunks)
+
+    if buffer.peek() == '[':
+        yield from _iter_array(buffer)
+        return
+
+    buffer.expect('{')
+    while True:
+        char = buffer.peek()
+        if char == '':
+            raise ValueError("Unterminated JSON object")
+        if char == '}':
+            raise ValueError(f"'{key}' not found in JSON document")
+        if char == ',':
+            buffer.pos += 1
+            continue
+
+        name = buffer.value()
+        buffer.expect(':')
+
+        if name != key:
+            buffer.value()
+            continue
+
+        if buffer.peek() != '[':
+            value = buffer.value()
+            if value is None:
+                raise ValueError(f"'{key}' is null")
+            raise ValueError(f"'{key}' is not an array")
+
+        yield from _iter_array(buffer)
+        return
+
+
+def _iter_array(buffer: _ChunkBuffer) -> Iterator[Any]:
+    buffer.expect('[')
+    while True:
+        char = buffer.peek()
+        if char == ']':
+            buffer.pos += 1
+            return
+        if char == '':
+            raise ValueError("Unterminated JSON array")
+        if char == ',':
+            buffer.pos += 1
+            continue
+        yield buffer.value()
@@ -1,117 +1,450 @@
 '''
 Service for handling live-pro requests
+
+`LiveProClient` keeps the Sanctum bearer token in Django's cache and talks to
+the API over a pooled keep-alive session; it only logs in again when the
+token expires or is rejected with a 401. The `a`-prefixed coroutines mirror
+the blocking calls for use on an event loop (ASGI views, async tasks).
+
+The module-level functions are kept for existing callers.
 '''
+import httpx
 import requests
 import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.cache import cache
+from redis.exceptions import LockError
+
+from core.services import documents as documents_service
+from core.services.http_pool import get_async_client, get_session
+from core.services.locks import cache_lock
+from core.services.resilience import CircuitOpenError, Resilience
 
 BASE_URL = os.environ.get('PRO_URL')
+# Seconds a Sanctum token is reused before logging in again.
+TOKEN_TTL = int(os.environ.get('PRO_TOKEN_TTL', 12 * 60 * 60))
+# Seconds the login lock is held at most / waited for at most.
+TOKEN_LOCK_TIMEOUT = 30
+TOKEN_LOCK_WAIT = 10
+# Documents sent per /pro-users/create request by `provision_pro_users`.
+PROVISION_CHUNK_SIZE = 500
 
+resilience = Resilience("live_pro")
 
-def get_credential():
+
+def _response_result(response):
+    """Translate a LivePro response into the success/error dict."""
+    if response.status_code in (200, 201):
+        return {
+            "success": True,
+            "data": response.json()
+        }
+    return {
+        "success": False,
+        "status_code": response.status_code,
+        "error": response.json() if response.content else response.text
+    }
+
+
+def normalize_documents(documents):
     """
-    Logs in a user via Sanctum and accesses a protected endpoint.
+    Strip CPF/CNPJ formatting and drop duplicates, keeping the input order.
+    Check digits are left for the API to validate.
+
+    Returns:
+        tuple: (valid documents, invalid raw values)
     """
+    batch = documents_service.normalize_documents(
+        documents, check_digits=False
+    )
+    return batch.valid, [raw for raw, _ in batch.rejected]
 
-    login_payload = {
-        "email": os.environ.get('PRO_EMAIL'),
-        "password": os.environ.get('PRO_PASS')
-    }
 
-    login_resp = requests.post(f"{BASE_URL}/login", json=login_payload)
-    
-    if login_resp.status_code != 200:
-        raise Exception(f"Login failed: {login_resp.json()}")
+def _rejected_documents(chunk, result):
+    """
+    Documents of `chunk` named by a 422 validation error, mapped to their
+    messages. The API reports them as `errors["documents.<index>"]`.
+    """
+    error = result.get("error")
+    if result.get("status_code") != 422 or not isinstance(error, dict) or \
+            not isinstance(error.get("errors"), dict):
+        return {}
+    rejected = {}
+    for key, messages in error["errors"].items():
+        name, _, index = key.partition(".")
+        if name == "documents" and index.isdigit() and \
+                int(index) < len(chunk):
+            rejected[chunk[int(index)]] = messages
+    return rejected
 
-    data = login_resp.json()
-    token = data.get("token")
-    if not token:
-        raise Exception(f"No token returned: {data}")
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    
-    return token, headers
+def _document_payload(documents):
+    if isinstance(documents, str):
+        return {"document": documents}
+    elif isinstance(documents, list):
+        return {"documents": documents}
+    raise ValueError("documents must be a string or a list of strings")
+
+
+class LiveProClient:
+    """Client for the live! pro API with a cached Sanctum credential."""
+
+    def __init__(self):
+        self.base_url = BASE_URL
+        self.auth_cache_key = "live_pro_auth_token"
+        self.session = get_session("live_pro")
+        self.resilience = resilience
+
+    def _headers(self, token):
+        return {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json"
+        }
+
+    def _login(self):
+        """Log in via Sanctum and cache the returned token."""
+        login_payload = {
+            "email": os.environ.get('PRO_EMAIL'),
+            "password": os.environ.get('PRO_PASS')
+        }
+
+        login_resp = self.resilience.call(
+            "login", lambda timeout: self.session.post(
+                f"{self.base_url}/login", json=login_payload, timeout=timeout
+            )
+        )
+
+        if login_resp.status_code != 200:
+            raise Exception(f"Login failed: {login_resp.json()}")
+
+        data = login_resp.json()
+        token = data.get("token")
+        if not token:
+            raise Exception(f"No token returned: {data}")
+
+        cache.set(self.auth_cache_key, signing.dumps(token), timeout=TOKEN_TTL)
+        return token
+
+    def _cached_token(self):
+        encrypted = cache.get(self.auth_cache_key)
+        if not encrypted:
+            return None
+        try:
+            return signing.loads(encrypted)
+        except signing.BadSignature:
+            return None
+
+    def get_credential(self, rejected=None):
+        """
+        Return (token, headers), logging in only when no valid token is cached.
+
+        Concurrent refreshes are de-duplicated with a cache lock: the callers
+        waiting on it reuse the token stored by the one that logged in.
+
+        Args:
+            rejected: A token the API just answered 401 to
+        """
+        token = self._cached_token()
+        if token and token != rejected:
+            return token, self._headers(token)
+
+        lock = cache_lock(
+            f"{self.auth_cache_key}:lock",
+            timeout=TOKEN_LOCK_TIMEOUT,
+            blocking_timeout=TOKEN_LOCK_WAIT
+        )
+        acquired = lock.acquire(blocking=True)
+        try:
+            token = self._cached_token()
+            if not token or token == rejected:
+                token = self._login()
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except LockError:
+                    pass
+
+        return token, self._headers(token)
+
+    def request(self, method, route, endpoint, **kwargs):
+        """Send an authenticated request, logging in again once on a 401.
+
+        POSTs create records, so they are only retried when the API cannot
+        have received them.
+        """
+        token, headers = self.get_credential()
+        idempotent = method.upper() != "POST"
+
+        def send(timeout):
+            return self.session.request(
+                method, f"{self.base_url}{route}", headers=headers,
+                timeout=timeout, **kwargs
+            )
+
+        response = self.resilience.call(endpoint, send, idempotent)
+        if response.status_code == 401:
+            cache.delete(self.auth_cache_key)
+            token, headers = self.get_credential(rejected=token)
+            response = self.resilience.call(endpoint, send, idempotent)
+        return response
+
+    def create_pro_user(self, documents):
+        """
+        Creates new ProUser(s) with the given document(s).
+
+        Args:
+            documents (str | list): A single CPF/CNPJ string OR a list of
+                CPF/CNPJs.
+
+        Returns:
+            dict: Response from the API
+        """
+        try:
+            payload = _document_payload(documents)
+            response = self.request(
+                "POST", "/pro-users/create", "pro-users/create", json=payload
+            )
+            return _response_result(response)
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error creating pro user(s): {str(e)}")
+
+    def pro_audiences(self, payload: dict, method: str = 'post',
+                      route: str = '/'):
+        """
+        Module for creating live! pro audiences.
+        """
+        if method not in ('post', 'get', 'delete'):
+            return 'Invalid method'
+
+        try:
+            response = self.request(
+                method.upper(), f"/audiences{route}", "audiences", json=payload
+            )
+            return _response_result(response)
+
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error creating pro user(s): {str(e)}")
+
+    def provision_pro_users(self, documents, chunk_size=PROVISION_CHUNK_SIZE,
+                            max_workers=4):
+        """
+        Create ProUsers for a large list of CPF/CNPJs.
+
+        Documents are normalized and de-duplicated, split into chunks of
+        `chunk_size` and sent with up to `max_workers` requests in flight.
+        Transient errors are retried by `self.resilience` only; a chunk is
+        never sent again as a whole.
+
+        A chunk rejected with a 422 is resolved document by document: the
+        documents its `errors` point at (`documents.<index>`) fail and the
+        rest are sent again, or, when no document is named, the chunk is
+        split in halves until the rejected documents are isolated. Once the
+        circuit is open nothing more is sent and every unsent document fails.
+
+        Returns:
+            dict: {"success", "created", "failed", "invalid", "requests"} where
+            "failed" maps each document that was not created to its error
+        """
+        valid, invalid = normalize_documents(documents)
+        pending = deque(
+            valid[i:i + chunk_size] for i in range(0, len(valid), chunk_size)
+        )
+        created, failed, sent = [], {}, 0
+        stopped = None
+
+        # credential is resolved once instead of racing in every worker
+        if pending:
+            self.get_credential()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while True:
+                while pending and stopped is None and \
+                        len(running) < max_workers:
+                    chunk = pending.popleft()
+                    running[executor.submit(self._create_chunk, chunk)] = chunk
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = running.pop(future)
+                    try:
+                        result = future.result()
+                    except CircuitOpenError as e:
+                        stopped = str(e)
+                        failed.update(dict.fromkeys(chunk, stopped))
+                        continue
+                    sent += 1
+                    if result["success"]:
+                        created.extend(chunk)
+                        continue
+                    rejected = _rejected_documents(chunk, result)
+                    if rejected:
+                        failed.update(rejected)
+                        rest = [d for d in chunk if d not in rejected]
+                        if rest:
+                            pending.append(rest)
+                    elif result.get("status_code") == 422 and len(chunk) > 1:
+                        middle = len(chunk) // 2
+                        pending.extend((chunk[:middle], chunk[middle:]))
+                    else:
+                        failed.update(dict.fromkeys(chunk, result["error"]))
+
+        for chunk in pending:
+            failed.update(dict.fromkeys(chunk, stopped))
+
+        return {
+            "success": not failed and not invalid,
+            "created": created,
+            "failed": failed,
+            "invalid": invalid,
+            "requests": sent
+        }
+
+    def _create_chunk(self, chunk):
+        """Send one chunk and return its result dict.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        try:
+            response = self.request(
+                "POST", "/pro-users/create", "pro-users/create",
+                json={"documents": chunk}
+            )
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        return _response_result(response)
+
+    async def aget_credential(self, rejected=None):
+        """Async `get_credential`; only a real login leaves the event loop."""
+        encrypted = await cache.aget(self.auth_cache_key)
+        if encrypted:
+            try:
+                token = signing.loads(encrypted)
+            except signing.BadSignature:
+                token = None
+            if token and token != rejected:
+                return token, self._headers(token)
+
+        return await sync_to_async(
+            self.get_credential, thread_sensitive=False
+        )(rejected=rejected)
+
+    async def arequest(self, method, route, endpoint, **kwargs):
+        """Async `request` over the loop's pooled httpx client."""
+        token, headers = await self.aget_credential()
+        client = get_async_client("live_pro")
+        idempotent = method.upper() != "POST"
+
+        def send(timeout):
+            return client.request(
+                method, f"{self.base_url}{route}", headers=headers,
+                timeout=timeout, **kwargs
+            )
+
+        response = await self.resilience.acall(endpoint, send, idempotent)
+        if response.status_code == 401:
+            await cache.adelete(self.auth_cache_key)
+            token, headers = await self.aget_credential(rejected=token)
+            response = await self.resilience.acall(
+                endpoint, send, idempotent
+            )
+        return response
+
+    async def acreate_pro_user(self, documents):
+        """
+        Async counterpart of `create_pro_user`.
+        """
+        try:
+            payload = _document_payload(documents)
+            response = await self.arequest(
+                "POST", "/pro-users/create", "pro-users/create", json=payload
+            )
+            return _response_result(response)
+
+        except httpx.HTTPError as e:
+            raise Exception(f"Request failed: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error creating pro user(s): {str(e)}")
+
+    async def apro_audiences(self, payload: dict, method: str = 'post',
+                             route: str = '/'):
+        """
+        Async counterpart of `pro_audiences`.
+        """
+        if method not in ('post', 'get', 'delete'):
+            return 'Invalid method'
+
+        try:
+            response = await self.arequest(
+                method.upper(), f"/audiences{route}", "audiences", json=payload
+            )
+            return _response_result(response)
+
+        except httpx.HTTPError as e:
+            raise Exception(f"Request failed: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error creating pro user(s): {str(e)}")
+
+
+def get_credential():
+    """
+    Logs in a user via Sanctum and accesses a protected endpoint.
+    """
+    return LiveProClient().get_credential()
+
 
 def create_pro_user(documents):
     """
     Creates new ProUser(s) with the given document(s).
-    
-    Args:
-        documents (str | list): A single CPF/CNPJ string OR a list of CPF/CNPJs.
-        
-    Returns:
-        dict: Response from the API
-    """
-    try:
-        token, headers = get_credential()
-
-        if isinstance(documents, str):
-            payload = {"document": documents}
-        elif isinstance(documents, list):
-            payload = {"documents": documents}
-        else:
-            raise ValueError("documents must be a string or a list of strings")
-
-        response = requests.post(
-            f"{BASE_URL}/pro-users/create", 
-            json=payload, 
-            headers=headers
-        )
+    """
+    return LiveProClient().create_pro_user(documents)
+
+
+def provision_pro_users(documents, **kwargs):
+    """
+    Creates ProUsers for a large list of documents, see
+    `LiveProClient.provision_pro_users`.
+    """
+    return LiveProClient().provision_pro_users(documents, **kwargs)
+
+
+def pro_audiences(payload: dict, method: str = 'post', route: str = '/'):
+    """
+    Module for creating live! pro audiences.
+    """
+    return LiveProClient().pro_audiences(payload, method, route)
 
-        if response.status_code in (200, 201):
-            return {
-                "success": True,
-                "data": response.json()
-            }
-        else:
-            return {
-                "success": False,
-                "status_code": response.status_code,
-                "error": response.json() if response.content else response.text
-            }
-
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Request failed: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Error creating pro user(s): {str(e)}")
-
-def pro_audiences(payload: dict, method:str = 'post', route:str = '/'):
-		"""
-		Module for creating live! pro audiences.
-		"""
-		try:
-				token, headers = get_credential()
-
-				content = {
-						"url":f"{BASE_URL}/audiences{route}",
-						"json":payload,
-						"headers":headers
-				}
-
-				if method == 'post':
-						response = requests.post(**content)
-				elif method == 'get':
-						response = requests.get(**content)
-				elif method == 'delete':
-						response = requests.delete(**content)
-				else:
-						return 'Invalid method'				
-
-				if response.status_code in (200, 201):
-						return {
-								"success": True,
-								"data": response.json()
-						}
-				else:
-						return {
-								"success": False,
-								"status_code": response.status_code,
-								"error": response.json() if response.content else response.text
-						}
-
-		except requests.exceptions.RequestException as e:
-				raise Exception(f"Request failed: {str(e)}")
-		except Exception as e:
-				raise Exception(f"Error creating pro user(s): {str(e)}")
+
+async def aget_credential():
+    """
+    Async counterpart of `get_credential`.
+    """
+    return await LiveProClient().aget_credential()
+
+
+async def acreate_pro_user(documents):
+    """
+    Async counterpart of `create_pro_user`.
+    """
+    return await LiveProClient().acreate_pro_user(documents)
+
+
+async def apro_audiences(payload: dict, method: str = 'post',
+                         route: str = '/'):
+    """
+    Async counterpart of `pro_audiences`.
+    """
+    return await LiveProClient().apro_audiences(payload, method, route)
@@ -0,0 +1,59 @@
+"""
+Cross-process locks backed by the Django cache.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+class CacheAddLock:
+    """Minimal lock built on the atomic `cache.add`, for non-Redis backends."""
+
+    def __init__(self, name, timeout=None, sleep=0.1, blocking_timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.blocking_timeout = blocking_timeout
+        self.token = None
+
+    def acquire(self, blocking=True):
+        token = uuid.uuid4().hex
+        deadline = None
+        if self.blocking_timeout is not None:
+            deadline = time.monotonic() + self.blocking_timeout
+
+        while True:
+            if cache.add(self.name, token, timeout=self.timeout):
+                self.token = token
+                return True
+            if not blocking:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.sleep)
+
+    def release(self):
+        if self.token and cache.get(self.name) == self.token:
+            cache.delete(self.name)
+        self.token = None
+
+
+def cache_lock(name, timeout=None, blocking_timeout=None):
+    """Return a lock shared by every process using the default cache.
+
+    Args:
+        name: Cache key used for the lock
+        timeout: Seconds after which the lock expires on its own
+        blocking_timeout: Maximum seconds `acquire()` waits for the lock
+
+    Returns:
+        A redis-py Lock when the cache is Redis, a CacheAddLock otherwise
+    """
+    if hasattr(cache, 'lock'):
+        return cache.lock(
+            name, timeout=timeout, blocking_timeout=blocking_timeout
+        )
+    return CacheAddLock(
+        name, timeout=timeout, blocking_timeout=blocking_timeout
+    )
@@ -0,0 +1,310 @@
+"""
+Retry, circuit breaking and call metrics shared by the outbound clients.
+
+The breaker state lives in the Django cache (Redis), so once one worker sees
+an integration failing, every worker fails fast until the reset timeout
+elapses and a single probe request is let through. Attempts share one
+deadline, so retries never stack timeouts beyond it, and calls that are not
+idempotent are only retried when the request cannot have reached the server.
+
+Per-endpoint call metrics are kept in process and logged every
+`METRICS_LOG_INTERVAL` seconds by the process making the calls.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict
+
+import httpx
+import requests
+import urllib3
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    httpx.TransportError,
+)
+# Statuses a POST that is not idempotent is retried on: the server refused it.
+REFUSED_STATUSES = frozenset({429, 503})
+
+# Seconds between two logs of the call metrics of a process.
+METRICS_LOG_INTERVAL = int(os.environ.get('METRICS_LOG_INTERVAL', 300))
+
+
+def is_connect_error(error: Exception) -> bool:
+    """Whether `error` means no connection was made, so nothing was sent."""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout,
+                          requests.exceptions.ConnectTimeout)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        # NewConnectionError and NameResolutionError derive from it
+        return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+    return False
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an integration whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker whose state is shared through the cache.
+
+    `failure_threshold` failures within `failure_window` seconds open the
+    circuit for `reset_timeout` seconds. Afterwards a single probe request is
+    let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: int = 30, failure_window: int = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_window = failure_window
+        self.failures_key = f"circuit:{name}:failures"
+        self.open_key = f"circuit:{name}:open_until"
+        self.probe_key = f"circuit:{name}:probe"
+
+    def acquire(self) -> bool:
+        """Return whether this request is a half-open probe.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        open_until = cache.get(self.open_key)
+        if open_until is None:
+            return False
+        if time.time() < open_until or \
+                not cache.add(self.probe_key, 1, timeout=self.reset_timeout):
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        return True
+
+    def record_success(self, probe: bool = False) -> None:
+        if probe:
+            cache.delete_many(
+                [self.failures_key, self.open_key, self.probe_key]
+            )
+
+    def record_failure(self, probe: bool = False) -> None:
+        if probe:
+            self._open(self.failure_threshold)
+            return
+
+        cache.add(self.failures_key, 0, timeout=self.failure_window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(self.failures_key, 1, timeout=self.failure_window)
+
+        if failures >= self.failure_threshold:
+            self._open(failures)
+
+    def _open(self, failures: int) -> None:
+        cache.set(
+            self.open_key,
+            time.time() + self.reset_timeout,
+            timeout=self.reset_timeout + self.failure_window
+        )
+        cache.delete(self.probe_key)
+        logger.warning(
+            "Circuit %s open for %ss after %s failures",
+            self.name, self.reset_timeout, failures
+        )
+
+
+class EndpointMetrics:
+    """In-process call counters and latency totals per endpoint.
+
+    The snapshot is logged at most every `log_interval` seconds, when a call
+    is recorded.
+    """
+
+    def __init__(self, log_interval: float = METRICS_LOG_INTERVAL):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+        self.log_interval = log_interval
+        self._logged_at = time.monotonic()
+
+    def record(self, endpoint: str, elapsed: float, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            data = self._data.setdefault(endpoint, {
+                "calls": 0, "failures": 0, "latency_total": 0.0,
+                "latency_max": 0.0,
+            })
+            data["calls"] += 1
+            data["failures"] += 0 if ok else 1
+            data["latency_total"] += elapsed
+            data["latency_max"] = max(data["latency_max"], elapsed)
+            due = now - self._logged_at >= self.log_interval
+            if due:
+                self._logged_at = now
+        if due:
+            self.log()
+
+    def log(self) -> None:
+        for endpoint, data in sorted(self.snapshot().items()):
+            logger.info(
+                "Calls to %s: %d calls, %d failures, "
+                "latency avg %.3fs max %.3fs",
+                endpoint, data["calls"], data["failures"],
+                data["latency_avg"], data["latency_max"]
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    **data,
+                    "latency_avg": data["latency_total"] / data["calls"],
+                }
+                for endpoint, data in self._data.items()
+            }
+
+
+metrics = EndpointMetrics()
+
+
+class Resilience:
+    """Retry with exponential backoff and full jitter behind a breaker.
+
+    `func` is called with the timeout of the attempt: `timeout` seconds, or
+    less once the attempts are close to `deadline` seconds in total. No
+    attempt starts after the deadline.
+
+    Args:
+        name: Integration name, shared by every endpoint of the same API
+        retries: Extra attempts after the first one
+        backoff: Base delay in seconds, doubled on every attempt
+        max_backoff: Upper bound for a single delay in seconds
+        timeout: Seconds a single attempt may take
+        deadline: Seconds all attempts and delays of a call may take
+    """
+
+    def __init__(self, name: str, retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 8.0, breaker: CircuitBreaker = None,
+                 timeout: float = 30.0, deadline: float = 60.0):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker(name)
+        self.timeout = timeout
+        self.deadline = deadline
+
+    def _delay(self, attempt: int, response=None) -> float:
+        delay = random.uniform(
+            0, min(self.max_backoff, self.backoff * (2 ** attempt))
+        )
+        retry_after = getattr(response, "headers", {}).get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.max_backoff))
+        return delay
+
+    def _outcome(self, endpoint: str, started: float, probe: bool,
+                 response=None, error: Exception = None) -> bool:
+        """Record the attempt and return whether it failed."""
+        failed = error is not None or \
+            response.status_code in RETRYABLE_STATUSES
+        metrics.record(
+            f"{self.name}:{endpoint}", time.monotonic() - started, not failed
+        )
+        if failed:
+            self.breaker.record_failure(probe)
+        else:
+            self.breaker.record_success(probe)
+        return failed
+
+    def _retry_delay(self, attempt: int, expires: float, idempotent: bool,
+                     response=None, error: Exception = None):
+        """Seconds to wait before the next attempt, None to stop."""
+        if attempt == self.retries:
+            return None
+        if not idempotent:
+            if error is not None and not is_connect_error(error):
+                return None
+            if response is not None and \
+                    response.status_code not in REFUSED_STATUSES:
+                return None
+        delay = self._delay(attempt, response)
+        if time.monotonic() + delay >= expires:
+            return None
+        return delay
+
+    def _attempt_timeout(self, expires: float) -> float:
+        return max(0.0, min(self.timeout, expires - time.monotonic()))
+
+    def call(self, endpoint: str, func: Callable, idempotent: bool = True):
+        """Call `func(timeout)`, returning a response, with retries.
+
+        Retryable statuses are retried and the last response is returned;
+        retryable exceptions are raised once the attempts run out. When
+        `idempotent` is False, only connect errors and 429/503 are retried.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        expires = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            probe = self.breaker.acquire()
+            started = time.monotonic()
+            try:
+                response = func(self._attempt_timeout(expires))
+            except RETRYABLE_EXCEPTIONS as e:
+                self._outcome(endpoint, started, probe, error=e)
+                delay = self._retry_delay(
+                    attempt, expires, idempotent, error=e
+                )
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+
+            if not self._outcome(endpoint, started, probe, response):
+                return response
+            delay = self._retry_delay(attempt, expires, idempotent, response)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+
+    async def acall(self, endpoint: str, func: Callable,
+                    idempotent: bool = True):
+        """Async `call`: `func(timeout)` returns an awaitable response.
+
+        The breaker is read and updated off the event loop.
+        """
+        acquire = sync_to_async(self.breaker.acquire, thread_sensitive=False)
+        outcome = sync_to_async(self._outcome, thread_sensitive=False)
+        expires = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            probe = await acquire()
+            started = time.monotonic()
+            try:
+                response = await func(self._attempt_timeout(expires))
+            except RETRYABLE_EXCEPTIONS as e:
+                await outcome(endpoint, started, probe, error=e)
+                delay = self._retry_delay(
+                    attempt, expires, idempotent, error=e
+                )
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            if not await outcome(endpoint, started, probe, response):
+                return response
+            delay = self._retry_delay(attempt, expires, idempotent, response)
+            if delay is None:
+                return response
+            await response.aclose()
+            await asyncio.sleep(delay)
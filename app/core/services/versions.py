@@ -0,0 +1,28 @@
+"""
+Version counters shared through the Django cache.
+
+A process that builds something expensive from the database (a compiled
+matcher, an in-memory index...) remembers the version it was built from and
+rebuilds once `bump_version` has been called anywhere.
+"""
+from django.core.cache import cache
+
+
+def _key(name: str) -> str:
+    return f"version:{name}"
+
+
+def get_version(name: str) -> int:
+    """Return the current version of `name`, 0 if it was never bumped."""
+    return cache.get(_key(name), 0)
+
+
+def bump_version(name: str) -> int:
+    """Invalidate everything built from `name`; return the new version."""
+    key = _key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+        return 1
@@ -0,0 +1,74 @@
+"""
+Local keep-alive HTTP server used to exercise the outbound clients in tests.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every request with the route registered on the server."""
+    protocol_version = 'HTTP/1.1'
+
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        body = json.loads(raw) if raw else None
+        self.server.calls.append(
+            (self.command, self.path, body, dict(self.headers))
+        )
+
+        path = self.path.split('?')[0]
+        route = self.server.routes.get((self.command, path))
+        if route is None:
+            status, payload = 404, {'error': 'not found'}
+        elif callable(route):
+            status, payload = route(self.path, body, self.headers)
+        else:
+            status, payload = route
+
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Serve StubHandler on a random local port from a daemon thread."""
+
+    def __init__(self, routes=None):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.routes = routes or {}
+        self.httpd.calls = []
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    @property
+    def calls(self):
+        return self.httpd.calls
+
+    @property
+    def routes(self):
+        return self.httpd.routes
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,114 @@
+"""
+Tests for the asyncio Cigam and LivePro clients.
+"""
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.services import cigam_client, live_pro_client
+from core.services.cigam_client import CigamClient
+from core.services.http_pool import close_async_clients
+from core.tests.stub_server import StubServer
+from core.tests.test_cigam_client import CIGAM_API, LOCMEM_CACHE, auth_route
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CIGAM_API=CIGAM_API)
+class AsyncCigamClientTests(SimpleTestCase):
+    """Test the async Cigam calls against a local stub server."""
+
+    def setUp(self):
+        cache.clear()
+        cigam_client._local_tokens.clear()
+        self.server = StubServer({
+            ('POST', '/autenticacao/autenticar'): auth_route(),
+            ('POST', '/api/Consulta/ObterCarga'): self._data_route,
+        })
+        self.server.__enter__()
+        self.client = CigamClient()
+        self.client.base_url = self.server.url
+        self.client.resilience.retries = 0
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def _data_route(self, path, body, headers):
+        if 'BROKEN' in path:
+            return 503, {'erro': 'indisponivel'}
+        record = {'path': path, 'auth': headers['Authorization']}
+        return 200, {'dados': [record]}
+
+    async def test_aget_data_unwraps_dados(self):
+        """Test records are unwrapped and authenticated with the token."""
+        data = await self.client.aget_data('CIGAM_LOJAS', {})
+        await close_async_clients()
+
+        self.assertEqual(data, [{
+            'path': '/api/Consulta/ObterCarga?guid=CIGAM_LOJAS',
+            'auth': 'Bearer token-1',
+        }])
+
+    async def test_aget_data_error_dict(self):
+        """Test HTTP errors come back as error dicts."""
+        data = await self.client.aget_data('BROKEN', {})
+        await close_async_clients()
+
+        self.assertEqual(data['error'], 'HTTP request failed')
+        self.assertEqual(data['status_code'], 503)
+
+    async def test_aget_data_many_shares_token(self):
+        """Test a concurrent batch authenticates once."""
+        loads = {f'key-{i}': (f'GUID_{i}', {}) for i in range(20)}
+        results = await self.client.aget_data_many(loads, max_workers=5)
+        await close_async_clients()
+
+        self.assertEqual(set(results), set(loads))
+        auth_calls = [c for c in self.server.calls if 'autenticar' in c[1]]
+        self.assertEqual(len(auth_calls), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AsyncLiveProClientTests(SimpleTestCase):
+    """Test the async LivePro helpers against a local stub server."""
+
+    def setUp(self):
+        cache.clear()
+        self.server = StubServer({
+            ('POST', '/login'): (200, {'token': 'pro-token'}),
+            ('POST', '/pro-users/create'): (201, {'created': 2}),
+            ('GET', '/audiences/7'): (404, {'message': 'not found'}),
+        })
+        self.server.__enter__()
+        patcher = patch.object(live_pro_client, 'BASE_URL', self.server.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    async def test_acreate_pro_user(self):
+        """Test users are created with the bearer token from login."""
+        result = await live_pro_client.acreate_pro_user(['1', '2'])
+        await close_async_clients()
+
+        self.assertEqual(result, {'success': True, 'data': {'created': 2}})
+        method, path, body, headers = self.server.calls[-1]
+        self.assertEqual(body, {'documents': ['1', '2']})
+        self.assertEqual(headers['Authorization'], 'Bearer pro-token')
+
+    async def test_apro_audiences_error(self):
+        """Test non-2xx responses are reported, not raised."""
+        result = await live_pro_client.apro_audiences({}, 'get', '/7')
+        await close_async_clients()
+
+        self.assertEqual(result, {
+            'success': False,
+            'status_code': 404,
+            'error': {'message': 'not found'},
+        })
+
+    async def test_apro_audiences_invalid_method(self):
+        """Test unsupported methods are rejected."""
+        result = await live_pro_client.apro_audiences({}, 'put')
+
+        self.assertEqual(result, 'Invalid method')
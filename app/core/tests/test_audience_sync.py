@@ -0,0 +1,126 @@
+"""
+Tests for the delta audience synchronization.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.services.audience_sync import AudienceSync
+from core.services.live_pro_client import LiveProClient
+from core.services.resilience import Resilience
+from core.tests.stub_server import StubServer
+from core.tests.test_cigam_client import LOCMEM_CACHE
+
+ROUTE = '/audiences/9/members'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AudienceSyncTests(SimpleTestCase):
+    """Test audiences are kept in sync with minimal traffic."""
+
+    def setUp(self):
+        cache.clear()
+        self.remote = {'11111111111', '22222222222', '33333333333'}
+        self.fail_adds = False
+        self.server = StubServer({
+            ('POST', '/login'): (200, {'token': 'pro-token'}),
+            ('GET', ROUTE): lambda *args: (200, {'data': [
+                {'document': document} for document in self.remote
+            ]}),
+            ('POST', ROUTE): self._add,
+            ('DELETE', ROUTE): self._remove,
+        })
+        self.server.__enter__()
+        client = LiveProClient()
+        client.base_url = self.server.url
+        client.resilience = Resilience('audience_test', retries=0)
+        self.sync = AudienceSync(9, client=client, batch_size=2)
+        # stand-in for the AudienceSyncState table
+        self.stored = {}
+        for name, kwargs in (
+            ('_load_state', {
+                'side_effect': lambda: self.stored.get('members'),
+            }),
+            ('_store_state', {
+                'side_effect': lambda data: self.stored.update(members=data),
+            }),
+        ):
+            patcher = mock.patch.object(self.sync, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def _add(self, path, body, headers):
+        if self.fail_adds:
+            return 500, {'message': 'boom'}
+        self.remote |= set(body['documents'])
+        return 200, {}
+
+    def _remove(self, path, body, headers):
+        self.remote -= set(body['documents'])
+        return 200, {}
+
+    def _calls(self, method):
+        return [c for c in self.server.calls if c[0] == method]
+
+    def test_first_sync_sends_only_the_difference(self):
+        """Test only additions and removals are sent."""
+        desired = ['222.222.222-22', '33333333333', '44444444444',
+                   '55555555555', '66666666666']
+
+        result = self.sync.sync(desired)
+
+        self.assertEqual(result['added'], 3)
+        self.assertEqual(result['removed'], 1)
+        self.assertEqual(result['unchanged'], 2)
+        self.assertEqual(len(self._calls('POST')) - 1, 2)
+        self.assertEqual(self.remote, {
+            '22222222222', '33333333333', '44444444444',
+            '55555555555', '66666666666',
+        })
+
+    def test_next_sync_uses_stored_state(self):
+        """Test later runs diff against the stored state, not the API."""
+        self.sync.sync(['11111111111'])
+        self.sync.sync(['11111111111', '77777777777'])
+
+        self.assertEqual(len(self._calls('GET')), 1)
+        self.assertEqual(self.sync.last_synced(), {
+            '11111111111', '77777777777',
+        })
+
+    def test_state_survives_cache_eviction(self):
+        """Test the stored table state is used once the cache is gone."""
+        self.sync.sync(['11111111111'])
+        cache.clear()
+
+        result = self.sync.sync(['11111111111', '77777777777'])
+
+        self.assertEqual(len(self._calls('GET')), 1)
+        self.assertEqual(result['added'], 1)
+        self.assertEqual(result['removed'], 0)
+        self.assertIsNotNone(cache.get(self.sync.state_key))
+
+    def test_nothing_to_do(self):
+        """Test an unchanged membership sends no updates."""
+        self.sync.sync(self.remote)
+        result = self.sync.sync(self.remote)
+
+        self.assertEqual(result['added'], 0)
+        self.assertEqual(result['removed'], 0)
+        self.assertEqual(self._calls('DELETE'), [])
+
+    def test_failed_batches_are_retried_next_run(self):
+        """Test additions that failed are not recorded as synced."""
+        self.fail_adds = True
+        result = self.sync.sync(self.remote | {'88888888888'})
+        self.assertEqual(result['added'], 0)
+        self.assertEqual(len(result['errors']), 1)
+
+        self.fail_adds = False
+        result = self.sync.sync(self.remote | {'88888888888'})
+        self.assertEqual(result['added'], 1)
+        self.assertIn('88888888888', self.remote)
@@ -0,0 +1,69 @@
+"""
+Tests for the audit_indexes command helpers.
+"""
+from django.test import SimpleTestCase
+
+from core.management.commands.audit_indexes import (
+    QUERIES,
+    has_unique_index,
+    index_statement,
+    seq_scans,
+)
+
+
+class AuditIndexesTests(SimpleTestCase):
+    """Test plan walking and index suggestions."""
+
+    def test_seq_scans_found_in_nested_plans(self):
+        """Test sequential scans are found below other nodes."""
+        plan = {
+            'Node Type': 'Sort',
+            'Plans': [
+                {'Node Type': 'Index Scan', 'Relation Name': 'franchises'},
+                {'Node Type': 'Seq Scan', 'Relation Name': 'stores'},
+            ],
+        }
+        self.assertEqual(
+            [node['Relation Name'] for node in seq_scans(plan)], ['stores']
+        )
+
+    def test_has_unique_index(self):
+        """Test only unique indexes on exactly the columns qualify."""
+        constraints = {
+            'stores_pkey': {
+                'columns': ['id'], 'unique': True, 'primary_key': True,
+            },
+            'stores_cigam_id_idx': {
+                'columns': ['cigam_id'], 'unique': False,
+                'primary_key': False,
+            },
+            'stores_cnpj_key': {
+                'columns': ['cnpj'], 'unique': True, 'primary_key': False,
+            },
+            'stores_name_uniq_live': {
+                'columns': ['name'], 'unique': True, 'primary_key': False,
+                'partial': True,
+            },
+        }
+        self.assertTrue(has_unique_index(constraints, ['cnpj']))
+        self.assertFalse(has_unique_index(constraints, ['cigam_id']))
+        self.assertFalse(has_unique_index(constraints, ['name']))
+
+    def test_index_statement(self):
+        """Test partial and unique index statements."""
+        self.assertEqual(
+            index_statement('stores', ['franchise_id', 'id'], partial=True),
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'stores_franchise_id_id_idx_live ON stores (franchise_id, id) '
+            'WHERE deleted_at IS NULL;'
+        )
+        self.assertIn(
+            'CREATE UNIQUE INDEX',
+            index_statement('stores', ['cigam_id'], unique=True)
+        )
+
+    def test_catalogue_compiles(self):
+        """Test every catalogued query builds SQL."""
+        for query in QUERIES:
+            sql, _ = query.queryset().query.sql_with_params()
+            self.assertTrue(sql.startswith('SELECT'), query.label)
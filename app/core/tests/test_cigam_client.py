@@ -0,0 +1,292 @@
+"""
+Tests for the Cigam API client.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.services import cigam_client
+from core.services.cigam_client import CigamClient
+from core.tests.stub_server import StubServer
+
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+CIGAM_API = {'user': 'user', 'password': 'secret'}
+
+
+def auth_route(token='token-1', expires_in=timedelta(hours=1), delay=0):
+    """Build a stub /autenticacao/autenticar handler."""
+    def handler(path, body, headers):
+        time.sleep(delay)
+        expires_at = datetime.now(timezone.utc) + expires_in
+        return 200, {'dados': {
+            'token': token,
+            'expiraEm': expires_at.isoformat().replace('+00:00', 'Z'),
+        }}
+    return handler
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CIGAM_API=CIGAM_API)
+class CigamClientTokenTests(SimpleTestCase):
+    """Test the two-tier, single-flight token cache."""
+
+    def setUp(self):
+        cache.clear()
+        cigam_client._local_tokens.clear()
+
+    def _client(self, server):
+        client = CigamClient()
+        client.base_url = server.url
+        client.resilience.retries = 0
+        return client
+
+    def _auth_calls(self, server):
+        return [c for c in server.calls if c[1] == '/autenticacao/autenticar']
+
+    def test_token_is_served_from_process_cache(self):
+        """Test a valid token is reused without touching Redis again."""
+        routes = {('POST', '/autenticacao/autenticar'): auth_route()}
+        with StubServer(routes) as server:
+            client = self._client(server)
+            self.assertEqual(client._get_token(), 'token-1')
+
+            cache.delete(client.auth_cache_key)
+            self.assertEqual(client._get_token(), 'token-1')
+
+        self.assertEqual(len(self._auth_calls(server)), 1)
+
+    def test_token_is_loaded_from_redis(self):
+        """Test a token cached by another process is picked up."""
+        routes = {('POST', '/autenticacao/autenticar'): auth_route()}
+        with StubServer(routes) as server:
+            client = self._client(server)
+            client._get_token()
+            cigam_client._local_tokens.clear()
+
+            self.assertEqual(client._get_token(), 'token-1')
+
+        self.assertEqual(len(self._auth_calls(server)), 1)
+
+    def test_concurrent_refresh_is_single_flight(self):
+        """Test concurrent callers trigger exactly one authentication."""
+        routes = {
+            ('POST', '/autenticacao/autenticar'): auth_route(delay=0.3),
+        }
+        with StubServer(routes) as server:
+            client = self._client(server)
+            with ThreadPoolExecutor(max_workers=5) as pool:
+                tokens = list(
+                    pool.map(lambda _: client._get_token(), range(5))
+                )
+
+        self.assertEqual(tokens, ['token-1'] * 5)
+        self.assertEqual(len(self._auth_calls(server)), 1)
+
+    def test_token_close_to_expiry_is_refreshed_in_background(self):
+        """Test a token inside the refresh window is renewed ahead of time."""
+        routes = {('POST', '/autenticacao/autenticar'): auth_route('token-2')}
+        with StubServer(routes) as server:
+            client = self._client(server)
+            client._store_token(
+                'token-1', datetime.now(timezone.utc) + timedelta(minutes=3)
+            )
+
+            self.assertEqual(client._get_token(), 'token-1')
+
+            deadline = time.monotonic() + 5
+            while cigam_client._refreshing.locked() or \
+                    not self._auth_calls(server):
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.05)
+
+            self.assertEqual(client._get_token(), 'token-2')
+
+    def test_one_background_refresh_at_a_time(self):
+        """Test concurrent callers start a single refresh thread."""
+        client = CigamClient()
+        started = threading.Event()
+        release = threading.Event()
+
+        def refresh_token():
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(
+            client, 'refresh_token', side_effect=refresh_token
+        ) as patched_refresh:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(
+                    lambda _: client._refresh_in_background(), range(20)
+                ))
+            self.assertTrue(started.wait(5))
+            release.set()
+            deadline = time.monotonic() + 5
+            while cigam_client._refreshing.locked():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+        patched_refresh.assert_called_once()
+
+    def test_authentication_failure_raises(self):
+        """Test a failed authentication surfaces as an exception."""
+        routes = {('POST', '/autenticacao/autenticar'): (500, {})}
+        with StubServer(routes) as server:
+            client = self._client(server)
+            with self.assertRaises(Exception):
+                client._get_token()
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CIGAM_API=CIGAM_API)
+class CigamClientBatchTests(SimpleTestCase):
+    """Test concurrent multi-dataset fetches."""
+
+    def setUp(self):
+        cache.clear()
+        cigam_client._local_tokens.clear()
+
+    def _routes(self, delay=0.3):
+        def data_route(path, body, headers):
+            guid = path.split('guid=')[1]
+            if guid == 'BROKEN':
+                return 500, {}
+            time.sleep(delay)
+            return 200, {'dados': [{'guid': guid, 'body': body}]}
+
+        return {
+            ('POST', '/autenticacao/autenticar'): auth_route(),
+            ('POST', '/api/Consulta/ObterCarga'): data_route,
+        }
+
+    def test_results_are_keyed_per_request(self):
+        """Test each dataset comes back under its own key."""
+        with StubServer(self._routes(delay=0)) as server:
+            client = CigamClient()
+            client.base_url = server.url
+            results = client.get_data_many({
+                'stores': ('CIGAM_LOJAS', {'a': 1}),
+                'employees': ('CIGAM_FUNC', {'b': 2}),
+            })
+
+        self.assertEqual(results['stores'], [
+            {'guid': 'CIGAM_LOJAS', 'body': {'a': 1}}
+        ])
+        self.assertEqual(results['employees'], [
+            {'guid': 'CIGAM_FUNC', 'body': {'b': 2}}
+        ])
+
+    def test_requests_run_concurrently_with_one_token(self):
+        """Test slow datasets overlap and share a single authentication."""
+        loads = [(f'GUID_{i}', {}) for i in range(4)]
+        with StubServer(self._routes(delay=0.3)) as server:
+            client = CigamClient()
+            client.base_url = server.url
+            start = time.monotonic()
+            results = client.get_data_many(loads, max_workers=4)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertLess(elapsed, 0.9)
+        auth_calls = [c for c in server.calls if 'autenticar' in c[1]]
+        self.assertEqual(len(auth_calls), 1)
+
+    def test_errors_are_kept_per_item(self):
+        """Test a failing dataset does not affect the others."""
+        with StubServer(self._routes(delay=0)) as server:
+            client = CigamClient()
+            client.base_url = server.url
+            client.resilience.retries = 0
+            results = client.get_data_many({
+                'ok': ('CIGAM_LOJAS', {}),
+                'broken': ('BROKEN', {}),
+            })
+
+        self.assertEqual(results['ok'], [{'guid': 'CIGAM_LOJAS', 'body': {}}])
+        self.assertEqual(results['broken']['error'], 'HTTP request failed')
+        self.assertEqual(results['broken']['status_code'], 500)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CIGAM_API={
+    **CIGAM_API, 'cache_ttl': {'CIGAM_LOJAS': 60, 'default': 5},
+})
+class CigamClientResponseCacheTests(SimpleTestCase):
+    """Test the compressed ObterCarga response cache."""
+
+    def setUp(self):
+        cache.clear()
+        cigam_client._local_tokens.clear()
+        self.records = [{'codempresa': 1}]
+        self.server = StubServer({
+            ('POST', '/autenticacao/autenticar'): auth_route(),
+            ('POST', '/api/Consulta/ObterCarga'):
+                lambda path, body, headers: (200, {'dados': self.records}),
+        })
+        self.server.__enter__()
+        self.client = CigamClient()
+        self.client.base_url = self.server.url
+        self.client.resilience.retries = 0
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def _data_calls(self):
+        return [c for c in self.server.calls if 'ObterCarga' in c[1]]
+
+    def test_cache_is_opt_in(self):
+        """Test get_data only uses the cache when asked to."""
+        self.client.get_data('CIGAM_LOJAS', {})
+        self.client.get_data('CIGAM_LOJAS', {})
+        self.assertEqual(len(self._data_calls()), 2)
+
+        self.client.get_data('CIGAM_LOJAS', {}, use_cache=True)
+        data = self.client.get_data('CIGAM_LOJAS', {}, use_cache=True)
+        self.assertEqual(data, self.records)
+        self.assertEqual(len(self._data_calls()), 3)
+
+    def test_cache_is_keyed_by_body(self):
+        """Test different bodies are cached separately."""
+        self.client.fetch_data('CIGAM_LOJAS', {'credencial': '1'})
+        result = self.client.fetch_data('CIGAM_LOJAS', {'credencial': '2'})
+
+        self.assertFalse(result['cached'])
+        self.assertEqual(len(self._data_calls()), 2)
+
+    def test_change_detection(self):
+        """Test changed reflects the payload, not the request."""
+        first = self.client.fetch_data('CIGAM_LOJAS', {})
+        self.assertTrue(first['changed'])
+
+        same = self.client.fetch_data('CIGAM_LOJAS', {}, use_cache=False)
+        self.assertFalse(same['changed'])
+        self.assertEqual(same['digest'], first['digest'])
+
+        self.records = [{'codempresa': 2}]
+        other = self.client.fetch_data('CIGAM_LOJAS', {}, use_cache=False)
+        self.assertTrue(other['changed'])
+
+        cached = self.client.fetch_data(
+            'CIGAM_LOJAS', {}, since=first['digest']
+        )
+        self.assertTrue(cached['cached'])
+        self.assertTrue(cached['changed'])
+        self.assertEqual(cached['data'], [{'codempresa': 2}])
+
+    def test_ttl_per_guid(self):
+        """Test the TTL comes from the GUID entry or the default."""
+        self.assertEqual(self.client._ttl('CIGAM_LOJAS'), 60)
+        self.assertEqual(self.client._ttl('OTHER'), 5)
+
+    def test_errors_are_not_cached(self):
+        """Test failed requests are retried instead of served from cache."""
+        self.server.routes[('POST', '/api/Consulta/ObterCarga')] = (500, {})
+        result = self.client.fetch_data('CIGAM_LOJAS', {})
+        self.assertEqual(result['data']['error'], 'HTTP request failed')
+
+        self.client.fetch_data('CIGAM_LOJAS', {})
+        self.assertEqual(len(self._data_calls()), 2)
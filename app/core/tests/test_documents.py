@@ -0,0 +1,100 @@
+"""
+Tests for CPF/CNPJ normalization.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.services import documents
+from core.services.documents import (
+    CNPJ,
+    EMPTY,
+    INVALID_CHECKSUM,
+    INVALID_FORMAT,
+    INVALID_LENGTH,
+    clean_document,
+    normalize_documents,
+)
+
+VALID_CNPJ = '11222333000181'
+VALID_CPF = '11144477735'
+
+
+class CleanDocumentTests(SimpleTestCase):
+    """Test single document normalization."""
+
+    def setUp(self):
+        documents.clear_cache()
+
+    def test_formatted_values_are_cleaned(self):
+        """Test punctuation is stripped from valid documents."""
+        self.assertEqual(
+            clean_document('11.222.333/0001-81'), (VALID_CNPJ, None)
+        )
+        self.assertEqual(clean_document('111.444.777-35'), (VALID_CPF, None))
+        self.assertEqual(clean_document(int(VALID_CPF)), (VALID_CPF, None))
+
+    def test_rejection_reasons(self):
+        """Test every invalid value reports why it was rejected."""
+        self.assertEqual(clean_document(None), (None, EMPTY))
+        self.assertEqual(clean_document('--'), (None, EMPTY))
+        self.assertEqual(clean_document('123'), (None, INVALID_LENGTH))
+        self.assertEqual(
+            clean_document('11222333000182'), (None, INVALID_CHECKSUM)
+        )
+        self.assertEqual(clean_document('0' * 14), (None, INVALID_FORMAT))
+        self.assertEqual(clean_document('1' * 11), (None, INVALID_FORMAT))
+
+    def test_kinds_restrict_lengths(self):
+        """Test a CPF is rejected where only CNPJs are accepted."""
+        self.assertEqual(
+            clean_document(VALID_CPF, kinds=(CNPJ,)), (None, INVALID_LENGTH)
+        )
+
+    def test_check_digits_can_be_skipped(self):
+        """Test only the length is checked without check digits."""
+        self.assertEqual(
+            clean_document('11222333000182', check_digits=False),
+            ('11222333000182', None)
+        )
+
+
+class NormalizeDocumentsTests(SimpleTestCase):
+    """Test batch normalization."""
+
+    def test_batch_keeps_order_and_reasons(self):
+        """Test valid values are de-duplicated in order with rejections."""
+        batch = normalize_documents([
+            '11.222.333/0001-81', VALID_CPF, VALID_CNPJ, '123', None,
+        ])
+
+        self.assertEqual(batch.valid, [VALID_CNPJ, VALID_CPF])
+        self.assertEqual(
+            batch.rejected, [('123', INVALID_LENGTH), (None, EMPTY)]
+        )
+
+    def test_duplicates_kept_when_not_unique(self):
+        """Test repeated documents are returned with unique=False."""
+        batch = normalize_documents([VALID_CPF, VALID_CPF], unique=False)
+        self.assertEqual(batch.valid, [VALID_CPF, VALID_CPF])
+
+    @mock.patch.object(documents, 'DOCUMENT_CACHE_SIZE', 10)
+    def test_memo_is_capped_within_a_batch(self):
+        """Test one large batch never grows the memo past its cap."""
+        values = [f'{i:011d}' for i in range(100)]
+
+        batch = normalize_documents(values, check_digits=False)
+        for value in values:
+            clean_document(value, check_digits=False)
+
+        self.assertEqual(batch.valid, values)
+        memo = documents._memo(documents.DOCUMENT_KINDS, False)
+        self.assertLessEqual(len(memo), 10)
+
+    def test_benchmark_command(self):
+        """Test the documents benchmark runs on a small input."""
+        out = StringIO()
+        call_command('benchmark', target='documents', size=1000, stdout=out)
+        self.assertIn('normalize_documents (warm)', out.getvalue())
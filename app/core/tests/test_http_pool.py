@@ -0,0 +1,43 @@
+"""
+Tests for the pooled HTTP sessions.
+"""
+from django.test import SimpleTestCase
+
+from core.services import http_pool
+from core.tests.stub_server import StubServer
+
+
+class HttpPoolTests(SimpleTestCase):
+    """Test per-process keep-alive sessions."""
+
+    def tearDown(self):
+        http_pool.close_sessions()
+
+    def test_session_is_shared_per_name(self):
+        """Test the same session is returned for the same name."""
+        first = http_pool.get_session('test')
+        second = http_pool.get_session('test')
+        other = http_pool.get_session('other')
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    def test_connections_are_reused(self):
+        """Test sequential requests reuse a single keep-alive connection."""
+        with StubServer({('GET', '/ping'): (200, {'ok': True})}) as server:
+            session = http_pool.get_session('test')
+            for _ in range(3):
+                res = session.get(f'{server.url}/ping')
+                self.assertEqual(res.json(), {'ok': True})
+
+        stats = http_pool.pool_stats('test')
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['reused'], 2)
+
+    def test_stats_for_unknown_session(self):
+        """Test stats default to zero for sessions never created."""
+        self.assertEqual(
+            http_pool.pool_stats('missing'),
+            {'opened': 0, 'reused': 0, 'requests': 0},
+        )
@@ -0,0 +1,98 @@
+"""
+Tests for the incremental JSON array parser.
+"""
+import json
+
+from django.test import SimpleTestCase
+
+from core.services.json_stream import iter_json_array
+
+
+def chunked(data, size):
+    """Split bytes into chunks of `size`."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """Test streaming the `dados` array out of a response body."""
+
+    def setUp(self):
+        self.records = [
+            {'codempresa': i, 'nomfantasia': f'Loja São João {i}',
+             'valor': 1234.5 * i, 'ativo': i % 2 == 0, 'extra': None}
+            for i in range(50)
+        ]
+        self.document = {
+            'sucesso': True,
+            'mensagem': 'ok [não é array]',
+            'total': 123456,
+            'dados': self.records,
+            'rodape': {'pagina': 1},
+        }
+
+    def test_every_chunk_size(self):
+        """Test records survive any chunk boundary, including inside UTF-8."""
+        data = json.dumps(self.document, ensure_ascii=False).encode()
+        for size in (1, 2, 3, 7, 64, len(data)):
+            records = list(iter_json_array(chunked(data, size), 'dados'))
+            self.assertEqual(records, self.records, size)
+
+    def test_top_level_array(self):
+        """Test a bare array is streamed as is."""
+        data = json.dumps(self.records).encode()
+        records = list(iter_json_array(chunked(data, 5), 'dados'))
+
+        self.assertEqual(records, self.records)
+
+    def test_stops_after_array(self):
+        """Test no chunk after the end of the array is read."""
+        data = json.dumps({'dados': [1, 2]}).encode()
+        chunks = iter(chunked(data, 4) + [b'garbage that is never read'])
+
+        self.assertEqual(list(iter_json_array(chunks, 'dados')), [1, 2])
+        self.assertIn(b'garbage that is never read', list(chunks))
+
+    def test_missing_or_null_key_raises(self):
+        """Test documents without the records key are rejected."""
+        for document in ({'sucesso': False}, {'dados': None}, {}):
+            data = json.dumps(document).encode()
+            with self.assertRaises(ValueError, msg=document):
+                list(iter_json_array(chunked(data, 3), 'dados'))
+
+    def test_empty_array(self):
+        """Test an empty records array yields nothing."""
+        data = json.dumps({'sucesso': True, 'dados': []}).encode()
+        self.assertEqual(list(iter_json_array([data], 'dados')), [])
+
+    def test_non_array_raises(self):
+        """Test a non-array `dados` is rejected."""
+        data = json.dumps({'dados': {'token': 'x'}}).encode()
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array([data], 'dados'))
+
+    def test_truncated_document_raises(self):
+        """Test a truncated body is reported instead of silently cut."""
+        data = json.dumps(self.document).encode()[:-40]
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array(chunked(data, 16), 'dados'))
+
+    def test_unclosed_object_raises(self):
+        """Test a document cut before its closing brace is rejected."""
+        for data in (b'{"a":1', b'{"a":1,', b'{"a": "x"', b''):
+            with self.assertRaises(ValueError, msg=data):
+                list(iter_json_array(chunked(data, 2), 'dados'))
+
+    def test_number_split_across_chunks(self):
+        """Test numbers cut after '.' or 'e' wait for the next chunk."""
+        cases = [
+            ([b'{"total": 12.', b'5, "dados": [{"a": 1}]}'], [{'a': 1}]),
+            ([b'{"dados": [1.', b'5]}'], [1.5]),
+            ([b'{"total": 1e', b'3, "dados": []}'], []),
+            ([b'{"dados": [-', b'2E', b'-', b'1, 10]}'], [-0.2, 10]),
+        ]
+        for chunks, expected in cases:
+            self.assertEqual(
+                list(iter_json_array(chunks, 'dados')), expected, chunks
+            )
@@ -0,0 +1,220 @@
+"""
+Tests for the LivePro client.
+"""
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.services.http_pool import close_async_clients
+from core.services.live_pro_client import (
+    LiveProClient,
+    normalize_documents,
+)
+from core.services.resilience import Resilience
+from core.tests.stub_server import StubServer
+from core.tests.test_cigam_client import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LiveProClientTests(SimpleTestCase):
+    """Test the cached Sanctum credential and pooled session."""
+
+    def setUp(self):
+        cache.clear()
+        self.tokens = itertools.count(1)
+        self.valid_token = None
+        self.server = StubServer({
+            ('POST', '/login'): self._login,
+            ('POST', '/pro-users/create'): self._protected,
+            ('GET', '/audiences/7'): self._protected,
+        })
+        self.server.__enter__()
+        self.client = LiveProClient()
+        self.client.base_url = self.server.url
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def _login(self, path, body, headers):
+        time.sleep(0.1)
+        self.valid_token = f'token-{next(self.tokens)}'
+        return 200, {'token': self.valid_token}
+
+    def _protected(self, path, body, headers):
+        if headers.get('Authorization') != f'Bearer {self.valid_token}':
+            return 401, {'message': 'Unauthenticated.'}
+        return 200, {'ok': True, 'body': body}
+
+    def _logins(self):
+        return [c for c in self.server.calls if c[1] == '/login']
+
+    def test_token_is_cached(self):
+        """Test several business calls share a single login."""
+        for _ in range(3):
+            result = self.client.create_pro_user(['12345678901'])
+            self.assertTrue(result['success'])
+
+        self.assertEqual(len(self._logins()), 1)
+
+    def test_relogin_on_401(self):
+        """Test a rejected token triggers exactly one new login."""
+        self.client.create_pro_user('12345678901')
+        self.valid_token = 'rotated-on-server'
+
+        result = self.client.pro_audiences({}, 'get', '/7')
+
+        self.assertEqual(result['data']['ok'], True)
+        self.assertEqual(len(self._logins()), 2)
+
+    def test_concurrent_logins_are_deduplicated(self):
+        """Test concurrent callers without a token log in once."""
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            tokens = list(pool.map(
+                lambda _: self.client.get_credential()[0], range(5)
+            ))
+
+        self.assertEqual(set(tokens), {'token-1'})
+        self.assertEqual(len(self._logins()), 1)
+
+    async def test_async_calls_reuse_cached_token(self):
+        """Test the async client reuses the cached credential."""
+        self.client.get_credential()
+
+        result = await self.client.acreate_pro_user(['12345678901'])
+        await close_async_clients()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(len(self._logins()), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProvisionProUsersTests(SimpleTestCase):
+    """Test chunked, concurrent bulk provisioning."""
+
+    def setUp(self):
+        cache.clear()
+        self.failures = {}
+        self.invalid = set()
+        self.server = StubServer({
+            ('POST', '/login'): (200, {'token': 'pro-token'}),
+            ('POST', '/pro-users/create'): self._create,
+        })
+        self.server.__enter__()
+        self.client = LiveProClient()
+        self.client.base_url = self.server.url
+        self.client.resilience = Resilience('live_pro_test', retries=0)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def _create(self, path, body, headers):
+        named = {
+            f'documents.{i}': ['invalid document']
+            for i, document in enumerate(body['documents'])
+            if document in self.invalid
+        }
+        if named:
+            return 422, {'message': 'invalid documents', 'errors': named}
+        for document in body['documents']:
+            if self.failures.get(document):
+                status = self.failures[document].pop(0)
+                return status, {'message': f'failed {document}'}
+        return 201, {'created': len(body['documents'])}
+
+    def _create_calls(self):
+        return [c[2]['documents'] for c in self.server.calls
+                if c[1] == '/pro-users/create']
+
+    def test_normalize_documents(self):
+        """Test formatting is stripped, duplicates and junk removed."""
+        valid, invalid = normalize_documents([
+            '123.456.789-01', '12345678901', '12.345.678/0001-95', '123', None,
+        ])
+
+        self.assertEqual(valid, ['12345678901', '12345678000195'])
+        self.assertEqual(invalid, ['123', None])
+
+    def test_documents_are_chunked(self):
+        """Test every unique document is sent once, in chunks."""
+        documents = [f'{i:011d}' for i in range(25)] * 2
+
+        result = self.client.provision_pro_users(documents, chunk_size=10)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(sorted(result['created']), sorted(set(documents)))
+        self.assertEqual(
+            sorted(len(chunk) for chunk in self._create_calls()), [5, 10, 10]
+        )
+
+    def test_transient_failures_are_retried_once(self):
+        """Test only the resilience layer re-sends a failed chunk."""
+        self.client.resilience = Resilience(
+            'live_pro_test', retries=1, backoff=0
+        )
+        documents = [f'{i:011d}' for i in range(30)]
+        self.failures[documents[15]] = [503]
+
+        result = self.client.provision_pro_users(documents, chunk_size=10)
+
+        self.assertTrue(result['success'])
+        retried = [c for c in self._create_calls() if documents[15] in c]
+        self.assertEqual(len(retried), 2)
+
+    def test_failed_chunks_are_not_sent_again(self):
+        """Test provisioning adds no retry rounds of its own."""
+        documents = [f'{i:011d}' for i in range(30)]
+        self.failures[documents[15]] = [503]
+
+        result = self.client.provision_pro_users(documents, chunk_size=10)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['requests'], 3)
+        self.assertEqual(sorted(result['failed']), documents[10:20])
+
+    def test_named_rejections_fail_only_their_documents(self):
+        """Test 422 errors naming documents leave the rest to be created."""
+        documents = [f'{i:011d}' for i in range(20)]
+        self.invalid = {documents[3], documents[7]}
+
+        result = self.client.provision_pro_users(documents, chunk_size=10)
+
+        self.assertEqual(result['failed'], {
+            documents[3]: ['invalid document'],
+            documents[7]: ['invalid document'],
+        })
+        self.assertEqual(
+            sorted(result['created']),
+            [d for d in documents if d not in self.invalid]
+        )
+        self.assertEqual(result['requests'], 3)
+
+    def test_rejected_chunks_are_split(self):
+        """Test an unexplained 422 is narrowed down to its document."""
+        documents = [f'{i:011d}' for i in range(20)] + ['bad']
+        self.failures[documents[0]] = [422] * 4
+
+        result = self.client.provision_pro_users(documents, chunk_size=10)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(list(result['failed']), documents[:1])
+        self.assertEqual(sorted(result['created']), documents[1:20])
+        self.assertEqual(result['invalid'], ['bad'])
+        self.assertEqual(result['requests'], 8)
+
+    def test_open_circuit_stops_provisioning(self):
+        """Test nothing more is sent once the circuit is open."""
+        self.client.get_credential()
+        self.client.resilience.breaker._open(5)
+        documents = [f'{i:011d}' for i in range(30)]
+
+        result = self.client.provision_pro_users(
+            documents, chunk_size=10, max_workers=1
+        )
+
+        self.assertEqual(self._create_calls(), [])
+        self.assertEqual(result['requests'], 0)
+        self.assertEqual(sorted(result['failed']), documents)
+        self.assertIn('circuit is open', result['failed'][documents[0]])
@@ -0,0 +1,219 @@
+"""
+Tests for the retry and circuit breaker layer.
+"""
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import requests
+import urllib3
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    EndpointMetrics,
+    Resilience,
+    metrics,
+)
+from core.tests.test_cigam_client import LOCMEM_CACHE
+
+
+def response(status_code, headers=None):
+    """Build a fake HTTP response."""
+    return Mock(status_code=status_code, headers=headers or {})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@patch('core.services.resilience.time.sleep')
+class ResilienceTests(SimpleTestCase):
+    """Test retries with backoff and the shared circuit breaker."""
+
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker(
+            'test', failure_threshold=3, reset_timeout=30
+        )
+        self.resilience = Resilience(
+            'test', retries=2, backoff=1, breaker=self.breaker
+        )
+
+    def test_retryable_status_is_retried(self, patched_sleep):
+        """Test 503s are retried until a good response arrives."""
+        func = Mock(side_effect=[response(503), response(200)])
+
+        res = self.resilience.call('endpoint', func)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(patched_sleep.call_count, 1)
+
+    def test_client_errors_are_not_retried(self, patched_sleep):
+        """Test 4xx responses are returned as is."""
+        func = Mock(return_value=response(404))
+
+        res = self.resilience.call('endpoint', func)
+
+        self.assertEqual(res.status_code, 404)
+        func.assert_called_once()
+
+    def test_last_response_after_retries(self, patched_sleep):
+        """Test the last response is returned once retries run out."""
+        func = Mock(return_value=response(502))
+
+        res = self.resilience.call('endpoint', func)
+
+        self.assertEqual(res.status_code, 502)
+        self.assertEqual(func.call_count, 3)
+
+    def test_connection_errors_are_raised(self, patched_sleep):
+        """Test transport errors are retried and then raised."""
+        func = Mock(side_effect=requests.exceptions.ConnectionError)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.resilience.call('endpoint', func)
+        self.assertEqual(func.call_count, 3)
+
+    def test_backoff_is_bounded_with_jitter(self, patched_sleep):
+        """Test delays grow exponentially under the jitter cap."""
+        self.resilience.max_backoff = 3
+        for attempt, cap in ((0, 1), (1, 2), (2, 3), (5, 3)):
+            for _ in range(20):
+                delay = self.resilience._delay(attempt)
+                self.assertGreaterEqual(delay, 0)
+                self.assertLessEqual(delay, cap)
+
+    def test_retry_after_is_honoured(self, patched_sleep):
+        """Test Retry-After raises the delay up to max_backoff."""
+        res = response(429, {'Retry-After': '5'})
+
+        self.assertEqual(self.resilience._delay(0, res), 5)
+
+    def test_circuit_opens_and_fails_fast(self, patched_sleep):
+        """Test the breaker opens for every caller after repeated failures."""
+        func = Mock(return_value=response(503))
+        self.resilience.call('endpoint', func)
+
+        other_worker = Resilience('test', breaker=CircuitBreaker('test'))
+        with self.assertRaises(CircuitOpenError):
+            other_worker.call('endpoint', func)
+        self.assertEqual(func.call_count, 3)
+
+    def test_half_open_probe(self, patched_sleep):
+        """Test a single probe closes the circuit after the reset timeout."""
+        self.resilience.call('endpoint', Mock(return_value=response(503)))
+
+        # the reset timeout elapsed
+        cache.set(self.breaker.open_key, time.time() - 1)
+        self.assertTrue(self.breaker.acquire())
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.acquire()
+        self.breaker.record_success(probe=True)
+
+        self.assertFalse(self.breaker.acquire())
+
+    def test_metrics_are_recorded(self, patched_sleep):
+        """Test calls and failures are counted per endpoint."""
+        func = Mock(side_effect=[response(500), response(200)])
+        self.resilience.call('metrics', func)
+
+        data = metrics.snapshot()['test:metrics']
+        self.assertEqual(data['calls'], 2)
+        self.assertEqual(data['failures'], 1)
+
+    def test_attempt_timeout_is_passed(self, patched_sleep):
+        """Test func gets the attempt timeout, capped by the deadline."""
+        self.resilience.timeout = 30
+        self.resilience.deadline = 10
+        func = Mock(return_value=response(200))
+
+        self.resilience.call('endpoint', func)
+
+        (timeout,), _ = func.call_args
+        self.assertLessEqual(timeout, 10)
+        self.assertGreater(timeout, 9)
+
+    def test_no_attempt_after_deadline(self, patched_sleep):
+        """Test retries stop once the deadline is spent."""
+        self.resilience.deadline = 5
+        clock = iter(range(0, 100, 3))
+
+        with patch('core.services.resilience.time.monotonic',
+                   side_effect=lambda: next(clock)):
+            func = Mock(side_effect=requests.exceptions.ReadTimeout)
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                self.resilience.call('endpoint', func)
+
+        func.assert_called_once()
+
+    def test_post_timeout_is_not_retried(self, patched_sleep):
+        """Test a call that is not idempotent is not sent twice."""
+        func = Mock(side_effect=requests.exceptions.ReadTimeout)
+
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.resilience.call('endpoint', func, idempotent=False)
+        func.assert_called_once()
+
+    def test_post_server_error_is_not_retried(self, patched_sleep):
+        """Test a 500 to a call that is not idempotent is returned."""
+        func = Mock(side_effect=[response(500), response(200)])
+
+        res = self.resilience.call('endpoint', func, idempotent=False)
+
+        self.assertEqual(res.status_code, 500)
+
+    def test_post_refused_is_retried(self, patched_sleep):
+        """Test connect errors and 429/503 are retried for any call."""
+        refused = requests.exceptions.ConnectionError(
+            urllib3.exceptions.MaxRetryError(
+                None, '/', urllib3.exceptions.NewConnectionError(
+                    None, 'refused'
+                )
+            )
+        )
+        func = Mock(side_effect=[refused, response(503), response(201)])
+
+        res = self.resilience.call('endpoint', func, idempotent=False)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(func.call_count, 3)
+
+    async def test_acall_retries(self, patched_sleep):
+        """Test the async call retries with the breaker off the loop."""
+        func = AsyncMock(side_effect=[
+            httpx.ConnectError('refused'), response(200),
+        ])
+
+        with patch('core.services.resilience.asyncio.sleep', AsyncMock()):
+            res = await self.resilience.acall('endpoint', func)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(func.await_count, 2)
+
+    async def test_acall_post_timeout_is_not_retried(self, patched_sleep):
+        """Test the async call does not resend a timed out POST."""
+        func = AsyncMock(side_effect=httpx.ReadTimeout('slow'))
+
+        with self.assertRaises(httpx.ReadTimeout):
+            await self.resilience.acall('endpoint', func, idempotent=False)
+        func.assert_awaited_once()
+
+
+class EndpointMetricsTests(SimpleTestCase):
+    """Test the call metrics are logged periodically."""
+
+    def test_snapshot_is_logged_every_interval(self):
+        """Test the metrics are logged once per interval."""
+        with self.assertLogs('core.services.resilience', 'INFO') as logs:
+            with patch('core.services.resilience.time.monotonic',
+                       side_effect=[0, 30, 61, 62]):
+                data = EndpointMetrics(log_interval=60)
+                data.record('api:a', 0.5, True)
+                data.record('api:a', 1.5, False)
+                data.record('api:a', 1.0, True)
+
+        self.assertEqual(logs.output, [
+            'INFO:core.services.resilience:Calls to api:a: 2 calls, '
+            '1 failures, latency avg 1.000s max 1.500s',
+        ])
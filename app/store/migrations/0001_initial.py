@@ -0,0 +1,137 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:37
+
+import core.management.commands.makemigrations
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        # updated_at_column(), used by the franchises trigger
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OurStores',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('cnpj', models.CharField(blank=True, db_comment='CNPJ of the store, possibly formatted', max_length=20, null=True)),
+                ('status', models.BooleanField(blank=True, db_comment='Whether the store is active in the e-commerce', null=True)),
+            ],
+            options={
+                'verbose_name': 'E-commerce Store',
+                'verbose_name_plural': 'E-commerce Stores',
+                'db_table': 'our_stores',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreAdresses',
+            fields=[
+                ('id', models.AutoField(db_comment='Auto-incrementing unique identifier for each database record', primary_key=True, serialize=False)),
+                ('store_cnpj', models.CharField(db_comment='CNPJ (Brazilian business identifier) of the store; primary key', max_length=20, null=True)),
+                ('status', models.BooleanField(blank=True, db_comment='Current status of the employee (e.g., active, inactive)', db_default=models.Value(False), default=False, null=True)),
+                ('zip_code', models.CharField(blank=True, db_comment="Postal code of the store's location", max_length=9, null=True)),
+                ('state', models.CharField(blank=True, db_comment='State where the store is located', max_length=5, null=True)),
+                ('city', models.CharField(blank=True, db_comment='City where the store is located', max_length=255, null=True)),
+                ('neighborhood', models.CharField(blank=True, db_comment='Neighborhood of the store', max_length=255, null=True)),
+                ('street', models.CharField(blank=True, db_comment='Street name of the store address', max_length=255, null=True)),
+                ('number', models.CharField(blank=True, db_comment='Street number of the store', max_length=10, null=True)),
+                ('complement', models.CharField(blank=True, db_comment='Additional address information (e.g., suite or floor)', max_length=255, null=True)),
+                ('lat', models.CharField(blank=True, db_comment='Latitude coordinate of the store', max_length=50, null=True)),
+                ('lng', models.CharField(blank=True, db_comment='Longitude coordinate of the store', max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_comment='Timestamp when this record was created', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='Timestamp when this record was last updated', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)', null=True)),
+            ],
+            options={
+                'verbose_name': 'Store Adresses',
+                'verbose_name_plural': 'Stores Adresses',
+                'db_table': 'store_adresses',
+                'db_table_comment': 'Stores information including personal details and contacts information',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Stores',
+            fields=[
+                ('id', models.AutoField(db_comment='Auto-incrementing unique identifier for each database record', primary_key=True, serialize=False)),
+                ('cnpj', models.CharField(db_comment='CNPJ (Brazilian business identifier) of the store; primary key', max_length=20, unique=True)),
+                ('cigam_id', models.CharField(blank=True, db_comment='Internal unique identifier for the store', max_length=20, null=True)),
+                ('franchise_id', models.BigIntegerField(blank=True, db_comment='Franchising id', null=True)),
+                ('status', models.BooleanField(blank=True, db_comment='Current status of the employee (e.g., active, inactive)', db_default=models.Value(False), default=False, null=True)),
+                ('name', models.CharField(blank=True, db_comment='Commercial name of the store', max_length=255, null=True)),
+                ('name_legal', models.CharField(blank=True, db_comment='Registered legal name of the store', max_length=255, null=True)),
+                ('inaugurated_at', models.DateField(blank=True, db_comment='Date this store was opened', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_comment='Timestamp when this record was created', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='Timestamp when this record was last updated', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)', null=True)),
+            ],
+            options={
+                'verbose_name': 'Store',
+                'verbose_name_plural': 'Stores',
+                'db_table': 'stores',
+                'db_table_comment': 'Stores information including personal details and contacts information',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreSocial',
+            fields=[
+                ('id', models.AutoField(db_comment='Auto-incrementing unique identifier for each database record', primary_key=True, serialize=False)),
+                ('store_cnpj', models.CharField(db_comment='CNPJ (Brazilian business identifier) of the store; primary key', max_length=20, unique=True)),
+                ('status', models.BooleanField(blank=True, db_comment='Current status of the employee (e.g., active, inactive)', db_default=models.Value(False), default=False, null=True)),
+                ('name', models.CharField(blank=True, db_comment='Display name of the store', max_length=255, null=True)),
+                ('coupon_id', models.BigIntegerField(blank=True, db_comment='Associated coupon or promotion ID', null=True)),
+                ('email', models.CharField(blank=True, db_comment='Email adress of the store', max_length=255, null=True)),
+                ('phone', models.CharField(blank=True, db_comment="Store's primary contact phone number", max_length=50, null=True)),
+                ('whatsapp', models.CharField(blank=True, db_comment="Store's WhatsApp number for customer contact", max_length=50, null=True)),
+                ('url', models.CharField(blank=True, db_comment='Website or landing page URL of the store', max_length=50, null=True)),
+                ('instagram', models.CharField(blank=True, db_comment='URL of the store Instagram', max_length=255, null=True)),
+                ('facebook', models.CharField(blank=True, db_comment='URL of the store Instagram', max_length=255, null=True)),
+                ('cover_photo', models.CharField(blank=True, db_comment="URL or path to the store's cover photo", max_length=255, null=True)),
+                ('store_photo', models.CharField(blank=True, db_comment="URL or path to the store's profile photo", max_length=255, null=True)),
+                ('working_days', models.JSONField(blank=True, db_comment='Days of the week the store is open', null=True)),
+                ('working_hours', models.JSONField(blank=True, db_comment='Operating hours of the store', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_comment='Timestamp when this record was created', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='Timestamp when this record was last updated', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)', null=True)),
+            ],
+            options={
+                'verbose_name': 'Store Social',
+                'verbose_name_plural': 'Stores Social',
+                'db_table': 'store_social',
+                'db_table_comment': 'Stores information including personal details and contacts information',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Franchises',
+            fields=[
+                ('id', models.AutoField(help_text='Auto-incrementing unique identifier for each database record', primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, help_text='Short descriptive name of the franchise type', max_length=255, null=True)),
+                ('status', models.BooleanField(default=False, help_text='Current status (e.g., active, inactive)', null=True)),
+                ('alias', models.CharField(blank=True, help_text='Simplified version of the franchise name', max_length=10, null=True)),
+                ('owner_type', models.CharField(blank=True, help_text='Organization that owns this franchise type', max_length=20, null=True)),
+                ('description', models.TextField(blank=True, help_text='Description of the franchise type', null=True)),
+                ('patterns', models.JSONField(blank=True, default=list, help_text='Substrings of a store name that identify this franchise (case-insensitive); the alias itself when empty')),
+                ('priority', models.IntegerField(default=0, help_text='Franchises with a higher priority are matched first')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_comment='Timestamp when this record was created', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='Timestamp when this record was last updated', db_default=django.db.models.functions.datetime.Now(), null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)', null=True)),
+            ],
+            options={
+                'verbose_name': 'Store Franchises',
+                'verbose_name_plural': 'Stores Franchises',
+                'db_table': 'franchises',
+                'db_table_comment': 'Stores information including personal details and contacts information',
+            },
+        ),
+        core.management.commands.makemigrations.CreateUpdatedAtTrigger(
+            table_name='franchises',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Franchise matching priorities for the Cigam store import.
+#
+# Databases whose `franchises` table predates the store migrations apply
+# 0001_initial with --fake-initial, so the new columns are added here if they
+# are missing (a no-op on a table 0001_initial created) before the priorities
+# of the old hardcoded matcher are backfilled.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE franchises "
+                "ADD COLUMN IF NOT EXISTS patterns jsonb NOT NULL "
+                "DEFAULT '[]'::jsonb, "
+                "ADD COLUMN IF NOT EXISTS priority integer NOT NULL DEFAULT 0",
+                # keep the precedence of the old hardcoded matcher:
+                # LPF > FRQ > STD
+                "UPDATE franchises SET priority = CASE alias "
+                "WHEN 'LPF' THEN 30 WHEN 'FRQ' THEN 20 WHEN 'STD' THEN 10 "
+                "END WHERE alias IN ('LPF', 'FRQ', 'STD') AND priority = 0",
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -5,6 +5,27 @@ from django.db import models
 from django.db.models.functions import Now
 
 
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet for tables with a `deleted_at` soft-delete column."""
+
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+    def soft_delete(self):
+        """Mark every row of the queryset deleted in one UPDATE."""
+        return self.update(deleted_at=Now())
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Default manager hiding soft-deleted rows, see `all_objects`."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Stores(models.Model):
 		class Meta:
 				verbose_name = 'Store'
@@ -25,6 +46,9 @@ class Stores(models.Model):
 		updated_at = models.DateTimeField(blank=True, null=True, auto_now=True, db_default=Now(), db_comment='Timestamp when this record was last updated')
 		deleted_at = models.DateTimeField(blank=True, null=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)')
 
+		objects = SoftDeleteManager()
+		all_objects = SoftDeleteQuerySet.as_manager()
+
 		def __str__(self):
 				return f"{self.id} - {self.name}"
 
@@ -57,6 +81,9 @@ class StoreSocial(models.Model):
     updated_at = models.DateTimeField(blank=True, null=True, auto_now=True, db_default=Now(), db_comment='Timestamp when this record was last updated')
     deleted_at = models.DateTimeField(blank=True, null=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)')
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.id}"
 
@@ -86,6 +113,9 @@ class StoreAdresses(models.Model):
     updated_at = models.DateTimeField(blank=True, null=True, auto_now=True, db_default=Now(), db_comment='Timestamp when this record was last updated')
     deleted_at = models.DateTimeField(blank=True, null=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)')
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.id}"
 
@@ -134,9 +164,40 @@ class Franchises(models.Model):
         blank=True,
         help_text="Description of the franchise type"
     )
+
+    patterns = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Substrings of a store name that identify this franchise "
+                  "(case-insensitive); the alias itself when empty"
+    )
+
+    priority = models.IntegerField(
+        default=0,
+        help_text="Franchises with a higher priority are matched first"
+    )
     created_at = models.DateTimeField(blank=True, null=True, auto_now_add=True, db_default=Now(), db_comment='Timestamp when this record was created')
     updated_at = models.DateTimeField(blank=True, null=True, auto_now=True, db_default=Now(), db_comment='Timestamp when this record was last updated')
     deleted_at = models.DateTimeField(blank=True, null=True, db_comment='Timestamp when this record was soft-deleted (NULL if active)')
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.id} - {self.name}"
+
+
+class OurStores(models.Model):
+    """Stores of the e-commerce database, read through `live_ecomm`."""
+    class Meta:
+        verbose_name = 'E-commerce Store'
+        verbose_name_plural = 'E-commerce Stores'
+        db_table = 'our_stores'
+        managed = False
+
+    id = models.AutoField(primary_key=True)
+    cnpj = models.CharField(max_length=20, blank=True, null=True, db_comment='CNPJ of the store, possibly formatted')
+    status = models.BooleanField(blank=True, null=True, db_comment='Whether the store is active in the e-commerce')
+
+    def __str__(self):
+        return f"{self.id} - {self.cnpj}"
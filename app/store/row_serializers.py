@@ -0,0 +1,125 @@
+"""
+Read-only fast path for model serializers.
+
+A `RowSerializer` builds the representation of a `ModelSerializer` straight
+from `values_list()` tuples, with a function generated and compiled once
+from the serializer's fields. Plain values (strings, numbers, booleans,
+JSON, primary keys) are copied as they come from the database and only
+dates and datetimes are formatted, exactly as DRF would; any other field
+falls back to its own `to_representation`. No field objects are bound and
+no model instances are built per row.
+
+The serializer class stays the source of truth, so views keep it as their
+`serializer_class` and drf_spectacular documents the same schema.
+"""
+import datetime
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+_PLAIN_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.FloatField,
+    serializers.IntegerField,
+)
+
+
+def format_datetime(value: datetime.datetime, tz) -> str:
+    """ISO 8601 output of `serializers.DateTimeField` in `tz`."""
+    if tz is not None:
+        if timezone.is_aware(value):
+            value = value.astimezone(tz)
+        else:
+            value = timezone.make_aware(value, tz)
+    elif timezone.is_aware(value):
+        value = timezone.make_naive(value, datetime.timezone.utc)
+    text = value.isoformat()
+    if text.endswith('+00:00'):
+        text = text[:-6] + 'Z'
+    return text
+
+
+def _is_plain(field) -> bool:
+    if isinstance(field, serializers.JSONField):
+        return not field.binary
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return field.pk_field is None
+    # ChoiceField and friends are not subclasses of the plain fields
+    return isinstance(field, _PLAIN_FIELDS)
+
+
+def _is_iso(field, default_format) -> bool:
+    output_format = getattr(field, 'format', default_format)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+class RowSerializer:
+    """Compiled `values_list()` row to dict conversion of a serializer."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def _fields(self) -> List:
+        fields = [
+            field for field in self.serializer_class().fields.values()
+            if not field.write_only
+        ]
+        for field in fields:
+            if field.source == '*':
+                raise ValueError(
+                    f"{self.serializer_class.__name__}.{field.field_name}: "
+                    "fields with source='*' cannot be read from rows"
+                )
+        return fields
+
+    @cached_property
+    def lookups(self) -> List[str]:
+        """Lookups to pass to `values_list()`, in serializer field order."""
+        return [field.source.replace('.', '__') for field in self._fields]
+
+    @cached_property
+    def _to_dicts(self) -> Callable:
+        namespace = {'_datetime': format_datetime}
+        items = []
+        for i, field in enumerate(self._fields):
+            value = f"row[{i}]"
+            if _is_plain(field):
+                expression = value
+            elif isinstance(field, serializers.DateTimeField) and \
+                    _is_iso(field, api_settings.DATETIME_FORMAT):
+                expression = f"_datetime({value}, tz)"
+            elif isinstance(field, serializers.DateField) and \
+                    _is_iso(field, api_settings.DATE_FORMAT):
+                expression = f"{value}.isoformat()"
+            else:
+                namespace[f"_field{i}"] = field.to_representation
+                expression = f"_field{i}({value})"
+            if expression != value:
+                expression = f"None if {value} is None else {expression}"
+            items.append(f"{field.field_name!r}: {expression}")
+
+        source = (
+            "def to_dicts(rows, tz):\n"
+            f"    return [{{{', '.join(items)}}} for row in rows]\n"
+        )
+        exec(compile(source, f"<{self.serializer_class.__name__} rows>",
+                     'exec'), namespace)
+        return namespace['to_dicts']
+
+    def values_list(self, queryset):
+        """`queryset` as named row tuples, usable by cursor pagination."""
+        return queryset.values_list(*self.lookups, named=True)
+
+    def many(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """Serialize rows in `lookups` order."""
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        return self._to_dicts(rows, tz)
+
+    def to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        return self.many([row])[0]
@@ -0,0 +1,129 @@
+"""
+Serializers for the store API View.
+"""
+from rest_framework import serializers
+
+from store import models
+from store.row_serializers import RowSerializer
+from store.services.geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+
+
+class StoreSerializer(serializers.ModelSerializer):
+    """Serializer for stores."""
+
+    class Meta:
+        model = models.Stores
+        fields = [
+            'id', 'cnpj', 'cigam_id', 'name', 'name_legal', 'franchise_id',
+            'status', 'inaugurated_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class StoreSocialSerializer(serializers.ModelSerializer):
+    """Serializer for store social data."""
+
+    class Meta:
+        model = models.StoreSocial
+        fields = [
+            'id', 'store', 'store_cnpj', 'status', 'name', 'coupon_id',
+            'email', 'phone', 'whatsapp', 'url', 'instagram', 'facebook',
+            'cover_photo', 'store_photo', 'working_days', 'working_hours',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class StoreAdressesSerializer(serializers.ModelSerializer):
+    """Serializer for store addresses."""
+
+    class Meta:
+        model = models.StoreAdresses
+        fields = [
+            'id', 'store', 'store_cnpj', 'status', 'zip_code', 'state',
+            'city', 'neighborhood', 'street', 'number', 'complement', 'lat',
+            'lng', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+# Fast read-only paths building the same output from values_list() rows.
+store_rows = RowSerializer(StoreSerializer)
+store_social_rows = RowSerializer(StoreSocialSerializer)
+store_address_rows = RowSerializer(StoreAdressesSerializer)
+
+
+class NearestStoreQuerySerializer(serializers.Serializer):
+    """Query parameters of the nearest store search."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    radius = serializers.FloatField(
+        min_value=0, max_value=MAX_RADIUS_KM, default=DEFAULT_RADIUS_KM,
+        help_text='Search radius in km'
+    )
+
+
+class NearestStoreSerializer(serializers.Serializer):
+    """Store found by the nearest store search."""
+    store_id = serializers.IntegerField()
+    cnpj = serializers.CharField()
+    name = serializers.CharField(allow_null=True)
+    city = serializers.CharField(allow_null=True)
+    state = serializers.CharField(allow_null=True)
+    lat = serializers.FloatField()
+    lng = serializers.FloatField()
+    distance_km = serializers.FloatField()
+
+
+class StoreSearchQuerySerializer(serializers.Serializer):
+    """Query parameters of the store search."""
+    q = serializers.CharField(
+        min_length=1, max_length=100,
+        help_text='Name, name prefix (typos allowed) or CNPJ fragment'
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class StoreSearchResultSerializer(serializers.Serializer):
+    """Store found by the store search."""
+    id = serializers.IntegerField()
+    cnpj = serializers.CharField()
+    name = serializers.CharField(allow_null=True)
+    status = serializers.BooleanField(allow_null=True)
+    franchise_id = serializers.IntegerField(allow_null=True)
+    match = serializers.ChoiceField(choices=['prefix', 'cnpj', 'fuzzy'])
+    score = serializers.FloatField()
+
+
+class StoreExportQuerySerializer(serializers.Serializer):
+    """Query parameters of the store export."""
+    file_format = serializers.ChoiceField(choices=['csv', 'ndjson'],
+                                          default='csv')
+    gzip = serializers.BooleanField(default=False)
+
+
+class StoreIngestSerializer(serializers.Serializer):
+    """Upload of store social or address rows."""
+    target = serializers.ChoiceField(choices=['social', 'addresses'])
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(
+        choices=['csv', 'ndjson'], required=False,
+        help_text='Guessed from the file name when omitted'
+    )
+
+
+class StoreIngestErrorSerializer(serializers.Serializer):
+    """Row rejected by a store data upload."""
+    line = serializers.IntegerField()
+    field = serializers.CharField(allow_null=True)
+    error = serializers.CharField()
+
+
+class StoreIngestResultSerializer(serializers.Serializer):
+    """Outcome of a store data upload."""
+    received = serializers.IntegerField()
+    copied = serializers.IntegerField()
+    written = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = StoreIngestErrorSerializer(many=True)
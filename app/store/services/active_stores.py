@@ -0,0 +1,127 @@
+"""
+Index of the stores reported active by the last Cigam import.
+
+The CNPJs live in a Redis sorted set scored by the time they were last seen,
+so membership is one ZSCORE, a batch of checks is one pipelined round trip,
+and a refresh is built under a temporary key and swapped in with RENAME,
+which readers never observe half-written. Readers check the CNPJs they hold
+against the index rather than loading it whole.
+
+Each refresh also writes the "','"-joined CNPJ string to the legacy
+`active_stores` cache key, which older readers still use.
+"""
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+from django_redis import get_redis_connection
+
+from store import models
+
+# Members sent per ZADD while refreshing.
+REFRESH_BATCH_SIZE = 5000
+# CNPJs per `Stores` query of `stores()`.
+QUERY_BATCH_SIZE = 1000
+# Cache key of the legacy "','"-joined string of active CNPJs.
+LEGACY_CACHE_KEY = 'active_stores'
+
+
+class ActiveStoreIndex:
+    """Sorted set {cnpj: last seen timestamp} of the active stores."""
+
+    def __init__(self, name: str = 'active_stores', alias: str = 'default',
+                 legacy_key: Optional[str] = LEGACY_CACHE_KEY):
+        self.key = cache.make_key(f"{name}:index")
+        self.alias = alias
+        self.legacy_key = legacy_key
+
+    @property
+    def redis(self):
+        return get_redis_connection(self.alias)
+
+    def refresh(self, cnpjs: Iterable[str],
+                seen_at: Optional[float] = None) -> int:
+        """
+        Replace the index with `cnpjs` atomically.
+
+        An empty input leaves the current index untouched, so a failed
+        import never marks every store inactive.
+
+        Returns:
+            int: Number of distinct CNPJs indexed
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        temp_key = f"{self.key}:refresh:{uuid.uuid4().hex}"
+        redis = self.redis
+
+        pipe = redis.pipeline(transaction=False)
+        batch, total = {}, 0
+        legacy: List[str] = []
+        for cnpj in cnpjs:
+            if self.legacy_key:
+                legacy.append(cnpj)
+            batch[cnpj] = seen_at
+            if len(batch) >= REFRESH_BATCH_SIZE:
+                pipe.zadd(temp_key, batch)
+                total += len(batch)
+                batch = {}
+        if batch:
+            pipe.zadd(temp_key, batch)
+            total += len(batch)
+        if not total:
+            return 0
+
+        pipe.zcard(temp_key)
+        pipe.rename(temp_key, self.key)
+        indexed = pipe.execute()[-2]
+        if self.legacy_key:
+            cache.set(self.legacy_key, "','".join(dict.fromkeys(legacy)))
+        return indexed
+
+    def is_active(self, cnpj: str) -> bool:
+        """O(1) membership check."""
+        return self.redis.zscore(self.key, cnpj) is not None
+
+    def active_many(self, cnpjs: Iterable[str]) -> Dict[str, bool]:
+        """Check many CNPJs in one pipelined round trip."""
+        cnpjs = list(dict.fromkeys(cnpjs))
+        pipe = self.redis.pipeline(transaction=False)
+        for cnpj in cnpjs:
+            pipe.zscore(self.key, cnpj)
+        return {
+            cnpj: score is not None
+            for cnpj, score in zip(cnpjs, pipe.execute())
+        }
+
+    def last_seen(self, cnpj: str) -> Optional[float]:
+        """Timestamp of the import that last reported `cnpj` active."""
+        return self.redis.zscore(self.key, cnpj)
+
+    def count(self) -> int:
+        return self.redis.zcard(self.key)
+
+    def members(self) -> Iterator[str]:
+        """Iterate over the active CNPJs without loading them at once."""
+        for member, _ in self.redis.zscan_iter(self.key):
+            yield member.decode() if isinstance(member, bytes) else member
+
+    def filter(self, cnpjs: Iterable[str], field: str = 'cnpj') -> Q:
+        """`Q` restricting `field` to the active CNPJs among `cnpjs`."""
+        active = [
+            cnpj for cnpj, ok in self.active_many(cnpjs).items() if ok
+        ]
+        return Q(**{f"{field}__in": active})
+
+    def stores(self, batch_size: int = QUERY_BATCH_SIZE
+               ) -> Iterator[models.Stores]:
+        """Active `Stores`, queried `batch_size` CNPJs at a time."""
+        batch = []
+        for cnpj in self.members():
+            batch.append(cnpj)
+            if len(batch) >= batch_size:
+                yield from models.Stores.objects.filter(cnpj__in=batch)
+                batch = []
+        if batch:
+            yield from models.Stores.objects.filter(cnpj__in=batch)
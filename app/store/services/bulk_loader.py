@@ -0,0 +1,283 @@
+"""
+COPY-based bulk upserts for the (unmanaged) store tables.
+
+Rows are streamed into a temporary staging table with PostgreSQL COPY and
+merged into the target table with one INSERT ... SELECT ... ON CONFLICT, so
+neither Python nor the server ever handles one giant INSERT statement.
+`soft_delete_missing` and `soft_delete_matching` are the set-based
+counterparts for rows that vanished from a full import or are being
+replaced.
+"""
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connections, transaction
+from django.db.models import JSONField
+
+# Bytes handed to COPY per read() call.
+COPY_BUFFER_SIZE = 64 * 1024
+
+_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+})
+
+
+def _format(value: Any) -> str:
+    """Render one value in COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    elif isinstance(value, (int, float, decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return str(value).translate(_ESCAPES)
+
+
+class _CopyStream:
+    """File-like object producing COPY text lines from an iterable of rows."""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self.rows = iter(rows)
+        self.buffer = b''
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        size = COPY_BUFFER_SIZE if size is None or size < 0 else size
+        while len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.count += 1
+            line = '\t'.join(_format(value) for value in row) + '\n'
+            self.buffer += line.encode()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def _json_preparer(field) -> Callable[[Any], Any]:
+    """get_prep_value of a JSONField, encoded to JSON text for COPY."""
+    def prepare(value):
+        value = field.get_prep_value(value)
+        # a str is a JSON string value, not already encoded JSON
+        return None if value is None else json.dumps(value, cls=field.encoder)
+    return prepare
+
+
+def _preparers(fields) -> List[Callable[[Any], Any]]:
+    return [
+        _json_preparer(field) if isinstance(field, JSONField)
+        else field.get_prep_value
+        for field in fields
+    ]
+
+
+def _row_values(row: Any, fields, preparers=None) -> Sequence[Any]:
+    """Extract the prepared values of `fields` from a dict, tuple or model."""
+    if isinstance(row, dict):
+        values = [
+            row.get(field.attname, row.get(field.name)) for field in fields
+        ]
+    elif isinstance(row, (tuple, list)):
+        values = row
+    else:
+        values = [getattr(row, field.attname) for field in fields]
+    if preparers is None:
+        preparers = _preparers(fields)
+    return [prepare(value) for prepare, value in zip(preparers, values)]
+
+
+def copy_upsert(
+    model,
+    rows: Iterable[Any],
+    fields: Sequence[str],
+    conflict_fields: Optional[Sequence[str]] = None,
+    update_fields: Optional[Sequence[str]] = None,
+    using: str = 'default',
+) -> Dict[str, int]:
+    """Load `rows` into `model`'s table through COPY and a set-based upsert.
+
+    Rows may be model instances, dicts or tuples in `fields` order, and are
+    consumed lazily, so a generator keeps memory flat. When several rows share
+    the same conflict key, the last one wins. Rows whose values already match
+    the table are not rewritten, which keeps their updated_at untouched.
+    JSONField values are JSON-encoded like the ORM does, so a str is stored as
+    a JSON string.
+
+    Args:
+        model: Model whose db_table is loaded, e.g. `Stores`
+        rows: Rows to load
+        fields: Model field names copied for every row
+        conflict_fields: Unique columns for ON CONFLICT; None inserts only
+        update_fields: Columns updated on conflict, default `fields` minus
+            `conflict_fields`
+
+    Returns:
+        dict: {"copied": rows streamed, "written": rows inserted or updated,
+        "inserted": new rows, "updated": existing rows that changed}
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    model_fields = [model._meta.get_field(name) for name in fields]
+    columns = [field.column for field in model_fields]
+    table = quote(model._meta.db_table)
+    staging = quote(
+        f"_staging_{model._meta.db_table}_{uuid.uuid4().hex[:8]}"
+    )
+    column_list = ', '.join(quote(column) for column in columns)
+
+    if conflict_fields:
+        conflict_columns = [
+            model._meta.get_field(name).column for name in conflict_fields
+        ]
+        if update_fields is None:
+            update_fields = [f for f in fields if f not in conflict_fields]
+        update_columns = [
+            model._meta.get_field(name).column for name in update_fields
+        ]
+        conflict_list = ', '.join(quote(c) for c in conflict_columns)
+        select = (
+            f"SELECT DISTINCT ON ({conflict_list}) {column_list} "
+            f"FROM {staging} ORDER BY {conflict_list}, _seq DESC"
+        )
+        if update_columns:
+            assignments = ', '.join(
+                f"{quote(c)} = EXCLUDED.{quote(c)}" for c in update_columns
+            )
+            current = ', '.join(f"{table}.{quote(c)}" for c in update_columns)
+            excluded = ', '.join(
+                f"EXCLUDED.{quote(c)}" for c in update_columns
+            )
+            on_conflict = (
+                f"ON CONFLICT ({conflict_list}) DO UPDATE SET {assignments} "
+                f"WHERE ({current}) IS DISTINCT FROM ({excluded})"
+            )
+        else:
+            on_conflict = f"ON CONFLICT ({conflict_list}) DO NOTHING"
+    else:
+        select = f"SELECT {column_list} FROM {staging} ORDER BY _seq"
+        on_conflict = ''
+
+    preparers = _preparers(model_fields)
+    stream = _CopyStream(
+        _row_values(row, model_fields, preparers) for row in rows
+    )
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {table} WITH NO DATA"
+        )
+        cursor.execute(f"ALTER TABLE {staging} ADD COLUMN _seq bigserial")
+        cursor.cursor.copy_expert(
+            f"COPY {staging} ({column_list}) FROM STDIN", stream
+        )
+        # xmax is 0 only on tuples this statement created, not on the
+        # ones ON CONFLICT updated
+        cursor.execute(
+            f"WITH written AS ("
+            f"INSERT INTO {table} ({column_list}) {select} {on_conflict} "
+            f"RETURNING (xmax = 0) AS inserted) "
+            f"SELECT count(*) FILTER (WHERE inserted), "
+            f"count(*) FILTER (WHERE NOT inserted) FROM written"
+        )
+        inserted, updated = cursor.fetchone()
+
+    return {
+        "copied": stream.count,
+        "written": inserted + updated,
+        "inserted": inserted,
+        "updated": updated,
+    }
+
+
+def soft_delete_missing(
+    model,
+    field: str,
+    seen: Iterable[Any],
+    returning: Sequence[str] = (),
+    using: str = 'default',
+):
+    """Soft-delete, in one UPDATE, the live rows whose `field` is not in
+    `seen`.
+
+    Rows with a NULL `field` are not managed by the import and are left
+    alone, and an empty `seen` deletes nothing, so a failed import never
+    wipes the table.
+
+    Args:
+        model: Model with a `deleted_at` column
+        field: Model field holding the import key, e.g. `cigam_id`
+        seen: Every key present in the latest full import
+        returning: Model field names returned for the deleted rows
+
+    Returns:
+        list: One tuple of `returning` values per soft-deleted row
+    """
+    seen = list({str(value) for value in seen if value is not None})
+    if not seen:
+        return []
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(model._meta.get_field(field).column)
+    deleted_at = quote(model._meta.get_field('deleted_at').column)
+    returned = ', '.join(
+        quote(model._meta.get_field(name).column) for name in returning
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {deleted_at} = now() "
+            f"WHERE {deleted_at} IS NULL AND {column} IS NOT NULL "
+            f"AND NOT ({column}::text = ANY(%s))"
+            + (f" RETURNING {returned}" if returned else ""),
+            [seen]
+        )
+        return cursor.fetchall() if returned else [()] * cursor.rowcount
+
+
+def soft_delete_matching(
+    model,
+    field: str,
+    values: Iterable[Any],
+    using: str = 'default',
+) -> int:
+    """Soft-delete, in one UPDATE, the live rows whose `field` is in
+    `values`.
+
+    Args:
+        model: Model with a `deleted_at` column
+        field: Model field to match, e.g. `store`
+        values: Values of `field` whose rows are deleted
+
+    Returns:
+        int: Number of soft-deleted rows
+    """
+    values = list({value for value in values if value is not None})
+    if not values:
+        return 0
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(model._meta.get_field(field).column)
+    deleted_at = quote(model._meta.get_field('deleted_at').column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {deleted_at} = now() "
+            f"WHERE {deleted_at} IS NULL AND {column} = ANY(%s)",
+            [values]
+        )
+        return cursor.rowcount
@@ -0,0 +1,167 @@
+"""
+Streaming export of stores with their social and address data.
+
+Rows are read with `QuerySet.iterator()`, which uses a server-side cursor on
+PostgreSQL, with the related tables LEFT JOINed in the same query. They are
+encoded as CSV or NDJSON and yielded in chunks of about `CHUNK_BYTES`,
+optionally gzip-compressed on the fly, so memory stays constant however many
+stores are exported. A store with several addresses yields one row per
+address.
+"""
+import csv
+import json
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FilteredRelation, Q
+
+from store import models
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per round trip from the server-side cursor.
+FETCH_SIZE = 2000
+# Encoded bytes buffered before a chunk is yielded.
+CHUNK_BYTES = 64 * 1024
+
+# (column name, lookup on the annotated Stores queryset)
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('cnpj', 'cnpj'),
+    ('cigam_id', 'cigam_id'),
+    ('name', 'name'),
+    ('name_legal', 'name_legal'),
+    ('franchise_id', 'franchise_id'),
+    ('status', 'status'),
+    ('inaugurated_at', 'inaugurated_at'),
+    ('updated_at', 'updated_at'),
+    ('social_name', 'social__name'),
+    ('email', 'social__email'),
+    ('phone', 'social__phone'),
+    ('whatsapp', 'social__whatsapp'),
+    ('url', 'social__url'),
+    ('instagram', 'social__instagram'),
+    ('facebook', 'social__facebook'),
+    ('working_days', 'social__working_days'),
+    ('working_hours', 'social__working_hours'),
+    ('zip_code', 'address__zip_code'),
+    ('state', 'address__state'),
+    ('city', 'address__city'),
+    ('neighborhood', 'address__neighborhood'),
+    ('street', 'address__street'),
+    ('number', 'address__number'),
+    ('complement', 'address__complement'),
+    ('lat', 'address__lat'),
+    ('lng', 'address__lng'),
+]
+
+COLUMNS = [column for column, _ in EXPORT_FIELDS]
+
+
+def export_queryset(include_deleted: bool = False):
+    """Stores joined with their live social and address rows, as tuples."""
+    manager = models.Stores.all_objects if include_deleted \
+        else models.Stores.objects
+    # conditions go in the JOIN so stores without related rows are kept
+    return manager.annotate(
+        social=FilteredRelation(
+            'storesocial', condition=Q(storesocial__deleted_at__isnull=True)
+        ),
+        address=FilteredRelation(
+            'storeadresses',
+            condition=Q(storeadresses__deleted_at__isnull=True)
+        ),
+    ).order_by('id', 'address__id').values_list(
+        *(lookup for _, lookup in EXPORT_FIELDS)
+    )
+
+
+def export_rows(include_deleted: bool = False,
+                fetch_size: int = FETCH_SIZE) -> Iterator[tuple]:
+    return export_queryset(include_deleted).iterator(chunk_size=fetch_size)
+
+
+class _Echo:
+    """File-like object handing back what `csv.writer` writes."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def ndjson_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(COLUMNS, row))) + '\n'
+
+
+def _chunked(lines: Iterable[str], size: int) -> Iterator[bytes]:
+    """Join encoded lines into chunks of at least `size` bytes."""
+    buffer: List[bytes] = []
+    buffered = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into a gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stores(file_format: str = 'csv', compress: bool = False,
+                  rows: Optional[Iterable[tuple]] = None,
+                  chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode stores as a stream of byte chunks.
+
+    Args:
+        file_format: 'csv' or 'ndjson'
+        compress: gzip the stream
+        rows: Row tuples in `COLUMNS` order; `export_rows()` when omitted
+
+    Returns:
+        Iterator of bytes, lazily reading the rows
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    if rows is None:
+        rows = export_rows()
+    lines = csv_lines(rows) if file_format == 'csv' else ndjson_lines(rows)
+    chunks = _chunked(lines, chunk_bytes)
+    return gzipped(chunks) if compress else chunks
+
+
+def export_filename(file_format: str, compress: bool = False) -> str:
+    return f"stores.{file_format}{'.gz' if compress else ''}"
+
+
+def content_type(file_format: str, compress: bool = False) -> str:
+    return 'application/gzip' if compress else FORMATS[file_format]
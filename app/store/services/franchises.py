@@ -0,0 +1,121 @@
+"""
+Franchise classification of store names.
+
+The rules live in the `franchises` table: every franchise lists the name
+`patterns` that identify it (its alias when empty) and a `priority`. Names
+matching nothing get the `OUT` franchise. The rules are compiled into one
+regular expression whose branches are tried in priority order, so a whole
+batch of names is classified without touching the database.
+
+The compiled matcher is cached per process and rebuilt when the
+`franchises` version is bumped, which the Franchises signals do on every
+save and delete.
+"""
+import re
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from core.services.versions import get_version
+from store import models
+
+# Version name bumped whenever a franchise row changes.
+FRANCHISES_VERSION = 'franchises'
+# Alias assigned when no pattern matches.
+DEFAULT_ALIAS = 'OUT'
+
+
+class FranchiseRule(NamedTuple):
+    id: Optional[int]
+    alias: str
+    patterns: Sequence[str]
+    priority: int = 0
+
+
+class FranchiseMatcher:
+    """Compiled, priority-ordered set of franchise rules."""
+
+    def __init__(self, rules: Iterable[FranchiseRule],
+                 default_alias: str = DEFAULT_ALIAS):
+        rules = sorted(
+            (rule for rule in rules if rule.alias),
+            key=lambda rule: -rule.priority
+        )
+        self.ids = {rule.alias: rule.id for rule in rules}
+        self.default_alias = default_alias
+
+        # one lookahead per rule, anchored at the start: the alternation
+        # tries them in order, so the first rule matching anywhere wins
+        self.groups = {}
+        branches = []
+        for i, rule in enumerate(rules):
+            patterns = rule.patterns
+            if not patterns and rule.alias != default_alias:
+                patterns = [rule.alias]
+            patterns = [p for p in patterns or [] if p]
+            if not patterns:
+                continue
+            group = f"r{i}"
+            self.groups[group] = rule.alias
+            alternation = '|'.join(
+                re.escape(p) for p in sorted(patterns, key=len, reverse=True)
+            )
+            branches.append(f"(?=.*?(?:{alternation}))(?P<{group}>)")
+
+        self.regex = re.compile(
+            f"^(?:{'|'.join(branches)})", re.IGNORECASE | re.DOTALL
+        ) if branches else None
+
+    @classmethod
+    def from_db(cls) -> 'FranchiseMatcher':
+        # only active rules classify; ties keep the id order, whatever
+        # order the database returns
+        rows = models.Franchises.objects.filter(status=True).order_by(
+            '-priority', 'id'
+        ).values_list('id', 'alias', 'patterns', 'priority')
+        return cls(FranchiseRule(*row) for row in rows)
+
+    def alias(self, name: Optional[str]) -> Optional[str]:
+        """Alias of the franchise `name` belongs to, None for no name."""
+        if not name:
+            return None
+        match = self.regex.match(name) if self.regex else None
+        return self.groups[match.lastgroup] if match else self.default_alias
+
+    def classify(self, names: Iterable[Optional[str]]
+                 ) -> List[Tuple[Optional[str], Optional[int]]]:
+        """Return (alias, franchise id) for every name, in order."""
+        match = self.regex.match if self.regex else None
+        groups, ids, default = self.groups, self.ids, self.default_alias
+        results = []
+        for name in names:
+            if not name:
+                results.append((None, None))
+                continue
+            found = match(name) if match else None
+            alias = groups[found.lastgroup] if found else default
+            results.append((alias, ids.get(alias)))
+        return results
+
+
+_lock = threading.Lock()
+_matcher: Optional[FranchiseMatcher] = None
+_matcher_version = None
+
+
+def get_matcher() -> FranchiseMatcher:
+    """Return the process-wide matcher, rebuilt if the rules changed."""
+    global _matcher, _matcher_version
+    version = get_version(FRANCHISES_VERSION)
+    if _matcher is not None and _matcher_version == version:
+        return _matcher
+    with _lock:
+        if _matcher is None or _matcher_version != version:
+            _matcher = FranchiseMatcher.from_db()
+            _matcher_version = version
+    return _matcher
+
+
+def classify_store_names(names: Iterable[Optional[str]]
+                         ) -> List[Tuple[Optional[str], Optional[int]]]:
+    """Return (alias, franchise id) for every store name, in order."""
+    return get_matcher().classify(names)
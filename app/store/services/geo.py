@@ -0,0 +1,294 @@
+"""
+In-memory nearest-store search over StoreAdresses coordinates.
+
+Coordinates are stored as free text, so they are parsed once into floats and
+bucketed into a grid of `CELL_SIZE` degree cells. A query only measures the
+stores in the cells overlapping the search radius, which keeps it in the
+millisecond range for tens of thousands of stores.
+
+Only live (not soft-deleted) addresses of live stores are indexed, the
+same rows the store API and the active store index serve.
+
+Every process keeps one index. It is refreshed when the `stores` version
+changes, applying only the rows updated since the last refresh, and rebuilt
+from scratch every `FULL_REBUILD_INTERVAL` seconds to drop hard-deleted rows.
+The periodic rebuild runs in a background thread while queries keep using
+the current index; only the very first build blocks.
+The refresh watermark is the latest updated_at among the rows actually read.
+updated_at is set when a transaction starts, so a row committed after a
+refresh may carry an earlier timestamp; every refresh reads back
+`WATERMARK_OVERLAP` before the watermark to pick such rows up.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.db import connection
+from django.db.models import Q
+
+from core.services.versions import get_version
+from store import models
+from store.services.lookup import STORES_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees (~11 km of latitude).
+CELL_SIZE = 0.1
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_RADIUS_KM = 50
+MAX_RADIUS_KM = 500
+FULL_REBUILD_INTERVAL = 60 * 60
+# Rows updated this long before the watermark are read again.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+class StorePoint(NamedTuple):
+    address_id: int
+    store_id: int
+    cnpj: str
+    name: Optional[str]
+    city: Optional[str]
+    state: Optional[str]
+    lat: float
+    lng: float
+
+
+def parse_coordinate(value, limit: float) -> Optional[float]:
+    """Parse a free-text coordinate ("-23.55", "-23,55"); None if invalid."""
+    if value is None:
+        return None
+    try:
+        number = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+    if math.isnan(number) or not -limit <= number <= limit:
+        return None
+    return number
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometers."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """Uniform grid of store points."""
+
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self.points: Dict[int, StorePoint] = {}
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_size), math.floor(lng / self.cell_size)
+        )
+
+    def add(self, point: StorePoint) -> None:
+        self.remove(point.address_id)
+        self.points[point.address_id] = point
+        self.cells.setdefault(
+            self._cell(point.lat, point.lng), set()
+        ).add(point.address_id)
+
+    def remove(self, address_id: int) -> None:
+        point = self.points.pop(address_id, None)
+        if point is None:
+            return
+        cell = self._cell(point.lat, point.lng)
+        members = self.cells[cell]
+        members.discard(address_id)
+        if not members:
+            del self.cells[cell]
+
+    def copy(self) -> 'GeoIndex':
+        index = GeoIndex(self.cell_size)
+        index.points = dict(self.points)
+        index.cells = {cell: set(ids) for cell, ids in self.cells.items()}
+        return index
+
+    def nearest(self, lat: float, lng: float, k: int = 10,
+                radius_km: float = DEFAULT_RADIUS_KM
+                ) -> List[Tuple[float, StorePoint]]:
+        """Return up to `k` (distance km, point) within `radius_km`,
+        closest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(lat))
+        dlng = 180 if cos_lat < 1e-6 else min(180, dlat / cos_lat)
+        lat_min, lng_min = self._cell(lat - dlat, lng - dlng)
+        lat_max, lng_max = self._cell(lat + dlat, lng + dlng)
+
+        candidates = []
+        cells, points = self.cells, self.points
+        for i in range(lat_min, lat_max + 1):
+            for j in range(lng_min, lng_max + 1):
+                for address_id in cells.get((i, j), ()):
+                    point = points[address_id]
+                    distance = haversine_km(lat, lng, point.lat, point.lng)
+                    if distance <= radius_km:
+                        candidates.append((distance, address_id, point))
+
+        # a store with several addresses is reported at its closest one
+        heapq.heapify(candidates)
+        results, stores = [], set()
+        while candidates and len(results) < k:
+            distance, _, point = heapq.heappop(candidates)
+            if point.store_id not in stores:
+                stores.add(point.store_id)
+                results.append((distance, point))
+        return results
+
+
+def rows_queryset(since=None):
+    """
+    Address rows joined with their store: the live ones, or every row
+    changed at or after `since` so soft-deleted ones can be removed.
+    """
+    queryset = models.StoreAdresses.all_objects.values_list(
+        'id', 'store_id', 'store__cnpj', 'store__name', 'city', 'state',
+        'lat', 'lng', 'deleted_at', 'store__deleted_at', 'updated_at',
+        'store__updated_at'
+    )
+    if since is None:
+        queryset = queryset.filter(
+            deleted_at__isnull=True, store__deleted_at__isnull=True
+        )
+    else:
+        queryset = queryset.filter(
+            Q(updated_at__gte=since) | Q(store__updated_at__gte=since)
+        )
+    return queryset
+
+
+def _rows(since=None):
+    return rows_queryset(since).iterator(chunk_size=2000)
+
+
+def apply_rows(index: GeoIndex, rows):
+    """
+    Add live addresses with valid coordinates, remove everything else.
+
+    Returns:
+        The latest updated_at of the rows, None if there is none
+    """
+    latest = None
+    for (address_id, store_id, cnpj, name, city, state, lat, lng,
+         deleted_at, store_deleted_at, updated_at, store_updated_at) in rows:
+        for value in (updated_at, store_updated_at):
+            if value is not None and (latest is None or value > latest):
+                latest = value
+        lat = parse_coordinate(lat, 90)
+        lng = parse_coordinate(lng, 180)
+        if deleted_at or store_deleted_at or lat is None or lng is None or \
+                (lat == 0 and lng == 0):
+            index.remove(address_id)
+            continue
+        index.add(StorePoint(
+            address_id, store_id, cnpj, name, city, state, lat, lng
+        ))
+    return latest
+
+
+_lock = threading.Lock()
+_index: Optional[GeoIndex] = None
+_state = {
+    'version': None, 'watermark': None, 'built_at': 0.0, 'rebuilding': False,
+}
+
+
+def _expired() -> bool:
+    return time.monotonic() - _state['built_at'] >= FULL_REBUILD_INTERVAL
+
+
+def _current(version) -> bool:
+    return _index is not None and _state['version'] == version and (
+        _state['rebuilding'] or not _expired()
+    )
+
+
+def build_index():
+    """Read every live row into a new index.
+
+    Returns:
+        tuple: (index, latest updated_at read)
+    """
+    index = GeoIndex()
+    return index, apply_rows(index, _rows(None))
+
+
+def _swap(index: GeoIndex, version, latest) -> None:
+    global _index
+    _state['built_at'] = time.monotonic()
+    _state['version'] = version
+    _state['watermark'] = latest
+    _index = index
+
+
+def _rebuild(version) -> None:
+    try:
+        index, latest = build_index()
+        with _lock:
+            _swap(index, version, latest)
+    except Exception as e:
+        logger.warning("Geo index rebuild failed: %s", e)
+    finally:
+        with _lock:
+            _state['rebuilding'] = False
+        connection.close()
+
+
+def get_geo_index() -> GeoIndex:
+    """
+    Return the process-wide index.
+
+    The first call builds it. Later calls apply the rows changed since the
+    last refresh when stores changed, and start a background full rebuild
+    once the index is older than `FULL_REBUILD_INTERVAL`.
+    """
+    global _index
+    version = get_version(STORES_VERSION)
+    if _current(version):
+        return _index
+
+    with _lock:
+        if _index is None:
+            index, latest = build_index()
+            _swap(index, version, latest)
+            return _index
+
+        if _expired() and not _state['rebuilding']:
+            # queries keep the current index until the new one is swapped in
+            _state['rebuilding'] = True
+            threading.Thread(
+                target=_rebuild, args=(version,), daemon=True
+            ).start()
+
+        if _state['version'] != version:
+            watermark = _state['watermark']
+            index = _index.copy()
+            latest = apply_rows(index, _rows(
+                None if watermark is None else watermark - WATERMARK_OVERLAP
+            ))
+            _state['version'] = version
+            _state['watermark'] = max(
+                filter(None, (watermark, latest)), default=None
+            )
+            _index = index
+    return _index
+
+
+def nearest_stores(lat: float, lng: float, k: int = 10,
+                   radius_km: float = DEFAULT_RADIUS_KM):
+    """Return up to `k` (distance km, StorePoint) of live stores."""
+    return get_geo_index().nearest(lat, lng, k, radius_km)
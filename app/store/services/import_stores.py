@@ -1,80 +1,135 @@
 """
 Module for store info imports from another systems, e.g cigam, shoplive, e-commerce...
 """
-import re
+import hashlib
 from django.core.cache import cache
 from core.services.cigam_client import CigamClient
+from core.services.documents import CNPJ, clean_document
 from store import models
-from core.model.ecomm_models import OurStores
+from store.services.active_stores import ActiveStoreIndex
+from store.services.bulk_loader import copy_upsert, soft_delete_missing
+from store.services.franchises import classify_store_names, get_matcher
+from store.services.lookup import invalidate_stores
 
 
 def detect_franchise_alias(store_name: str) -> str:
     """
     Detect franchise alias from store name.
-    Returns one of: STD, FRQ, LPF, OUT (default OUT if nothing matches).
+    Returns the alias of the first matching franchise rule, OUT if nothing
+    matches; see `store.services.franchises`.
     """
-    if not store_name:
-        return None
+    return get_matcher().alias(store_name)
 
-    name_upper = store_name.upper()
 
-    if "LPF" in name_upper:
-        return "LPF"
-    elif "FRQ" in name_upper:
-        return "FRQ"
-    elif "STD" in name_upper:
-        return "STD"
-    else:
-        return "OUT"
+def store_fingerprint(store: models.Stores) -> str:
+    """
+    Content hash of the Stores columns written by the Cigam import.
+    """
+    content = "\x1f".join(
+        str(value) if value is not None else ""
+        for value in (store.cigam_id, store.cnpj, store.name, store.franchise_id)
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
 
 
 class CigamStores:
     """Simplified client for fetching and processing Cigam API data."""
 
+    # {cigam_id: fingerprint} of the rows written by the last run
+    fingerprints_cache_key = 'cigam_store_fingerprints'
+
     def __init__(self):
         self.client = CigamClient()
 
-    def run_cigam_stores(self):
+    def run_cigam_stores(self, incremental=False):
+        """
+        Import Cigam stores into `stores`.
+
+        With `incremental=True`, rows whose content hash matches the one
+        stored by the previous run are not written at all, so their
+        trigger-maintained updated_at is left untouched.
+
+        Stores written by the import are revived if they were soft-deleted,
+        and every live store missing from the payload is soft-deleted with
+        one UPDATE.
+
+        Returns:
+            dict: copied, inserted and updated row counts from
+            `copy_upsert`, unchanged (skipped by the fingerprints or
+            identical in the table), rejected (invalid CNPJ) and deactivated
+            row counts
+        """
         try:
-            results_raw = self.client.get_data("CIGAM_LOJAS", {"credencial": "53587920250704"}) or []
+            results_raw = self.client.iter_data("CIGAM_LOJAS", {"credencial": "53587920250704"})
 
             results = []
             cnpj_list = []
-
-            # preload franchises {alias -> Franchise instance}
-            franchises = {f.alias: f for f in models.Franchises.objects.all()}
+            rejected = []
+            seen_ids = []
 
             for store in results_raw:
-                store_cnpj = re.sub(r'[^0-9]', '', str(store.get('numcnpj', ''))) if store.get('numcnpj') else ''
-                if len(store_cnpj) != 14:
+                seen_ids.append(store.get('codempresa'))
+                store_cnpj, reason = clean_document(store.get('numcnpj') or None, kinds=(CNPJ,))
+                if reason:
+                    rejected.append((store.get('codempresa'), reason))
                     continue
 
                 cnpj_list.append(store_cnpj)
 
-                # detect alias from store name
-                alias = detect_franchise_alias(store.get('nomfantasia'))
-
-                # get the Franchise from DB (may be None if alias missing)
-                franchise_id = franchises.get(alias)
-
                 results.append(models.Stores(
                     cigam_id=store.get('codempresa'),
                     cnpj=store_cnpj,
                     name=store.get('nomfantasia'),
-                    franchise_id=franchise_id.id if franchise_id else None
                 ))
 
-            if cnpj_list:
-                cache.set('active_stores', "','".join(f"{cnpj}" for cnpj in cnpj_list))
-
-            response = models.Stores.objects.bulk_create(
+            # classify every store name at once with the cached matcher
+            franchises = classify_store_names(store.name for store in results)
+            for store, (_, franchise_id) in zip(results, franchises):
+                store.franchise_id = franchise_id
+
+            previous = cache.get(self.fingerprints_cache_key) or {}
+            fingerprints = {
+                str(store.cigam_id): store_fingerprint(store) for store in results
+            }
+
+            total = len(results)
+            if incremental:
+                results = [
+                    store for store in results
+                    if previous.get(str(store.cigam_id)) != fingerprints[str(store.cigam_id)]
+                ]
+
+            loaded = copy_upsert(
+                models.Stores,
                 results,
-                update_conflicts=True,
-                update_fields=["cigam_id", "name", "franchise_id"],
-                unique_fields=["cigam_id"]
+                fields=["cigam_id", "cnpj", "name", "franchise_id", "deleted_at"],
+                conflict_fields=["cigam_id"],
+                update_fields=["name", "franchise_id", "deleted_at"]
             )
 
-            return response
+            # stores gone from Cigam, rejected ones are kept as they are
+            deactivated = soft_delete_missing(
+                models.Stores, "cigam_id", seen_ids, returning=["cnpj", "cigam_id"]
+            )
+
+            invalidate_stores(
+                cnpjs=[store.cnpj for store in results] + [row[0] for row in deactivated],
+                cigam_ids=[store.cigam_id for store in results] + [row[1] for row in deactivated]
+            )
+
+            cache.set(self.fingerprints_cache_key, fingerprints, timeout=None)
+            # only once the stores are written, so a failed run keeps the
+            # previous index
+            ActiveStoreIndex().refresh(cnpj_list)
+
+            return {
+                "copied": loaded["copied"],
+                "inserted": loaded["inserted"],
+                "updated": loaded["updated"],
+                "unchanged": total - loaded["written"],
+                "rejected": len(rejected),
+                "deactivated": len(deactivated),
+            }
 
         except Exception as e:
             raise e
@@ -82,57 +137,59 @@ class CigamStores:
 
 class EcommStores:
 		"""Simplified client for fetching and processing E-commerce store data."""
+
+		# rows fetched per round trip from the live_ecomm server-side cursor
+		chunk_size = 2000
+
 		def __init__(self, db_alias="live_ecomm"):
 				self.db_alias = db_alias
 
 		def get(self, *fields, **filters):
 				"""Return dicts with only the specified fields, optional filters"""
-				qs = OurStores.objects.using(self.db_alias).values(*fields)
+				qs = models.OurStores.objects.using(self.db_alias).values(*fields)
 				if filters:
 						qs = qs.filter(**filters)
 				return qs
 
+		def iter_stores(self):
+				"""
+				Stream normalized, de-duplicated (cnpj, status) rows in one pass.
+
+				The queryset is read through a server-side cursor, so only
+				`chunk_size` rows are held in memory besides the seen CNPJs.
+				"""
+				seen = self.seen = set()
+				self.rejected = []
+				stores = self.get("cnpj", "status", cnpj__isnull=False).values_list("cnpj", "status")
+				for cnpj_raw, status in stores.iterator(chunk_size=self.chunk_size):
+						cnpj, reason = clean_document(cnpj_raw, kinds=(CNPJ,))
+						if reason:
+								self.rejected.append((cnpj_raw, reason))
+								continue
+						if cnpj in seen:
+								continue
+
+						seen.add(cnpj)
+						yield cnpj, status
+
 		def run_ecomm_stores(self):
+				"""
+				Import e-commerce store statuses into `stores`.
+
+				Returns:
+						dict: {"copied", "written", "inserted", "updated"} from
+						`copy_upsert` and the number of "rejected" invalid CNPJs
+				"""
 				try:
-						stores = self.get("cnpj", "status", cnpj__isnull=False)
-
-						results = []
-
-						for store in stores:
-								cnpj_raw = str(store.get("cnpj", ""))
-								cnpj = re.sub(r"[^0-9]", "", cnpj_raw)
-								if len(cnpj) != 14:
-										continue
-
-								status = store.get("status")
-
-								results.append(models.Stores(
-										cnpj=cnpj,
-										status=status,
-								))
-						seen = set()
-						unique_results = []
-
-						for store in stores:
-								cnpj_raw = str(store.get("cnpj", ""))
-								cnpj = re.sub(r"[^0-9]", "", cnpj_raw)
-								if len(cnpj) != 14 or cnpj in seen:
-										continue
-
-								seen.add(cnpj)
-								status = store.get("status")
-
-								unique_results.append(models.Stores(
-										cnpj=cnpj,
-										status=status,
-								))
-
-						response = models.Stores.objects.bulk_create(
-								unique_results,
-								update_conflicts=True,
-								update_fields=["cnpj", "status"],
-								unique_fields=["cnpj"]
+						response = copy_upsert(
+								models.Stores,
+								self.iter_stores(),
+								fields=["cnpj", "status"],
+								conflict_fields=["cnpj"],
+								update_fields=["status"]
 						)
+						response["rejected"] = len(self.rejected)
+						invalidate_stores(cnpjs=self.seen)
 
 						return response
 
@@ -0,0 +1,343 @@
+"""
+Bulk ingestion of store social and address rows from CSV or NDJSON files.
+
+Files are parsed lazily and handled in chunks of `CHUNK_SIZE` rows. Every
+chunk resolves its `store_cnpj` values to stores with one batched
+`StoreLookup.get_many`, validates its rows against the model fields and
+loads the valid ones with `copy_upsert`. Invalid rows are reported with
+their line number and skipped; they never abort the rest of the file. A chunk
+the database rejects is loaded again one row at a time, so only the rows that
+fail are reported.
+
+The first record sets the columns of the whole file, like a CSV header, so
+NDJSON records whose keys differ from the first one are rejected.
+
+Social rows are upserted on `store_cnpj`: they are revived if they were
+soft-deleted and only the columns present in the file are written, so a file
+with `store_cnpj,email` updates just the emails. A store may have several
+addresses with no natural key, so an address file replaces the live addresses
+of every store it mentions: they are soft-deleted and the file's rows are
+inserted, in the same transaction as the chunk holding the store's first row.
+List all of a store's addresses together in one file.
+
+Lines that are not valid UTF-8 are reported as row errors like any other.
+"""
+import codecs
+import csv
+import json
+from typing import (
+    Any, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple,
+)
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import BooleanField, JSONField
+
+from core.services.documents import CNPJ, clean_document
+from core.services.versions import bump_version
+from store import models
+from store.services.bulk_loader import copy_upsert, soft_delete_matching
+from store.services.lookup import STORES_VERSION, StoreLookup
+
+FORMATS = ('csv', 'ndjson')
+
+# Rows resolved, validated and loaded together.
+CHUNK_SIZE = 5000
+# Errors kept in the result; the count covers them all.
+MAX_ERRORS = 1000
+
+_BOOLEANS = {
+    'true': True, 't': True, '1': True,
+    'false': False, 'f': False, '0': False,
+}
+
+
+class IngestTarget(NamedTuple):
+    model: type
+    # columns a file may carry besides store_cnpj
+    fields: Tuple[str, ...]
+    # unique key rows are upserted on
+    conflict_fields: Tuple[str, ...] = ()
+    # field whose existing rows are replaced instead, e.g. `store`
+    replace_by: Optional[str] = None
+
+
+TARGETS = {
+    'social': IngestTarget(
+        models.StoreSocial,
+        (
+            'status', 'name', 'coupon_id', 'email', 'phone', 'whatsapp',
+            'url', 'instagram', 'facebook', 'cover_photo', 'store_photo',
+            'working_days', 'working_hours',
+        ),
+        ('store_cnpj',),
+    ),
+    'addresses': IngestTarget(
+        models.StoreAdresses,
+        (
+            'status', 'zip_code', 'state', 'city', 'neighborhood', 'street',
+            'number', 'complement', 'lat', 'lng',
+        ),
+        replace_by='store',
+    ),
+}
+
+
+def guess_format(filename: str) -> Optional[str]:
+    """File format from a file name extension, None if unknown."""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+class _Lines:
+    """Lines of a binary file decoded as UTF-8.
+
+    Undecodable lines are decoded with replacement characters and their
+    numbers remembered in `invalid`, so the caller can reject them.
+    """
+
+    def __init__(self, file: IO[bytes]):
+        self.file = file
+        self.invalid = set()
+
+    def __iter__(self) -> Iterator[str]:
+        for number, data in enumerate(self.file, 1):
+            if number == 1 and data.startswith(codecs.BOM_UTF8):
+                data = data[len(codecs.BOM_UTF8):]
+            try:
+                yield data.decode('utf-8')
+            except UnicodeDecodeError:
+                self.invalid.add(number)
+                yield data.decode('utf-8', errors='replace')
+
+
+def read_records(file: IO[bytes], file_format: str
+                 ) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Parse a binary file lazily.
+
+    Returns:
+        Iterator of (line number, record dict or None, parse error or None)
+    """
+    lines = _Lines(file)
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        first = 2
+        for record in reader:
+            # a quoted value may span several lines
+            span = range(first, reader.line_num + 1)
+            first = reader.line_num + 1
+            if lines.invalid.intersection(span):
+                yield reader.line_num, None, 'invalid UTF-8'
+            elif None in record:
+                yield reader.line_num, None, 'too many values'
+            else:
+                yield reader.line_num, record, None
+    elif file_format == 'ndjson':
+        for number, line in enumerate(lines, 1):
+            if number in lines.invalid:
+                yield number, None, 'invalid UTF-8'
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, 'expected a JSON object'
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+
+class StoreDataIngest:
+    """Validate and upsert the rows of one file into one target table."""
+
+    def __init__(self, target: str, chunk_size: int = CHUNK_SIZE,
+                 lookup: Optional[StoreLookup] = None):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown ingest target: {target}")
+        self.target = TARGETS[target]
+        self.chunk_size = chunk_size
+        self.lookup = lookup or StoreLookup()
+        self.fields: Optional[List[str]] = None
+        # keys of the first record, which every other record must repeat
+        self.columns: Optional[set] = None
+        # stores whose rows were already replaced by this file
+        self.replaced = set()
+        self.result = {
+            'received': 0, 'copied': 0, 'written': 0, 'error_count': 0,
+            'errors': [],
+        }
+
+    def error(self, line: int, error: str, field: str = None) -> None:
+        self.result['error_count'] += 1
+        if len(self.result['errors']) < MAX_ERRORS:
+            self.result['errors'].append(
+                {'line': line, 'field': field, 'error': error}
+            )
+
+    def set_fields(self, columns: Iterable[str]) -> None:
+        """Load the target fields present in the first record."""
+        columns = list(columns)
+        if 'store_cnpj' not in columns:
+            raise ValueError('Missing column: store_cnpj')
+        unknown = set(columns) - set(self.target.fields) - {'store_cnpj'}
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        self.fields = [f for f in self.target.fields if f in columns]
+        self.columns = set(columns)
+
+    def check_columns(self, line: int, record: Dict) -> bool:
+        """Whether `record` has the columns of the first record."""
+        columns = set(record)
+        if columns == self.columns:
+            return True
+        differences = []
+        missing = self.columns - columns
+        if missing:
+            differences.append(f"missing {', '.join(sorted(missing))}")
+        extra = columns - self.columns
+        if extra:
+            differences.append(f"unexpected {', '.join(sorted(extra))}")
+        self.error(
+            line, f"keys differ from the first record: "
+            f"{'; '.join(differences)}"
+        )
+        return False
+
+    def clean_value(self, field, value):
+        if value == '' and field.null:
+            return None
+        if isinstance(field, BooleanField) and isinstance(value, str):
+            value = _BOOLEANS.get(value.strip().lower(), value)
+        if isinstance(field, JSONField) and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValidationError('Enter a valid JSON.')
+        return field.clean(value, None)
+
+    def clean_record(self, line: int, record: Dict) -> Optional[Dict]:
+        """Validated row values, or None after reporting its errors."""
+        row, valid = {}, True
+        for name in self.fields:
+            field = self.target.model._meta.get_field(name)
+            try:
+                row[name] = self.clean_value(field, record.get(name))
+            except ValidationError as e:
+                self.error(line, '; '.join(e.messages), name)
+                valid = False
+        return row if valid else None
+
+    def load_chunk(self, chunk: List[Tuple[int, Dict]]) -> None:
+        cnpjs = {}
+        for line, record in chunk:
+            cnpj, reason = clean_document(
+                record.get('store_cnpj'), kinds=(CNPJ,), check_digits=False
+            )
+            if reason:
+                self.error(line, reason, 'store_cnpj')
+            else:
+                cnpjs[line] = cnpj
+        stores = self.lookup.get_many(cnpjs.values())
+
+        rows, lines = [], []
+        for line, record in chunk:
+            if line not in cnpjs:
+                continue
+            store = stores.get(cnpjs[line])
+            if store is None:
+                self.error(line, 'unknown store', 'store_cnpj')
+                continue
+            if store['deleted_at'] is not None:
+                self.error(line, 'store is deleted', 'store_cnpj')
+                continue
+            row = self.clean_record(line, record)
+            if row is not None:
+                row.update(
+                    store_id=store['id'], store_cnpj=store['cnpj'],
+                    deleted_at=None,
+                )
+                rows.append(row)
+                lines.append(line)
+
+        if not rows:
+            return
+        try:
+            self.load_rows(rows)
+        except DatabaseError:
+            # the chunk was rolled back: find the rows the database rejects
+            for line, row in zip(lines, rows):
+                try:
+                    self.load_rows([row])
+                except DatabaseError as e:
+                    self.error(line, f"database error: {e}")
+
+    def load_rows(self, rows: List[Dict]) -> None:
+        """Replace or upsert `rows` in one transaction."""
+        fields = ['store', 'store_cnpj', *self.fields, 'deleted_at']
+        replace = set()
+        if self.target.replace_by:
+            key = self.target.model._meta.get_field(
+                self.target.replace_by
+            ).attname
+            replace = {row[key] for row in rows} - self.replaced
+        with transaction.atomic():
+            if replace:
+                soft_delete_matching(
+                    self.target.model, self.target.replace_by, replace
+                )
+            loaded = copy_upsert(
+                self.target.model, rows, fields=fields,
+                conflict_fields=list(self.target.conflict_fields),
+                update_fields=[
+                    f for f in fields
+                    if f not in self.target.conflict_fields
+                ],
+            )
+        self.replaced |= replace
+        self.result['copied'] += loaded['copied']
+        self.result['written'] += loaded['written']
+
+    def run(self, file: IO[bytes], file_format: str) -> Dict[str, Any]:
+        """
+        Ingest a CSV or NDJSON file.
+
+        Returns:
+            dict: received, copied and written row counts, error_count and
+            the first `MAX_ERRORS` errors as {line, field, error}
+        """
+        chunk = []
+        for line, record, error in read_records(file, file_format):
+            self.result['received'] += 1
+            if error:
+                self.error(line, error)
+                continue
+            if self.fields is None:
+                self.set_fields(record)
+            elif file_format == 'ndjson' and \
+                    not self.check_columns(line, record):
+                continue
+            chunk.append((line, record))
+            if len(chunk) >= self.chunk_size:
+                self.load_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.load_chunk(chunk)
+
+        if self.result['written']:
+            bump_version(STORES_VERSION)
+        return self.result
+
+
+def ingest_store_data(target: str, file: IO[bytes], file_format: str,
+                      chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    return StoreDataIngest(target, chunk_size).run(file, file_format)
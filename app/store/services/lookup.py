@@ -0,0 +1,167 @@
+"""
+Read-through cache for resolving stores by CNPJ or Cigam id.
+
+Store rows are cached under their CNPJ; Cigam ids are cached as pointers to
+the CNPJ, so a write only has to invalidate the CNPJ entries it touched.
+Lookups are batched: one `get_many` for the whole input plus one query for
+the misses. Unknown keys are cached too, for a shorter time, so repeated
+lookups of stores that do not exist stay off the database.
+
+Soft-deleted stores are resolved too; callers check `deleted_at`.
+
+Writers must call `invalidate_stores` for rows changed without signals
+(bulk upserts, COPY loads); `Stores.save()`/`delete()` are covered by the
+store signals. It also bumps the `stores` and `store_rows` versions, which the
+in-memory store indexes use to refresh themselves.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+from core.services.versions import bump_version
+from store import models
+
+# Version bumped whenever stores or their related rows are written.
+STORES_VERSION = 'stores'
+# Version bumped only when `stores` rows themselves are written, for indexes
+# that do not read the social and address rows.
+STORE_ROWS_VERSION = 'store_rows'
+
+# Seconds a found / unknown store stays cached.
+CACHE_TIMEOUT = 60 * 60
+NEGATIVE_TIMEOUT = 5 * 60
+
+STORE_FIELDS = (
+    'id', 'cnpj', 'cigam_id', 'franchise_id', 'status', 'name',
+    'name_legal', 'inaugurated_at', 'deleted_at',
+)
+
+# Cached in place of a row for keys the database does not know.
+_MISSING = '__missing__'
+
+
+def _cnpj_key(cnpj) -> str:
+    return f"store:cnpj:{cnpj}"
+
+
+def _cigam_key(cigam_id) -> str:
+    return f"store:cigam_id:{cigam_id}"
+
+
+def invalidate_stores(cnpjs: Iterable[str] = (),
+                      cigam_ids: Iterable[Any] = ()) -> None:
+    """Drop the cached entries of the given stores, found or unknown."""
+    keys = [_cnpj_key(cnpj) for cnpj in cnpjs if cnpj]
+    keys += [_cigam_key(cigam_id) for cigam_id in cigam_ids if cigam_id]
+    if keys:
+        cache.delete_many(keys)
+        bump_version(STORES_VERSION)
+        bump_version(STORE_ROWS_VERSION)
+
+
+class StoreLookup:
+    """Batched, cached store resolution."""
+
+    def __init__(self, timeout: int = CACHE_TIMEOUT,
+                 negative_timeout: int = NEGATIVE_TIMEOUT):
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+
+    def _query(self, field: str, values: List[Any]) -> List[Dict]:
+        return list(models.Stores.all_objects.filter(
+            **{f"{field}__in": values}
+        ).values(*STORE_FIELDS))
+
+    def _cache_rows(self, rows: List[Dict]) -> None:
+        entries = {}
+        for row in rows:
+            entries[_cnpj_key(row['cnpj'])] = row
+            if row['cigam_id']:
+                entries[_cigam_key(row['cigam_id'])] = row['cnpj']
+        if entries:
+            cache.set_many(entries, timeout=self.timeout)
+
+    def _cache_missing(self, keys: List[str]) -> None:
+        if keys:
+            cache.set_many(
+                dict.fromkeys(keys, _MISSING), timeout=self.negative_timeout
+            )
+
+    def get_many(self, cnpjs: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Resolve stores by CNPJ.
+
+        Returns:
+            dict: {cnpj: store values dict, or None when unknown}
+        """
+        cnpjs = list(dict.fromkeys(cnpjs))
+        cached = cache.get_many([_cnpj_key(cnpj) for cnpj in cnpjs])
+
+        result, misses = {}, []
+        for cnpj in cnpjs:
+            value = cached.get(_cnpj_key(cnpj))
+            if value is None:
+                misses.append(cnpj)
+            else:
+                result[cnpj] = None if value == _MISSING else value
+
+        if misses:
+            rows = self._query('cnpj', misses)
+            self._cache_rows(rows)
+            found = {row['cnpj']: row for row in rows}
+            self._cache_missing(
+                [_cnpj_key(cnpj) for cnpj in misses if cnpj not in found]
+            )
+            for cnpj in misses:
+                result[cnpj] = found.get(cnpj)
+
+        return result
+
+    def get_many_by_cigam_id(self, cigam_ids: Iterable[Any]
+                             ) -> Dict[str, Optional[Dict]]:
+        """
+        Resolve stores by Cigam id.
+
+        Returns:
+            dict: {cigam_id (str): store values dict, or None when unknown}
+        """
+        cigam_ids = list(dict.fromkeys(str(i) for i in cigam_ids))
+        pointers = cache.get_many([_cigam_key(i) for i in cigam_ids])
+
+        result, by_cnpj, misses = {}, {}, []
+        for cigam_id in cigam_ids:
+            cnpj = pointers.get(_cigam_key(cigam_id))
+            if cnpj is None:
+                misses.append(cigam_id)
+            elif cnpj == _MISSING:
+                result[cigam_id] = None
+            else:
+                by_cnpj[cigam_id] = cnpj
+
+        if by_cnpj:
+            stores = self.get_many(by_cnpj.values())
+            for cigam_id, cnpj in by_cnpj.items():
+                store = stores.get(cnpj)
+                # the pointer is stale if the store changed its Cigam id
+                if store and str(store['cigam_id']) == cigam_id:
+                    result[cigam_id] = store
+                else:
+                    misses.append(cigam_id)
+
+        if misses:
+            rows = self._query('cigam_id', misses)
+            self._cache_rows(rows)
+            found = {str(row['cigam_id']): row for row in rows}
+            self._cache_missing(
+                [_cigam_key(i) for i in misses if i not in found]
+            )
+            for cigam_id in misses:
+                result[cigam_id] = found.get(cigam_id)
+
+        return result
+
+    def get(self, cnpj: str) -> Optional[Dict]:
+        return self.get_many([cnpj])[cnpj]
+
+    def get_by_cigam_id(self, cigam_id: Any) -> Optional[Dict]:
+        return self.get_many_by_cigam_id([cigam_id])[str(cigam_id)]
@@ -0,0 +1,271 @@
+"""
+In-memory store search by name prefix, CNPJ fragment and fuzzy name.
+
+Every process keeps an index of the live stores, rebuilt in a background
+thread when the `store_rows` version changes (every import and store write
+bumps it, social and address writes do not), while searches keep using the
+previous index:
+
+- name prefixes: a sorted list of accent-folded name words searched with
+  `bisect`, so a prefix costs two binary searches;
+- CNPJ fragments: every CNPJ padded to a fixed width and joined into one
+  string, searched with `str.find` (digits only, so "11.222.3" works);
+- fuzzy names: a trigram index over the distinct name words. Every query
+  word is scored against its most similar word of a name, like pg_trgm's
+  `word_similarity`, so "pizaria" finds "Pizzaria Bella Napoli Centro".
+"""
+import logging
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from django.db import connection
+
+from core.services.versions import get_version
+from store import models
+from store.services.lookup import STORE_ROWS_VERSION
+
+logger = logging.getLogger(__name__)
+
+CNPJ_WIDTH = 20
+MIN_CNPJ_FRAGMENT = 3
+FUZZY_THRESHOLD = 0.3
+
+_non_alnum = re.compile(r'[^0-9a-z]+').sub
+_non_digits = re.compile(r'[^0-9]+').sub
+
+
+class SearchEntry(NamedTuple):
+    id: int
+    cnpj: str
+    name: Optional[str]
+    status: Optional[bool]
+    franchise_id: Optional[int]
+
+
+class SearchResult(NamedTuple):
+    entry: SearchEntry
+    match: str
+    score: float
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse punctuation to spaces."""
+    if not text:
+        return ''
+    folded = unicodedata.normalize('NFKD', text)
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return ' '.join(_non_alnum(' ', folded.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StoreSearchIndex:
+    """Prefix, CNPJ and trigram indexes over a list of stores."""
+
+    def __init__(self, entries: List[SearchEntry]):
+        self.entries = entries
+        self.names = [normalize(entry.name) for entry in entries]
+
+        words = []
+        # distinct name words, the stores using them and their trigrams
+        vocabulary: Dict[str, int] = {}
+        self.word_stores: List[List[int]] = []
+        self.word_trigrams: Dict[str, List[int]] = {}
+        self.word_trigram_counts: List[int] = []
+        for i, name in enumerate(self.names):
+            for word in set(name.split()):
+                words.append((word, i))
+                word_id = vocabulary.get(word)
+                if word_id is None:
+                    word_id = vocabulary[word] = len(self.word_stores)
+                    self.word_stores.append([])
+                    grams = trigrams(word)
+                    self.word_trigram_counts.append(len(grams))
+                    for gram in grams:
+                        self.word_trigrams.setdefault(gram, []).append(
+                            word_id
+                        )
+                self.word_stores[word_id].append(i)
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_entries = [i for _, i in words]
+
+        self.cnpjs = ''.join(
+            (entry.cnpj or '').ljust(CNPJ_WIDTH)[:CNPJ_WIDTH]
+            for entry in entries
+        )
+
+    def _prefix(self, prefix: str) -> Set[int]:
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\uffff', start)
+        return set(self.word_entries[start:end])
+
+    def search_prefix(self, query: str, limit: int) -> List[SearchResult]:
+        """Stores with a word starting with each word of `query`."""
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        matches = self._prefix(terms[0])
+        for term in terms[1:]:
+            if not matches:
+                break
+            matches &= self._prefix(term)
+
+        phrase = ' '.join(terms)
+        ranked = sorted(
+            matches,
+            key=lambda i: (not self.names[i].startswith(phrase),
+                           self.names[i])
+        )
+        return [
+            SearchResult(self.entries[i], 'prefix', 1.0)
+            for i in ranked[:limit]
+        ]
+
+    def search_cnpj(self, query: str, limit: int) -> List[SearchResult]:
+        """Stores whose CNPJ contains the digits of `query`."""
+        digits = _non_digits('', query)
+        if len(digits) < MIN_CNPJ_FRAGMENT:
+            return []
+        results, position = [], self.cnpjs.find(digits)
+        while position != -1 and len(results) < limit:
+            i, offset = divmod(position, CNPJ_WIDTH)
+            if offset + len(digits) <= CNPJ_WIDTH:
+                results.append(SearchResult(
+                    self.entries[i], 'cnpj', len(digits) / CNPJ_WIDTH
+                ))
+                position = self.cnpjs.find(digits, (i + 1) * CNPJ_WIDTH)
+            else:
+                position = self.cnpjs.find(digits, position + 1)
+        return results
+
+    def search_fuzzy(self, query: str, limit: int,
+                     threshold: float = FUZZY_THRESHOLD
+                     ) -> List[SearchResult]:
+        """Stores whose name words are similar to the words of `query`.
+
+        Each query word is scored by the trigram similarity of the most
+        similar word of the name, and a store by the mean over the query
+        words.
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return []
+
+        totals = Counter()
+        for term in terms:
+            grams = trigrams(term)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.word_trigrams.get(gram, ()))
+
+            best: Dict[int, float] = {}
+            for word_id, common in shared.items():
+                score = common / (
+                    len(grams) + self.word_trigram_counts[word_id] - common
+                )
+                if score < threshold:
+                    continue
+                for i in self.word_stores[word_id]:
+                    if score > best.get(i, 0):
+                        best[i] = score
+            totals.update(best)
+
+        scored = []
+        for i, total in totals.items():
+            score = total / len(terms)
+            if score >= threshold:
+                scored.append((score, i))
+        scored.sort(key=lambda item: (-item[0], self.names[item[1]]))
+        return [
+            SearchResult(self.entries[i], 'fuzzy', round(score, 3))
+            for score, i in scored[:limit]
+        ]
+
+    def search(self, query: str, limit: int = 20) -> List[SearchResult]:
+        """CNPJ search for numeric input, else prefix then fuzzy names."""
+        query = query.strip()
+        if not query:
+            return []
+        if not re.search(r'[^\W\d_]', query):
+            return self.search_cnpj(query, limit)
+
+        results = self.search_prefix(query, limit)
+        if len(results) < limit:
+            found = {result.entry.id for result in results}
+            results += [
+                result for result in self.search_fuzzy(query, limit)
+                if result.entry.id not in found
+            ][:limit - len(results)]
+        return results
+
+
+_lock = threading.Lock()
+_index: Optional[StoreSearchIndex] = None
+_state = {'version': None, 'rebuilding': False}
+
+
+def index_queryset():
+    return models.Stores.objects.values_list(
+        'id', 'cnpj', 'name', 'status', 'franchise_id'
+    )
+
+
+def build_index() -> StoreSearchIndex:
+    rows = index_queryset().iterator(chunk_size=2000)
+    return StoreSearchIndex([SearchEntry(*row) for row in rows])
+
+
+def _rebuild(version) -> None:
+    global _index
+    try:
+        index = build_index()
+        with _lock:
+            _index = index
+            _state['version'] = version
+    except Exception as e:
+        logger.warning("Store search index rebuild failed: %s", e)
+    finally:
+        with _lock:
+            _state['rebuilding'] = False
+        connection.close()
+
+
+def get_search_index() -> StoreSearchIndex:
+    """
+    Return the process-wide index.
+
+    The first call builds it; after a store write, the next call starts a
+    background rebuild and keeps serving the previous index until it is
+    swapped in.
+    """
+    global _index
+    version = get_version(STORE_ROWS_VERSION)
+    with _lock:
+        index = _index
+        if index is not None and (
+                _state['version'] == version or _state['rebuilding']):
+            return index
+        if index is not None:
+            _state['rebuilding'] = True
+
+    if index is not None:
+        threading.Thread(target=_rebuild, args=(version,), daemon=True).start()
+        return index
+
+    with _lock:
+        if _index is None:
+            _index = build_index()
+            _state['version'] = version
+        return _index
+
+
+def search_stores(query: str, limit: int = 20) -> List[SearchResult]:
+    return get_search_index().search(query, limit)
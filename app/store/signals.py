@@ -0,0 +1,29 @@
+"""
+Signal handlers keeping the store caches in sync with the database.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.services.versions import bump_version
+from store import models
+from store.services.franchises import FRANCHISES_VERSION
+from store.services.lookup import STORES_VERSION, invalidate_stores
+
+
+@receiver([post_save, post_delete], sender=models.Franchises)
+def franchises_changed(sender, **kwargs):
+    """Recompile the franchise matcher in every process."""
+    bump_version(FRANCHISES_VERSION)
+
+
+@receiver([post_save, post_delete], sender=models.Stores)
+def stores_changed(sender, instance, **kwargs):
+    """Drop the cached lookups of the saved or deleted store."""
+    invalidate_stores(cnpjs=[instance.cnpj], cigam_ids=[instance.cigam_id])
+
+
+@receiver([post_save, post_delete], sender=models.StoreAdresses)
+@receiver([post_save, post_delete], sender=models.StoreSocial)
+def store_details_changed(sender, **kwargs):
+    """Refresh the in-memory store indexes."""
+    bump_version(STORES_VERSION)
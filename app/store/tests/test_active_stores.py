@@ -0,0 +1,134 @@
+"""
+Tests for the active store index.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from store.services import active_stores
+from store.services.active_stores import ActiveStoreIndex
+
+
+class FakeRedis:
+    """In-memory stand-in for the sorted set commands used by the index."""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zscore(self, key, member):
+        return self.data.get(key, {}).get(member)
+
+    def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    def zscan_iter(self, key):
+        return iter(self.data.get(key, {}).items())
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+        return queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ActiveStoreIndexTests(SimpleTestCase):
+    """Test refresh, membership and filters."""
+
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(
+            active_stores, 'get_redis_connection', return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = ActiveStoreIndex()
+
+    def test_refresh_swaps_index(self):
+        """Test a refresh replaces the previous members atomically."""
+        self.index.refresh(['1', '2'], seen_at=10)
+        self.assertEqual(self.index.refresh(['2', '3', '3'], seen_at=20), 2)
+
+        self.assertFalse(self.index.is_active('1'))
+        self.assertTrue(self.index.is_active('3'))
+        self.assertEqual(self.index.last_seen('2'), 20)
+        self.assertEqual(list(self.redis.data), [self.index.key])
+
+    def test_empty_refresh_keeps_index(self):
+        """Test an empty import does not clear the index."""
+        self.index.refresh(['1'])
+        self.assertEqual(self.index.refresh([]), 0)
+        self.assertTrue(self.index.is_active('1'))
+
+    def test_active_many_is_one_round_trip(self):
+        """Test a batch of checks is pipelined."""
+        self.index.refresh(['1', '2'])
+        self.redis.round_trips = 0
+
+        result = self.index.active_many(['1', '3', '2'])
+
+        self.assertEqual(result, {'1': True, '3': False, '2': True})
+        self.assertEqual(self.redis.round_trips, 1)
+
+    def test_legacy_key_is_kept(self):
+        """Test the legacy joined string follows every refresh."""
+        self.index.refresh(['1', '2', '1'])
+        self.assertEqual(cache.get('active_stores'), "1','2")
+
+        self.index.refresh([])
+        self.assertEqual(cache.get('active_stores'), "1','2")
+
+    def test_filter_checks_given_cnpjs(self):
+        """Test the queryset filter keeps the active CNPJs given."""
+        self.index.refresh(['1', '2', '3'])
+        self.redis.round_trips = 0
+
+        q = self.index.filter(['2', '4', '1'], 'store_cnpj')
+
+        self.assertEqual(q.children, [('store_cnpj__in', ['2', '1'])])
+        self.assertEqual(self.redis.round_trips, 1)
+
+    def test_stores_are_queried_in_batches(self):
+        """Test active stores are fetched a batch of CNPJs at a time."""
+        self.index.refresh(['1', '2', '3'])
+
+        with mock.patch.object(
+            active_stores.models.Stores.objects, 'filter',
+            side_effect=lambda cnpj__in: list(cnpj__in)
+        ) as patched_filter:
+            stores = list(self.index.stores(batch_size=2))
+
+        self.assertEqual(stores, ['1', '2', '3'])
+        self.assertEqual(
+            [c.kwargs['cnpj__in'] for c in patched_filter.call_args_list],
+            [['1', '2'], ['3']]
+        )
@@ -0,0 +1,194 @@
+"""
+Tests for the COPY staging-table loader.
+"""
+import contextlib
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from store import models
+from store.services import bulk_loader
+from store.services.bulk_loader import (
+    _CopyStream,
+    _format,
+    copy_upsert,
+    soft_delete_missing,
+)
+
+
+class FakeCursor:
+    """Cursor recording the SQL and the COPY payload."""
+
+    def __init__(self):
+        self.statements = []
+        self.copied = b''
+        self.rowcount = 0
+        self.cursor = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        self.params = params
+        if sql.startswith(('INSERT', 'UPDATE')):
+            self.rowcount = 2
+
+    def fetchone(self):
+        return (2, 0)
+
+    def fetchall(self):
+        return [('1' * 14, '7'), ('2' * 14, '8')]
+
+    def copy_expert(self, sql, stream):
+        self.statements.append(sql)
+        while True:
+            data = stream.read(8)
+            if not data:
+                break
+            self.copied += data
+
+
+class CopyFormatTests(SimpleTestCase):
+    """Test COPY text rendering."""
+
+    def test_escapes_and_nulls(self):
+        """Test special characters are escaped and None becomes \\N."""
+        self.assertEqual(_format(None), '\\N')
+        self.assertEqual(_format(True), 't')
+        self.assertEqual(_format('a\tb\nc\\'), 'a\\tb\\nc\\\\')
+        self.assertEqual(_format(12), '12')
+
+    def test_stream_reads_in_chunks(self):
+        """Test the stream yields every row across small reads."""
+        stream = _CopyStream([(1, 'a'), (2, None)])
+        data = b''
+        while True:
+            chunk = stream.read(3)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 3)
+            data += chunk
+        self.assertEqual(data, b'1\ta\n2\t\\N\n')
+        self.assertEqual(stream.count, 2)
+
+
+class PatchedConnectionTestCase(SimpleTestCase):
+    """Run loader functions against a `FakeCursor`."""
+
+    cursor_class = FakeCursor
+
+    def call_patched(self, func, *args, **kwargs):
+        cursor = self.cursor_class()
+        connection = mock.MagicMock()
+        connection.ops.quote_name = lambda name: f'"{name}"'
+        connection.cursor.return_value = cursor
+        with mock.patch.object(
+            bulk_loader, 'connections', {'default': connection}
+        ), mock.patch.object(
+            bulk_loader.transaction, 'atomic',
+            lambda using: contextlib.nullcontext()
+        ):
+            result = func(*args, **kwargs)
+        return result, cursor
+
+
+class CopyUpsertTests(PatchedConnectionTestCase):
+    """Test the statements issued by `copy_upsert`."""
+
+    def run_upsert(self, rows, **kwargs):
+        return self.call_patched(copy_upsert, models.Stores, rows, **kwargs)
+
+    def test_upsert_merges_from_staging(self):
+        """Test rows are copied and merged with a single upsert."""
+        rows = [
+            models.Stores(cigam_id=1, cnpj='1' * 14, name='A'),
+            {'cigam_id': 2, 'cnpj': '2' * 14, 'name': 'B\tC',
+             'franchise_id': 3},
+        ]
+        result, cursor = self.run_upsert(
+            rows,
+            fields=['cigam_id', 'cnpj', 'name', 'franchise_id'],
+            conflict_fields=['cigam_id'],
+            update_fields=['name', 'franchise_id'],
+        )
+
+        self.assertEqual(
+            result, {'copied': 2, 'written': 2, 'inserted': 2, 'updated': 0}
+        )
+        self.assertEqual(
+            cursor.copied,
+            b'1\t' + b'1' * 14 + b'\tA\t\\N\n'
+            b'2\t' + b'2' * 14 + b'\tB\\tC\t3\n'
+        )
+        create, alter, copy, insert = cursor.statements
+        self.assertIn('CREATE TEMP TABLE "_staging_stores_', create)
+        self.assertIn('ON COMMIT DROP', create)
+        self.assertIn('_seq bigserial', alter)
+        self.assertIn('FROM STDIN', copy)
+        self.assertIn('RETURNING (xmax = 0) AS inserted', insert)
+        self.assertIn('DISTINCT ON ("cigam_id")', insert)
+        self.assertIn('ON CONFLICT ("cigam_id") DO UPDATE SET', insert)
+        self.assertIn('IS DISTINCT FROM', insert)
+        self.assertNotIn('"cnpj" = EXCLUDED', insert)
+
+    def test_insert_only_without_conflict_fields(self):
+        """Test no ON CONFLICT clause is added without conflict fields."""
+        _, cursor = self.run_upsert(
+            iter([('1' * 14, True)]), fields=['cnpj', 'status']
+        )
+        self.assertNotIn('ON CONFLICT', cursor.statements[-1])
+
+    def test_json_values_are_encoded(self):
+        """Test JSONField values reach COPY as JSON text, strings included."""
+        rows = [
+            {'store_cnpj': '1', 'working_days': 'mon'},
+            {'store_cnpj': '2', 'working_days': '["mon"]'},
+            {'store_cnpj': '3', 'working_days': ['mon', 'tue']},
+            {'store_cnpj': '4', 'working_days': {'open': '8\t18'}},
+            {'store_cnpj': '5', 'working_days': None},
+        ]
+        _, cursor = self.call_patched(
+            copy_upsert, models.StoreSocial, rows,
+            fields=['store_cnpj', 'working_days'],
+            conflict_fields=['store_cnpj'],
+        )
+
+        self.assertEqual(cursor.copied.decode().splitlines(), [
+            '1\t"mon"',
+            '2\t"[\\\\"mon\\\\"]"',
+            '3\t["mon", "tue"]',
+            '4\t{"open": "8\\\\t18"}',
+            '5\t\\N',
+        ])
+        self.assertIn('"working_days" = EXCLUDED."working_days"',
+                      cursor.statements[-1])
+
+
+class SoftDeleteMissingTests(PatchedConnectionTestCase):
+    """Test the set-based soft delete."""
+
+    def test_missing_rows_deleted_in_one_update(self):
+        """Test one UPDATE soft-deletes rows absent from the import."""
+        result, cursor = self.call_patched(
+            soft_delete_missing, models.Stores, 'cigam_id', [1, '2', None, 1],
+            returning=['cnpj', 'cigam_id']
+        )
+
+        self.assertEqual(len(result), 2)
+        [update] = cursor.statements
+        self.assertTrue(update.startswith('UPDATE "stores" SET'))
+        self.assertIn('"deleted_at" IS NULL', update)
+        self.assertIn('NOT ("cigam_id"::text = ANY(%s))', update)
+        self.assertIn('RETURNING "cnpj", "cigam_id"', update)
+        self.assertEqual(sorted(cursor.params[0]), ['1', '2'])
+
+    def test_empty_import_deletes_nothing(self):
+        """Test an empty import never soft-deletes the table."""
+        result, cursor = self.call_patched(
+            soft_delete_missing, models.Stores, 'cigam_id', []
+        )
+        self.assertEqual((result, cursor.statements), ([], []))
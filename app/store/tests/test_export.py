@@ -0,0 +1,165 @@
+"""
+Tests for the store export.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.services import export
+
+EXPORT_URL = reverse('store:export')
+
+
+def make_row(store_id, **values):
+    row = dict.fromkeys(export.COLUMNS)
+    row.update(id=store_id, cnpj=f'{store_id:014d}', **values)
+    return tuple(row[column] for column in export.COLUMNS)
+
+
+ROWS = [
+    make_row(
+        1, name='Loja, "Centro"', status=True,
+        inaugurated_at=date(2020, 5, 1),
+        updated_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        working_days=['mon', 'tue'], city='São Paulo',
+    ),
+    make_row(2, name='Loja Batel', status=False),
+]
+
+
+def decode(chunks):
+    return b''.join(chunks).decode()
+
+
+class ExportStreamTests(SimpleTestCase):
+    """Test the CSV/NDJSON encoding of exported rows."""
+
+    def test_export_queryset_joins_live_related_rows(self):
+        """Test related rows are LEFT JOINed with their soft-delete check."""
+        sql = str(export.export_queryset().query)
+
+        self.assertIn('LEFT OUTER JOIN "store_social"', sql)
+        self.assertIn('LEFT OUTER JOIN "store_adresses"', sql)
+        self.assertIn('"deleted_at" IS NULL)', sql)
+
+    def test_csv(self):
+        """Test CSV output has a header and quotes values."""
+        content = decode(export.export_stores('csv', rows=ROWS))
+        records = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['name'], 'Loja, "Centro"')
+        self.assertEqual(records[0]['city'], 'São Paulo')
+        self.assertEqual(records[0]['working_days'], '["mon", "tue"]')
+        self.assertEqual(records[1]['email'], '')
+
+    def test_ndjson(self):
+        """Test NDJSON output has one JSON object per row."""
+        content = decode(export.export_stores('ndjson', rows=ROWS))
+        records = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(records[0]['inaugurated_at'], '2020-05-01')
+        self.assertEqual(records[0]['updated_at'], '2024-01-02T03:04:05Z')
+        self.assertEqual(records[0]['working_days'], ['mon', 'tue'])
+        self.assertIsNone(records[1]['email'])
+
+    def test_gzip(self):
+        """Test the gzip stream decompresses to the plain stream."""
+        plain = b''.join(export.export_stores('ndjson', rows=ROWS))
+        compressed = b''.join(
+            export.export_stores('ndjson', compress=True, rows=ROWS)
+        )
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_rows_are_read_lazily(self):
+        """Test rows are consumed chunk by chunk, not all at once."""
+        consumed = []
+
+        def rows():
+            for i in range(1, 1001):
+                consumed.append(i)
+                yield make_row(i)
+
+        chunks = export.export_stores('csv', rows=rows(), chunk_bytes=1024)
+        next(chunks)
+
+        self.assertLess(len(consumed), 100)
+        self.assertGreater(len(b''.join(chunks)), 1024)
+        self.assertEqual(len(consumed), 1000)
+
+    def test_unknown_format(self):
+        """Test an unknown format is rejected."""
+        with self.assertRaises(ValueError):
+            export.export_stores('xml', rows=[])
+
+
+@mock.patch.object(export, 'export_rows', return_value=ROWS)
+class ExportApiTests(SimpleTestCase):
+    """Test the export endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            SimpleNamespace(is_authenticated=True)
+        )
+
+    def test_csv_download(self, export_rows):
+        """Test the export streams a CSV attachment."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('stores.csv', res['Content-Disposition'])
+        content = decode(res.streaming_content)
+        self.assertTrue(content.startswith('id,cnpj,'))
+
+    def test_gzip_ndjson_download(self, export_rows):
+        """Test the export can be gzip-compressed NDJSON."""
+        res = self.client.get(
+            EXPORT_URL, {'file_format': 'ndjson', 'gzip': 'true'}
+        )
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertIn('stores.ndjson.gz', res['Content-Disposition'])
+        lines = gzip.decompress(b''.join(res.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_invalid_format(self, export_rows):
+        """Test an unknown format is rejected."""
+        res = self.client.get(EXPORT_URL, {'file_format': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportCommandTests(SimpleTestCase):
+    """Test the export_stores command."""
+
+    @mock.patch.object(export, 'export_rows', return_value=ROWS)
+    def test_writes_output_file(self, export_rows):
+        """Test the command writes the gzip export to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stores.csv.gz')
+            out = io.StringIO()
+            call_command(
+                'export_stores', '--gzip', '--include-deleted',
+                f'--output={path}', stdout=out
+            )
+            with gzip.open(path, 'rt') as exported:
+                records = list(csv.DictReader(exported))
+
+        export_rows.assert_called_once_with(True, export.FETCH_SIZE)
+        self.assertEqual([r['id'] for r in records], ['1', '2'])
+        self.assertIn('Exported stores', out.getvalue())
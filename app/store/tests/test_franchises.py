@@ -0,0 +1,109 @@
+"""
+Tests for the franchise classifier.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.services.versions import bump_version
+from store import signals
+from store.services import franchises
+from store.services.franchises import (
+    FRANCHISES_VERSION,
+    FranchiseMatcher,
+    FranchiseRule,
+)
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+RULES = [
+    FranchiseRule(1, 'STD', [], 1),
+    FranchiseRule(2, 'FRQ', [], 2),
+    FranchiseRule(3, 'LPF', ['LPF', 'live pro'], 3),
+    FranchiseRule(4, 'OUT', [], 0),
+]
+
+
+class FranchiseMatcherTests(SimpleTestCase):
+    """Test compiled franchise rules."""
+
+    def setUp(self):
+        self.matcher = FranchiseMatcher(RULES)
+
+    def test_priority_wins_over_position(self):
+        """Test the highest priority rule wins wherever it matches."""
+        self.assertEqual(self.matcher.alias('STD Shopping LPF'), 'LPF')
+        self.assertEqual(self.matcher.alias('frq centro std'), 'FRQ')
+        self.assertEqual(self.matcher.alias('Loja Live Pro'), 'LPF')
+
+    def test_default_alias(self):
+        """Test unmatched names get OUT and empty names None."""
+        self.assertEqual(self.matcher.alias('Outlet Norte'), 'OUT')
+        self.assertIsNone(self.matcher.alias(''))
+
+    def test_classify_batch(self):
+        """Test a batch returns aliases and franchise ids in order."""
+        self.assertEqual(
+            self.matcher.classify(['STD Sul', None, 'Qualquer']),
+            [('STD', 1), (None, None), ('OUT', 4)]
+        )
+
+    def test_equal_priorities_keep_input_order(self):
+        """Test ties are broken by the order the rules come in."""
+        matcher = FranchiseMatcher([
+            FranchiseRule(1, 'LPF', [], 0), FranchiseRule(2, 'STD', [], 0),
+        ])
+        self.assertEqual(matcher.alias('STD LPF'), 'LPF')
+
+    def test_from_db_reads_active_rules_in_order(self):
+        """Test active rules are read in a deterministic order."""
+        with mock.patch.object(franchises.models.Franchises, 'objects') as qs:
+            active = qs.filter.return_value
+            active.order_by.return_value.values_list.return_value = [
+                (3, 'LPF', [], 30), (1, 'STD', [], 10),
+            ]
+            matcher = FranchiseMatcher.from_db()
+
+        qs.filter.assert_called_once_with(status=True)
+        active.order_by.assert_called_once_with('-priority', 'id')
+        self.assertEqual(matcher.alias('STD LPF'), 'LPF')
+
+    def test_no_rules(self):
+        """Test an empty table classifies everything as OUT."""
+        self.assertEqual(
+            FranchiseMatcher([]).classify(['STD']), [('OUT', None)]
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GetMatcherTests(SimpleTestCase):
+    """Test the per-process matcher cache."""
+
+    def setUp(self):
+        franchises._matcher = None
+        patcher = mock.patch.object(
+            FranchiseMatcher, 'from_db',
+            side_effect=lambda: FranchiseMatcher(RULES)
+        )
+        self.from_db = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matcher_reused_until_version_bumped(self):
+        """Test the rules are loaded once and reloaded after a change."""
+        first = franchises.get_matcher()
+        self.assertIs(franchises.get_matcher(), first)
+        self.assertEqual(self.from_db.call_count, 1)
+
+        bump_version(FRANCHISES_VERSION)
+
+        self.assertIsNot(franchises.get_matcher(), first)
+        self.assertEqual(self.from_db.call_count, 2)
+
+    def test_signal_handler_bumps_version(self):
+        """Test saving a franchise invalidates the matcher."""
+        franchises.get_matcher()
+        signals.franchises_changed(sender=None)
+        franchises.get_matcher()
+        self.assertEqual(self.from_db.call_count, 2)
@@ -0,0 +1,240 @@
+"""
+Tests for the nearest store search.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.services import geo
+from store.services.geo import (
+    GeoIndex,
+    StorePoint,
+    apply_rows,
+    haversine_km,
+    parse_coordinate,
+)
+
+NEAREST_URL = reverse('store:nearest')
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+UPDATED_AT = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def row(address_id, lat, lng, store_id=None, deleted=False,
+        store_deleted=False, updated_at=UPDATED_AT, store_updated_at=None):
+    return (
+        address_id, store_id or address_id, f'{address_id:014d}',
+        f'Loja {address_id}', 'São Paulo', 'SP', lat, lng,
+        'yesterday' if deleted else None,
+        'yesterday' if store_deleted else None,
+        updated_at, store_updated_at,
+    )
+
+
+class GeoHelpersTests(SimpleTestCase):
+    """Test coordinate parsing and distances."""
+
+    def test_parse_coordinate(self):
+        """Test text coordinates are parsed and invalid ones dropped."""
+        self.assertEqual(parse_coordinate(' -23,5505 ', 90), -23.5505)
+        self.assertEqual(parse_coordinate('-46.63', 180), -46.63)
+        self.assertIsNone(parse_coordinate('', 90))
+        self.assertIsNone(parse_coordinate('abc', 90))
+        self.assertIsNone(parse_coordinate('91', 90))
+        self.assertIsNone(parse_coordinate('nan', 90))
+
+    def test_haversine(self):
+        """Test São Paulo to Rio de Janeiro is about 360 km."""
+        distance = haversine_km(-23.5505, -46.6333, -22.9068, -43.1729)
+        self.assertAlmostEqual(distance, 361, delta=5)
+
+
+class GeoIndexTests(SimpleTestCase):
+    """Test grid queries."""
+
+    def setUp(self):
+        self.index = GeoIndex()
+        apply_rows(self.index, [
+            row(1, '-23.5505', '-46.6333'),
+            row(2, '-23.5605', '-46.6433'),
+            row(3, '-22.9068', '-43.1729'),
+            row(4, '-23.5506', '-46.6334', deleted=True),
+            row(5, '', '-46.6'),
+            row(6, '-23.5510', '-46.6340', store_id=1),
+        ])
+
+    def test_nearest_within_radius(self):
+        """Test results are sorted, filtered by radius and deduplicated."""
+        results = self.index.nearest(-23.55, -46.63, k=10, radius_km=50)
+
+        self.assertEqual([p.store_id for _, p in results], [1, 2])
+        self.assertLess(results[0][0], results[1][0])
+
+    def test_large_radius_and_k(self):
+        """Test k limits the results and a large radius reaches Rio."""
+        results = self.index.nearest(-23.55, -46.63, k=3, radius_km=500)
+        self.assertEqual([p.store_id for _, p in results], [1, 2, 3])
+        self.assertEqual(
+            len(self.index.nearest(-23.55, -46.63, k=1, radius_km=500)), 1
+        )
+
+    def test_rows_update_and_remove_points(self):
+        """Test applying changed rows moves and drops points."""
+        apply_rows(self.index, [
+            row(1, '-22.9', '-43.17'),
+            row(2, '-23.5605', '-46.6433', deleted=True),
+        ])
+
+        results = self.index.nearest(-23.55, -46.63, radius_km=50)
+        self.assertEqual([p.address_id for _, p in results], [6])
+        self.assertNotIn(2, self.index.points)
+
+    def test_deleted_stores_are_removed(self):
+        """Test addresses of soft-deleted stores are not indexed."""
+        apply_rows(self.index, [
+            row(1, '-23.5505', '-46.6333', store_deleted=True),
+            row(2, '-23.5605', '-46.6433', deleted=True),
+        ])
+
+        self.assertNotIn(1, self.index.points)
+        self.assertNotIn(2, self.index.points)
+        self.assertIn(6, self.index.points)
+
+    def test_apply_rows_returns_latest_update(self):
+        """Test the latest address or store updated_at read is returned."""
+        later = UPDATED_AT + timedelta(hours=1)
+
+        latest = apply_rows(GeoIndex(), [
+            row(1, '-23.5', '-46.6'),
+            row(2, '-23.5', '-46.6', updated_at=None, store_updated_at=later),
+        ])
+
+        self.assertEqual(latest, later)
+        self.assertIsNone(apply_rows(GeoIndex(), []))
+
+    def test_query_speed(self):
+        """Test a query over 50k stores stays in the millisecond range."""
+        rng = random.Random(1)
+        index = GeoIndex()
+        for i in range(50000):
+            index.add(StorePoint(
+                i, i, str(i), None, None, None,
+                rng.uniform(-30, -5), rng.uniform(-55, -35)
+            ))
+        started = time.perf_counter()
+        for _ in range(20):
+            index.nearest(-23.55, -46.63, k=10, radius_km=50)
+        self.assertLess((time.perf_counter() - started) / 20, 0.05)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GeoIndexRefreshTests(SimpleTestCase):
+    """Test the incremental refresh of the process index."""
+
+    def setUp(self):
+        self.reads = []
+        self.batches = []
+        for target, kwargs in (
+            ('_index', {'new': None}),
+            ('_state', {'new': {
+                'version': None, 'watermark': None, 'built_at': 0.0,
+                'rebuilding': False,
+            }}),
+            ('_rows', {'side_effect': self._rows}),
+            ('get_version', {'side_effect': lambda name: len(self.reads)}),
+        ):
+            patcher = mock.patch.object(geo, target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _rows(self, since):
+        self.reads.append(since)
+        return self.batches.pop(0)
+
+    def test_watermark_comes_from_rows_read(self):
+        """Test refreshes read from the last row seen minus the overlap."""
+        later = UPDATED_AT + timedelta(minutes=30)
+        self.batches = [
+            [row(1, '-23.5', '-46.6')],
+            [row(2, '-23.5', '-46.6', updated_at=later)],
+            [],
+            [],
+        ]
+
+        geo.get_geo_index()
+        geo.get_geo_index()
+        geo.get_geo_index()
+        index = geo.get_geo_index()
+
+        overlap = geo.WATERMARK_OVERLAP
+        self.assertEqual(self.reads, [
+            None, UPDATED_AT - overlap, later - overlap, later - overlap,
+        ])
+        self.assertEqual(sorted(index.points), [1, 2])
+
+    def test_expired_index_rebuilds_in_background(self):
+        """Test an expired index is still served while it is rebuilt."""
+        self.batches = [[row(1, '-23.5', '-46.6')], [row(2, '-23.5', '-46.6')]]
+        geo.get_version.side_effect = lambda name: 1
+        first = geo.get_geo_index()
+        geo._state['built_at'] -= geo.FULL_REBUILD_INTERVAL
+
+        with mock.patch.object(geo.threading, 'Thread') as thread:
+            self.assertIs(geo.get_geo_index(), first)
+            self.assertIs(geo.get_geo_index(), first)
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual(self.reads, [None])
+
+        with mock.patch.object(geo.connection, 'close'):
+            geo._rebuild(*thread.call_args.kwargs['args'])
+        index = geo.get_geo_index()
+
+        self.assertIsNot(index, first)
+        self.assertEqual(sorted(index.points), [2])
+        self.assertFalse(geo._state['rebuilding'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NearestStoreApiTests(SimpleTestCase):
+    """Test the nearest store endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            SimpleNamespace(is_authenticated=True)
+        )
+        index = GeoIndex()
+        apply_rows(index, [row(1, '-23.5505', '-46.6333')])
+        patcher = mock.patch.object(geo, 'get_geo_index', return_value=index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_nearest(self):
+        """Test the closest stores are returned with their distance."""
+        res = self.client.get(NEAREST_URL, {'lat': -23.55, 'lng': -46.63})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['store_id'], 1)
+        self.assertLess(res.data[0]['distance_km'], 1)
+
+    def test_invalid_point(self):
+        """Test out of range coordinates are rejected."""
+        res = self.client.get(NEAREST_URL, {'lat': 100, 'lng': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_auth_required(self):
+        """Test authentication is required."""
+        res = APIClient().get(NEAREST_URL, {'lat': 0, 'lng': 0})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
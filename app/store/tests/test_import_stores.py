@@ -0,0 +1,176 @@
+"""
+Tests for the Cigam and e-commerce store imports.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import override_settings
+
+from store.services import import_stores
+from store.services.import_stores import CigamStores, EcommStores
+from store.tests.test_bulk_loader import FakeCursor, PatchedConnectionTestCase
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+class CountingCursor(FakeCursor):
+    """FakeCursor inserting the copied rows whose cigam_id is not in
+    `existing` and updating the others, like a table where they differ."""
+
+    def __init__(self, existing):
+        super().__init__()
+        self.existing = existing
+        self.written = (0, 0)
+
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        if 'INSERT INTO' in sql:
+            ids = [line.split(b'\t')[0] for line in self.copied.splitlines()]
+            updated = sum(cigam_id in self.existing for cigam_id in ids)
+            self.written = (len(ids) - updated, updated)
+            self.existing.update(ids)
+
+    def fetchone(self):
+        return self.written
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CigamStoresTests(PatchedConnectionTestCase):
+    """Test the Cigam import counts and its incremental mode."""
+
+    def cursor_class(self):
+        return CountingCursor(self.existing)
+
+    def setUp(self):
+        cache.clear()
+        self.existing = set()
+        self.payload = [
+            {'codempresa': '1', 'numcnpj': '12345678000195',
+             'nomfantasia': 'LIVE! A'},
+            {'codempresa': '2', 'numcnpj': '11222333000181',
+             'nomfantasia': 'LIVE! B'},
+            {'codempresa': '3', 'numcnpj': '11444777000161',
+             'nomfantasia': 'LIVE! C'},
+            {'codempresa': '4', 'numcnpj': '123', 'nomfantasia': 'BAD'},
+        ]
+        for name, kwargs in (
+            ('CigamClient', {}),
+            ('ActiveStoreIndex', {}),
+            ('invalidate_stores', {}),
+            ('classify_store_names', {
+                'side_effect': lambda names: [('STD', 1) for _ in names],
+            }),
+        ):
+            patcher = mock.patch.object(import_stores, name, **kwargs)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def run_import(self, incremental=False):
+        importer = CigamStores()
+        importer.client.iter_data.return_value = iter(self.payload)
+        return self.call_patched(
+            importer.run_cigam_stores, incremental=incremental
+        )
+
+    def test_counts_come_from_the_loader(self):
+        """Test inserted and updated rows are the ones copy_upsert reports."""
+        result, cursor = self.run_import()
+
+        self.assertEqual(cursor.copied.count(b'\n'), 3)
+        self.assertEqual(result, {
+            'copied': 3, 'inserted': 3, 'updated': 0, 'unchanged': 0,
+            'rejected': 1, 'deactivated': 2,
+        })
+
+        self.payload[0]['nomfantasia'] = 'LIVE! A2'
+        self.payload.append({
+            'codempresa': '5', 'numcnpj': '11222333000262',
+            'nomfantasia': 'LIVE! E',
+        })
+        result, _ = self.run_import(incremental=True)
+
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['unchanged'], 2)
+
+    def test_incremental_skips_unchanged_fingerprints(self):
+        """Test only rows whose fingerprint changed are copied again."""
+        self.run_import()
+        self.payload[1]['nomfantasia'] = 'LIVE! B2'
+
+        result, cursor = self.run_import(incremental=True)
+
+        self.assertEqual(
+            cursor.copied, b'2\t11222333000181\tLIVE! B2\t1\t\\N\n'
+        )
+        self.assertEqual(result['copied'], 1)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['unchanged'], 2)
+
+    def test_full_run_copies_everything(self):
+        """Test without incremental every valid row is copied again."""
+        self.run_import()
+
+        result, _ = self.run_import()
+
+        self.assertEqual(result['copied'], 3)
+
+    def test_active_index_follows_the_upsert(self):
+        """Test the active index is refreshed only after stores are written."""
+        self.run_import()
+
+        self.ActiveStoreIndex.return_value.refresh.assert_called_once_with(
+            ['12345678000195', '11222333000181', '11444777000161']
+        )
+
+    def test_failed_upsert_keeps_active_index(self):
+        """Test a failed write leaves the previous active index alone."""
+        with mock.patch.object(
+            import_stores, 'copy_upsert', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.run_import()
+
+        self.ActiveStoreIndex.return_value.refresh.assert_not_called()
+
+
+class EcommStoresTests(PatchedConnectionTestCase):
+    """Test the streaming e-commerce status import."""
+
+    def run_import(self, rows):
+        iterator = mock.patch.object(
+            QuerySet, 'iterator', autospec=True, return_value=iter(rows)
+        )
+        invalidate = mock.patch.object(import_stores, 'invalidate_stores')
+        with iterator as patched_iterator, invalidate as patched_invalidate:
+            importer = EcommStores()
+            result, cursor = self.call_patched(importer.run_ecomm_stores)
+        return result, cursor, patched_iterator, patched_invalidate
+
+    def test_rows_stream_into_copy_upsert(self):
+        """Test rows are read in chunks, cleaned and copied in one pass."""
+        result, cursor, iterator, invalidate = self.run_import([
+            ('12.345.678/0001-95', True),
+            ('12345678000195', False),
+            ('11.222.333/0001-81', False),
+            ('123', True),
+        ])
+
+        (queryset,), kwargs = iterator.call_args
+        self.assertEqual(kwargs, {'chunk_size': 2000})
+        self.assertEqual(queryset.db, 'live_ecomm')
+        self.assertEqual(queryset.model.__name__, 'OurStores')
+        self.assertEqual(
+            cursor.copied, b'12345678000195\tt\n11222333000181\tf\n'
+        )
+        self.assertEqual(result, {
+            'copied': 2, 'written': 2, 'inserted': 2, 'updated': 0,
+            'rejected': 1,
+        })
+        invalidate.assert_called_once_with(
+            cnpjs={'12345678000195', '11222333000181'}
+        )
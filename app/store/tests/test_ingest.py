@@ -0,0 +1,386 @@
+"""
+Tests for the store social and address ingestion.
+"""
+import contextlib
+import io
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store import models
+from store.services import bulk_loader, ingest
+from store.tests.test_bulk_loader import FakeCursor
+
+INGEST_URL = reverse('store:ingest')
+
+LIVE_CNPJ = '11222333000181'
+DELETED_CNPJ = '11444777000161'
+
+
+class FakeLookup:
+    """StoreLookup answering from a dict and recording its batches."""
+
+    stores = {
+        LIVE_CNPJ: {'id': 1, 'cnpj': LIVE_CNPJ, 'deleted_at': None},
+        DELETED_CNPJ: {'id': 2, 'cnpj': DELETED_CNPJ, 'deleted_at': 'x'},
+    }
+
+    def __init__(self):
+        self.batches = []
+
+    def get_many(self, cnpjs):
+        cnpjs = list(cnpjs)
+        self.batches.append(cnpjs)
+        return {cnpj: self.stores.get(cnpj) for cnpj in cnpjs}
+
+
+class IngestTestCase(SimpleTestCase):
+    """Run ingestion with a fake lookup and a recording `copy_upsert`."""
+
+    def setUp(self):
+        self.loaded = []
+
+        def copy_upsert(model, rows, **kwargs):
+            rows = list(rows)
+            self.loaded.append((model, rows, kwargs))
+            return {'copied': len(rows), 'written': len(rows)}
+
+        patches = [
+            mock.patch.object(ingest, 'copy_upsert', side_effect=copy_upsert),
+            mock.patch.object(ingest, 'StoreLookup', FakeLookup),
+            mock.patch.object(ingest, 'bump_version'),
+            mock.patch.object(ingest, 'soft_delete_matching'),
+            mock.patch.object(
+                ingest.transaction, 'atomic',
+                lambda *args, **kwargs: contextlib.nullcontext()
+            ),
+        ]
+        self.copy_upsert, _, self.bump_version, self.soft_delete = [
+            p.start() for p in patches[:4]
+        ]
+        patches[4].start()
+        for patcher in patches:
+            self.addCleanup(patcher.stop)
+
+    def ingest(self, target, content, file_format='csv', chunk_size=100):
+        if isinstance(content, str):
+            content = content.encode()
+        return ingest.ingest_store_data(
+            target, io.BytesIO(content), file_format, chunk_size
+        )
+
+
+class StoreDataIngestTests(IngestTestCase):
+    """Test parsing, validation and loading."""
+
+    def test_csv_social(self):
+        """Test valid CSV rows are upserted on store_cnpj."""
+        result = self.ingest('social', (
+            'store_cnpj,email,working_days\n'
+            '11.222.333/0001-81,loja@example.com,"[""mon""]"\n'
+        ))
+
+        self.assertEqual(result['written'], 1)
+        self.assertEqual(result['error_count'], 0)
+        model, rows, kwargs = self.loaded[0]
+        self.assertIs(model, models.StoreSocial)
+        self.assertEqual(rows, [{
+            'email': 'loja@example.com', 'working_days': ['mon'],
+            'store_id': 1, 'store_cnpj': LIVE_CNPJ, 'deleted_at': None,
+        }])
+        self.assertEqual(kwargs['conflict_fields'], ['store_cnpj'])
+        self.assertEqual(
+            kwargs['fields'],
+            ['store', 'store_cnpj', 'email', 'working_days', 'deleted_at']
+        )
+        self.bump_version.assert_called_once()
+
+    def test_ndjson_addresses(self):
+        """Test NDJSON rows are upserted on the store id."""
+        result = self.ingest('addresses', (
+            '{"store_cnpj": "11222333000181", "city": "Curitiba", '
+            '"status": "true"}\n\n'
+        ), 'ndjson')
+
+        self.assertEqual(result['written'], 1)
+        model, rows, kwargs = self.loaded[0]
+        self.assertIs(model, models.StoreAdresses)
+        self.assertEqual(rows[0]['city'], 'Curitiba')
+        self.assertIs(rows[0]['status'], True)
+        self.assertEqual(kwargs['conflict_fields'], [])
+        self.soft_delete.assert_called_once_with(
+            models.StoreAdresses, 'store', {1}
+        )
+
+    def test_addresses_replaced_once_per_file(self):
+        """Test a store's addresses are replaced once, then appended."""
+        self.ingest('addresses', (
+            'store_cnpj,city\n'
+            '11222333000181,Curitiba\n'
+            '11222333000181,Londrina\n'
+            '11222333000181,Maringa\n'
+        ), chunk_size=2)
+
+        self.assertEqual(self.soft_delete.call_count, 1)
+        self.assertEqual(
+            [len(rows) for _, rows, _ in self.loaded], [2, 1]
+        )
+
+    def test_invalid_utf8_is_a_row_error(self):
+        """Test undecodable lines are reported and the rest is loaded."""
+        result = self.ingest('social', (
+            b'store_cnpj,name\n'
+            b'11222333000181,Loja \xe7\n'
+            b'11222333000181,Loja S\xc3\xa3o\n'
+        ))
+        self.assertEqual(result['written'], 1)
+        self.assertEqual(self.loaded[0][1][0]['name'], 'Loja São')
+        self.assertEqual(
+            result['errors'],
+            [{'line': 2, 'field': None, 'error': 'invalid UTF-8'}]
+        )
+
+        result = self.ingest('social', (
+            b'{"store_cnpj": "11222333000181", "name": "\xff"}\n'
+            b'{"store_cnpj": "11222333000181", "name": "ok"}\n'
+        ), 'ndjson')
+        self.assertEqual(result['written'], 1)
+        self.assertEqual(result['errors'][0]['line'], 1)
+
+    def test_row_errors_do_not_abort(self):
+        """Test every bad row is reported while the others are loaded."""
+        result = self.ingest('addresses', (
+            'store_cnpj,state,city\n'
+            '11222333000181,PR,Curitiba\n'
+            '123,SP,Campinas\n'
+            '99888777000166,SP,Santos\n'
+            '11444777000161,SC,Joinville\n'
+            '11222333000181,TOOLONG,Londrina\n'
+            '11222333000181,PR,Maringa,extra\n'
+        ))
+
+        self.assertEqual(result['received'], 6)
+        self.assertEqual(result['written'], 1)
+        self.assertEqual(
+            [(e['line'], e['field']) for e in result['errors']],
+            [(7, None), (3, 'store_cnpj'), (4, 'store_cnpj'),
+             (5, 'store_cnpj'), (6, 'state')]
+        )
+        self.assertEqual(result['errors'][2]['error'], 'unknown store')
+        self.assertEqual(result['errors'][3]['error'], 'store is deleted')
+
+    def test_invalid_json_line(self):
+        """Test a broken NDJSON line is reported with its number."""
+        result = self.ingest('social', (
+            '{"store_cnpj": "11222333000181", "email": "a@b.c"}\n'
+            '{"store_cnpj": \n'
+            '[1, 2]\n'
+        ), 'ndjson')
+
+        self.assertEqual(result['written'], 1)
+        self.assertEqual([e['line'] for e in result['errors']], [2, 3])
+
+    def test_chunks_share_one_lookup(self):
+        """Test each chunk resolves its CNPJs in one batch."""
+        with mock.patch.object(ingest, 'StoreLookup') as lookup:
+            lookup.return_value = FakeLookup()
+            self.ingest('social', 'store_cnpj,email\n' + (
+                '11222333000181,a@b.c\n' * 5
+            ), chunk_size=2)
+            batches = lookup.return_value.batches
+
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(len(self.loaded), 3)
+
+    def test_database_error_retries_row_by_row(self):
+        """Test a failed chunk is loaded again one row at a time."""
+        self.copy_upsert.side_effect = [
+            DatabaseError('boom'),
+            {'copied': 1, 'written': 1},
+            DatabaseError('bad row'),
+            {'copied': 1, 'written': 1},
+        ]
+        result = self.ingest('social', (
+            'store_cnpj,email\n11222333000181,a@b.c\n'
+            '11222333000181,d@e.f\n11222333000181,g@h.i\n'
+        ), chunk_size=2)
+
+        self.assertEqual(result['written'], 2)
+        self.assertEqual(result['errors'], [
+            {'line': 3, 'field': None, 'error': 'database error: bad row'},
+        ])
+        self.assertEqual(
+            [len(rows) for rows in (
+                call.args[1] for call in self.copy_upsert.call_args_list
+            )],
+            [2, 1, 1, 1]
+        )
+
+    def test_retried_addresses_replace_each_store_once(self):
+        """Test a store is replaced by its first row that loads."""
+        self.copy_upsert.side_effect = [
+            DatabaseError('boom'),
+            DatabaseError('bad row'),
+            {'copied': 1, 'written': 1},
+        ]
+        result = self.ingest('addresses', (
+            'store_cnpj,city\n11222333000181,X\n11222333000181,Curitiba\n'
+        ))
+
+        self.assertEqual(result['written'], 1)
+        self.assertEqual(self.soft_delete.call_count, 3)
+
+    def test_ndjson_keys_must_match_the_first_record(self):
+        """Test NDJSON records with other keys are rejected, not padded."""
+        result = self.ingest('social', (
+            '{"store_cnpj": "11222333000181", "email": "a@b.c"}\n'
+            '{"store_cnpj": "11222333000181", "email": "d@e.f", '
+            '"phone": "1"}\n'
+            '{"store_cnpj": "11222333000181"}\n'
+            '{"email": "g@h.i", "store_cnpj": "11222333000181"}\n'
+        ), 'ndjson')
+
+        self.assertEqual(result['received'], 4)
+        self.assertEqual(result['written'], 2)
+        self.assertEqual(
+            [(e['line'], e['error']) for e in result['errors']],
+            [(2, 'keys differ from the first record: unexpected phone'),
+             (3, 'keys differ from the first record: missing email')]
+        )
+        self.assertEqual(
+            [row['email'] for row in self.loaded[0][1]], ['a@b.c', 'g@h.i']
+        )
+
+    def test_unknown_columns(self):
+        """Test files with unexpected columns are rejected."""
+        with self.assertRaises(ValueError):
+            self.ingest('social', 'store_cnpj,bogus\n11222333000181,x\n')
+        with self.assertRaises(ValueError):
+            self.ingest('social', 'email\na@b.c\n')
+
+    def test_nothing_written_keeps_version(self):
+        """Test the stores version is only bumped after a write."""
+        self.ingest('social', 'store_cnpj,email\n123,a@b.c\n')
+        self.bump_version.assert_not_called()
+
+    def test_guess_format(self):
+        """Test formats are guessed from the file extension."""
+        self.assertEqual(ingest.guess_format('Social.CSV'), 'csv')
+        self.assertEqual(ingest.guess_format('a.jsonl'), 'ndjson')
+        self.assertIsNone(ingest.guess_format('a.xlsx'))
+
+
+class StoreDataIngestSqlTests(SimpleTestCase):
+    """Test the statements an ingestion sends to the database."""
+
+    def ingest_sql(self, target, content):
+        cursor = FakeCursor()
+        connection = mock.MagicMock()
+        connection.ops.quote_name = lambda name: f'"{name}"'
+        connection.cursor.return_value = cursor
+        atomic = mock.patch.object(
+            ingest.transaction, 'atomic',
+            lambda *args, **kwargs: contextlib.nullcontext()
+        )
+        with atomic, mock.patch.object(
+            bulk_loader, 'connections', {'default': connection}
+        ), mock.patch.object(ingest, 'StoreLookup', FakeLookup), \
+                mock.patch.object(ingest, 'bump_version'):
+            ingest.ingest_store_data(
+                target, io.BytesIO(content.encode()), 'csv'
+            )
+        return cursor.statements
+
+    def test_social_upserts_on_store_cnpj(self):
+        """Test social rows are merged on the unique store_cnpj."""
+        statements = self.ingest_sql(
+            'social', 'store_cnpj,email\n11222333000181,a@b.c\n'
+        )
+        self.assertIn(
+            'ON CONFLICT ("store_cnpj") DO UPDATE', statements[-1]
+        )
+
+    def test_addresses_replace_store_rows(self):
+        """Test addresses soft-delete the store's rows, then insert."""
+        statements = self.ingest_sql(
+            'addresses', 'store_cnpj,city\n11222333000181,Curitiba\n'
+        )
+        update, *_, insert = statements
+        self.assertEqual(
+            update,
+            'UPDATE "store_adresses" SET "deleted_at" = now() '
+            'WHERE "deleted_at" IS NULL AND "store_id" = ANY(%s)'
+        )
+        self.assertIn('INSERT INTO "store_adresses"', insert)
+        self.assertNotIn('ON CONFLICT', insert)
+
+
+class StoreIngestApiTests(IngestTestCase):
+    """Test the upload endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            SimpleNamespace(is_authenticated=True)
+        )
+
+    def upload(self, name, content, **data):
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post(
+            INGEST_URL, {'file': file, **data}, format='multipart'
+        )
+
+    def test_upload(self):
+        """Test an upload returns the counts and row errors."""
+        res = self.upload(
+            'social.csv', 'store_cnpj,email\n11222333000181,a@b.c\n1,x\n',
+            target='social'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['written'], 1)
+        self.assertEqual(res.data['errors'][0]['line'], 3)
+
+    def test_unknown_format(self):
+        """Test an upload whose format cannot be guessed is rejected."""
+        res = self.upload('social.txt', 'store_cnpj\n', target='social')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bad_columns(self):
+        """Test an upload with unknown columns is rejected."""
+        res = self.upload(
+            'a.ndjson', '{"store_cnpj": "1", "bogus": 1}\n',
+            target='addresses'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bogus', str(res.data['file']))
+
+
+class IngestCommandTests(IngestTestCase):
+    """Test the ingest_store_data command."""
+
+    def test_command(self):
+        """Test the command loads a file and prints its errors."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'addresses.csv')
+            with open(path, 'w') as file:
+                file.write('store_cnpj,city\n11222333000181,Curitiba\n1,x\n')
+            out, err = io.StringIO(), io.StringIO()
+            call_command(
+                'ingest_store_data', path, '--target=addresses',
+                stdout=out, stderr=err
+            )
+
+        self.assertIn('1 written, 1 errors', out.getvalue())
+        self.assertIn('line 3: store_cnpj', err.getvalue())
@@ -0,0 +1,86 @@
+"""
+Tests for the cached store lookup.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from store import models, signals
+from store.services.lookup import StoreLookup, invalidate_stores
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+ROWS = [
+    {'id': 1, 'cnpj': '11222333000181', 'cigam_id': '10', 'status': True},
+    {'id': 2, 'cnpj': '11444777000161', 'cigam_id': '20', 'status': False},
+]
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StoreLookupTests(SimpleTestCase):
+    """Test batched read-through lookups."""
+
+    def setUp(self):
+        cache.clear()
+        self.rows = list(ROWS)
+        self.lookup = StoreLookup()
+        patcher = mock.patch.object(
+            StoreLookup, '_query', autospec=True, side_effect=self.query
+        )
+        self.query_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def query(self, lookup, field, values):
+        return [dict(row) for row in self.rows if row[field] in values]
+
+    def test_misses_resolved_with_one_query(self):
+        """Test a cold batch issues one query and a warm batch none."""
+        cnpjs = ['11222333000181', '11444777000161', '99999999000191']
+
+        first = self.lookup.get_many(cnpjs)
+        second = self.lookup.get_many(cnpjs)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['11222333000181']['id'], 1)
+        self.assertIsNone(first['99999999000191'])
+        self.assertEqual(self.query_mock.call_count, 1)
+
+    def test_cigam_id_lookup_reuses_cnpj_entries(self):
+        """Test Cigam ids resolve through cached CNPJ records."""
+        self.lookup.get_many(['11222333000181'])
+        self.query_mock.reset_mock()
+
+        self.lookup.get_many_by_cigam_id([10, 30])
+        result = self.lookup.get_many_by_cigam_id(['10', '30'])
+
+        self.assertEqual(result['10']['cnpj'], '11222333000181')
+        self.assertIsNone(result['30'])
+        self.assertEqual(self.query_mock.call_count, 1)
+
+    def test_invalidate_drops_negative_entries(self):
+        """Test a store inserted after a miss is found once invalidated."""
+        self.assertIsNone(self.lookup.get('99999999000191'))
+        self.rows.append(
+            {'id': 3, 'cnpj': '99999999000191', 'cigam_id': '30'}
+        )
+        self.assertIsNone(self.lookup.get('99999999000191'))
+
+        invalidate_stores(cnpjs=['99999999000191'])
+
+        self.assertEqual(self.lookup.get('99999999000191')['id'], 3)
+
+    def test_save_signal_invalidates(self):
+        """Test saving a store drops its cached entries."""
+        self.lookup.get('11222333000181')
+        self.rows[0] = dict(self.rows[0], status=False)
+
+        signals.stores_changed(
+            sender=models.Stores,
+            instance=models.Stores(cnpj='11222333000181', cigam_id='10')
+        )
+
+        self.assertFalse(self.lookup.get('11222333000181')['status'])
+        self.assertFalse(self.lookup.get_by_cigam_id('10')['status'])
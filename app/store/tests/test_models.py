@@ -0,0 +1,27 @@
+"""
+Tests for the store model managers.
+"""
+from django.test import SimpleTestCase
+
+from store import models
+
+
+class SoftDeleteManagerTests(SimpleTestCase):
+    """Test soft-deleted rows are hidden by default."""
+
+    def test_objects_excludes_deleted(self):
+        """Test the default manager filters on deleted_at IS NULL."""
+        for model in (models.Stores, models.StoreSocial,
+                      models.StoreAdresses, models.Franchises):
+            sql = str(model.objects.all().query)
+            self.assertIn('"deleted_at" IS NULL', sql, model.__name__)
+            self.assertIs(model._default_manager, model.objects)
+
+    def test_all_objects_includes_deleted(self):
+        """Test all_objects sees every row and can select deleted ones."""
+        sql = str(models.Stores.all_objects.all().query)
+        self.assertNotIn('deleted_at" IS', sql)
+        self.assertIn(
+            '"deleted_at" IS NOT NULL',
+            str(models.Stores.all_objects.deleted().query)
+        )
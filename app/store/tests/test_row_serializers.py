@@ -0,0 +1,150 @@
+"""
+Tests for the compiled row serializers.
+"""
+import datetime
+import decimal
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from rest_framework import serializers
+
+from store import models
+from store.row_serializers import RowSerializer, format_datetime
+from store.serializers import (
+    StoreAdressesSerializer,
+    StoreSerializer,
+    StoreSocialSerializer,
+    store_address_rows,
+    store_rows,
+    store_social_rows,
+)
+
+UPDATED_AT = datetime.datetime(
+    2024, 1, 2, 3, 4, 5, 678, tzinfo=ZoneInfo('UTC')
+)
+
+
+def make(model, **values):
+    """Unsaved instance as read back from the database."""
+    values = {
+        'status': None, 'created_at': None, 'updated_at': None, **values
+    }
+    return model(**values)
+
+
+def as_row(instance, row_serializer):
+    """The values_list() tuple the database would return for `instance`."""
+    return tuple(
+        getattr(instance, instance._meta.get_field(lookup).attname)
+        for lookup in row_serializer.lookups
+    )
+
+
+class RowSerializerParityTests(SimpleTestCase):
+    """Test rows serialize exactly like the model serializers."""
+
+    def assertParity(self, serializer_class, row_serializer, instances):
+        expected = serializer_class(instances, many=True).data
+        rows = [as_row(instance, row_serializer) for instance in instances]
+        self.assertEqual(
+            row_serializer.many(rows), [dict(item) for item in expected]
+        )
+
+    def test_stores(self):
+        """Test stores, with dates, datetimes and nulls."""
+        self.assertParity(StoreSerializer, store_rows, [
+            make(
+                models.Stores, id=1, cnpj='11222333000181', cigam_id='7',
+                name='Centro',
+                franchise_id=3, status=True,
+                inaugurated_at=datetime.date(2020, 5, 1),
+                created_at=UPDATED_AT, updated_at=UPDATED_AT,
+            ),
+            make(models.Stores, id=2, cnpj='11444777000161'),
+        ])
+
+    def test_store_social(self):
+        """Test social rows, with the store key and JSON fields."""
+        self.assertParity(StoreSocialSerializer, store_social_rows, [
+            make(
+                models.StoreSocial, id=1, store_id=4,
+                store_cnpj='11222333000181', status=False,
+                email='loja@example.com', working_days=['mon', 'tue'],
+                working_hours={'mon': '09-18'}, updated_at=UPDATED_AT,
+            ),
+        ])
+
+    def test_store_addresses(self):
+        """Test address rows."""
+        self.assertParity(StoreAdressesSerializer, store_address_rows, [
+            make(
+                models.StoreAdresses, id=1, store_id=4,
+                store_cnpj='11222333000181', city='Curitiba',
+                lat='-25.43', lng='-49.27', created_at=UPDATED_AT,
+            ),
+        ])
+
+    def test_lookups_follow_field_order(self):
+        """Test the values_list lookups match the serializer fields."""
+        self.assertEqual(store_rows.lookups, StoreSerializer.Meta.fields)
+        self.assertEqual(store_social_rows.lookups[1], 'store')
+
+    def test_values_list_returns_named_rows(self):
+        """Test querysets are turned into named tuples for pagination."""
+        queryset = store_rows.values_list(models.Stores.objects.all())
+        self.assertEqual(list(queryset._fields), store_rows.lookups)
+
+
+class RowSerializerFieldTests(SimpleTestCase):
+    """Test the field handling of the compiled functions."""
+
+    def test_datetime_timezones(self):
+        """Test datetimes use the current time zone like DRF."""
+        self.assertEqual(
+            format_datetime(UPDATED_AT, ZoneInfo('America/Sao_Paulo')),
+            '2024-01-02T00:04:05.000678-03:00'
+        )
+        with timezone.override('UTC'):
+            row = store_rows.to_dict((1,) + (None,) * 8 + (UPDATED_AT,))
+        self.assertEqual(row['updated_at'], '2024-01-02T03:04:05.000678Z')
+
+    @override_settings(USE_TZ=False)
+    def test_datetime_without_time_zones(self):
+        """Test aware datetimes become naive UTC when USE_TZ is off."""
+        self.assertEqual(
+            format_datetime(UPDATED_AT, None), '2024-01-02T03:04:05.000678'
+        )
+
+    def test_other_fields_fall_back(self):
+        """Test fields that are not inlined use their to_representation."""
+        class PriceSerializer(serializers.Serializer):
+            price = serializers.DecimalField(max_digits=5, decimal_places=2)
+            kind = serializers.ChoiceField(choices=['a', 'b'])
+
+        rows = RowSerializer(PriceSerializer)
+        self.assertEqual(
+            rows.many([(decimal.Decimal('1.5'), 'a'), (None, None)]),
+            [{'price': '1.50', 'kind': 'a'}, {'price': None, 'kind': None}]
+        )
+
+    def test_source_star_is_rejected(self):
+        """Test fields reading the whole object cannot be compiled."""
+        class MethodSerializer(serializers.Serializer):
+            label = serializers.SerializerMethodField()
+
+        with self.assertRaises(ValueError):
+            RowSerializer(MethodSerializer).many([])
+
+
+class RowSerializerBenchmarkTests(SimpleTestCase):
+    """Test the serializers benchmark."""
+
+    def test_benchmark_command(self):
+        """Test the benchmark compares both paths on matching output."""
+        out = StringIO()
+        call_command('benchmark', target='serializers', size=200, stdout=out)
+        self.assertIn('Outputs match', out.getvalue())
@@ -0,0 +1,161 @@
+"""
+Tests for the store search.
+"""
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.services.versions import bump_version
+from store.services import search
+from store.services.lookup import STORE_ROWS_VERSION, STORES_VERSION
+from store.services.search import SearchEntry, StoreSearchIndex, normalize
+
+SEARCH_URL = reverse('store:search')
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+ENTRIES = [
+    SearchEntry(1, '11222333000181', 'Live! São Paulo Centro', True, 1),
+    SearchEntry(2, '11444777000161', 'Live! Curitiba Batel', True, 2),
+    SearchEntry(3, '22333444000155', 'Outlet São José', False, None),
+    SearchEntry(4, '33444555000166', None, True, None),
+]
+
+
+class StoreSearchIndexTests(SimpleTestCase):
+    """Test prefix, CNPJ and fuzzy search."""
+
+    def setUp(self):
+        self.index = StoreSearchIndex(ENTRIES)
+
+    def ids(self, results):
+        return [result.entry.id for result in results]
+
+    def test_normalize(self):
+        """Test accents and punctuation are folded."""
+        self.assertEqual(normalize('Live! São  José'), 'live sao jose')
+
+    def test_prefix_search(self):
+        """Test every query word must prefix a name word."""
+        self.assertEqual(self.ids(self.index.search_prefix('sao', 10)), [1, 3])
+        self.assertEqual(
+            self.ids(self.index.search_prefix('live cur', 10)), [2]
+        )
+        self.assertEqual(self.ids(self.index.search_prefix('xyz', 10)), [])
+
+    def test_cnpj_fragment(self):
+        """Test formatted CNPJ fragments match anywhere in the CNPJ."""
+        self.assertEqual(self.ids(self.index.search('11.222.3')), [1])
+        self.assertEqual(self.ids(self.index.search('0001-6')), [2, 4])
+        self.assertEqual(self.ids(self.index.search('11')), [])
+
+    def test_fuzzy_fallback(self):
+        """Test typos are matched by trigram similarity."""
+        results = self.index.search('curitba batel')
+
+        self.assertEqual(self.ids(results), [2])
+        self.assertEqual(results[0].match, 'fuzzy')
+
+    def test_typo_in_one_word_of_a_longer_name(self):
+        """Test a one-word typo finds a store with a multi-word name."""
+        index = StoreSearchIndex(ENTRIES + [
+            SearchEntry(5, '44555666000177',
+                        'Pizzaria Bella Napoli Centro', True, None),
+            SearchEntry(6, '55666777000188',
+                        'Loja Boticario Shopping Iguatemi', True, None),
+        ])
+
+        self.assertEqual(self.ids(index.search_fuzzy('pizaria', 10)), [5])
+        self.assertEqual(self.ids(index.search('boticaro')), [6])
+        self.assertEqual(self.ids(index.search_fuzzy('xyzzy', 10)), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SearchIndexRefreshTests(SimpleTestCase):
+    """Test the process-wide index is rebuilt in the background."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(
+            search, 'build_index',
+            side_effect=lambda: StoreSearchIndex(ENTRIES)
+        )
+        self.build_index = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, search, '_index', None)
+        search._index = None
+        search._state.update(version=None, rebuilding=False)
+
+    def test_store_write_rebuilds_in_background(self):
+        """Test a store write serves the old index until the new one."""
+        first = search.get_search_index()
+        self.assertIs(search.get_search_index(), first)
+
+        started = []
+        with mock.patch.object(search.threading, 'Thread') as thread:
+            thread.return_value.start.side_effect = lambda: started.append(1)
+            bump_version(STORE_ROWS_VERSION)
+            self.assertIs(search.get_search_index(), first)
+            self.assertIs(search.get_search_index(), first)
+        self.assertEqual(len(started), 1)
+
+        with mock.patch.object(search.connection, 'close'):
+            search._rebuild(*thread.call_args.kwargs['args'])
+        self.assertIsNot(search.get_search_index(), first)
+        self.assertEqual(self.build_index.call_count, 2)
+
+    def test_detail_writes_do_not_rebuild(self):
+        """Test social/address writes leave the search index alone."""
+        first = search.get_search_index()
+        bump_version(STORES_VERSION)
+        self.assertIs(search.get_search_index(), first)
+        self.assertEqual(self.build_index.call_count, 1)
+
+
+class StoreSearchApiTests(SimpleTestCase):
+    """Test the search endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            SimpleNamespace(is_authenticated=True)
+        )
+        patcher = mock.patch.object(
+            search, 'get_search_index',
+            return_value=StoreSearchIndex(ENTRIES)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search(self):
+        """Test results carry the store and how it matched."""
+        res = self.client.get(SEARCH_URL, {'q': 'batel'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['id'], 2)
+        self.assertEqual(res.data[0]['match'], 'prefix')
+
+    def test_query_required(self):
+        """Test an empty query is rejected."""
+        res = self.client.get(SEARCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchBenchmarkTests(SimpleTestCase):
+    """Test the search benchmark."""
+
+    def test_benchmark_command(self):
+        """Test the benchmark times every query shape."""
+        out = StringIO()
+        call_command('benchmark', target='search', size=500, stdout=out)
+        self.assertIn('one-word typo', out.getvalue())
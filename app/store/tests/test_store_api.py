@@ -0,0 +1,221 @@
+"""
+Tests for the store list API.
+"""
+import datetime
+import operator
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models.query import QuerySet
+from django.db.models.sql.where import AND, WhereNode
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from core.services.versions import bump_version
+from store import models
+from store.serializers import StoreSerializer
+from store.services.lookup import STORES_VERSION
+from store.views import StoreCursorPagination, StoreListView
+
+STORES_URL = reverse('store:list')
+
+LOCMEM_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+LOOKUPS = {
+    'exact': operator.eq,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'isnull': lambda value, isnull: (value is None) == isnull,
+    'in': lambda value, values: value in values,
+}
+
+
+def matches(node, instance):
+    """Evaluate a compiled WHERE tree against a model instance."""
+    if isinstance(node, WhereNode):
+        results = [matches(child, instance) for child in node.children]
+        matched = all(results) if node.connector == AND else any(results)
+        return matched != node.negated
+    value = getattr(instance, node.lhs.target.attname)
+    return LOOKUPS[node.lookup_name](value, node.rhs)
+
+
+def fetch_from(instances, fetches):
+    """`QuerySet._fetch_all` reading values_list() rows from `instances`."""
+    def fetch_all(queryset):
+        if queryset._result_cache is not None:
+            return
+        fetches.append(queryset)
+        query = queryset.query
+        found = [i for i in instances if matches(query.where, i)]
+        for ordering in reversed(query.order_by):
+            found.sort(
+                key=operator.attrgetter(ordering.lstrip('-')),
+                reverse=ordering.startswith('-'),
+            )
+        found = found[query.low_mark:query.high_mark]
+        row = namedtuple('Row', query.values_select)
+        queryset._result_cache = [
+            row(*(getattr(i, name) for name in query.values_select))
+            for i in found
+        ]
+        queryset._prefetch_done = True
+    return fetch_all
+
+
+def filtered_sql(**params):
+    """SQL of the list queryset for the given query parameters."""
+    request = APIView().initialize_request(
+        APIRequestFactory().get(STORES_URL, params)
+    )
+    view = StoreListView(request=request)
+    return str(view.get_queryset().query)
+
+
+class StoreListFilterTests(SimpleTestCase):
+    """Test the list filters."""
+
+    def test_filters(self):
+        """Test status, franchise and cnpj filters."""
+        sql = filtered_sql(
+            status='true', franchise='3', cnpj='11.222.333/0001-81'
+        )
+        self.assertIn('"stores"."status"', sql)
+        self.assertIn('"stores"."franchise_id" = 3', sql)
+        self.assertIn('11222333000181', sql)
+        self.assertIn('"stores"."deleted_at" IS NULL', sql)
+
+    def test_updated_since(self):
+        """Test updated_since keeps the stores changed from that moment."""
+        sql = filtered_sql(updated_since='2024-05-01T12:00:00Z')
+        self.assertIn('"stores"."updated_at" >= 2024-05-01 12:00:00', sql)
+
+    def test_invalid_filters(self):
+        """Test invalid filter values are rejected."""
+        for params in ({'status': 'maybe'}, {'franchise': 'x'},
+                       {'cnpj': '123'}, {'updated_since': 'yesterday'},
+                       {'updated_since': '2024-13-01T00:00:00'}):
+            with self.assertRaises(ValidationError):
+                filtered_sql(**params)
+
+    def test_orderings_are_unique_keys(self):
+        """Test only id orderings are accepted by the cursor."""
+        paginator = StoreCursorPagination()
+        for value, expected in (('id', ('id',)), ('-id', ('-id',))):
+            request = APIView().initialize_request(
+                APIRequestFactory().get(STORES_URL, {'ordering': value})
+            )
+            self.assertEqual(
+                paginator.get_ordering(request, None, None), expected
+            )
+
+        request = APIView().initialize_request(
+            APIRequestFactory().get(STORES_URL, {'ordering': 'updated_at'})
+        )
+        with self.assertRaises(ValidationError):
+            paginator.get_ordering(request, None, None)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StoreListApiTests(SimpleTestCase):
+    """Test the store list endpoint against an in-memory stores table."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            SimpleNamespace(is_authenticated=True)
+        )
+        now = timezone.now()
+        self.stores = [
+            models.Stores(
+                id=i, cnpj=f'{i:014d}', cigam_id=str(i), name=f'Loja {i}',
+                franchise_id=i % 2, status=i % 2 == 0,
+                inaugurated_at=datetime.date(2020, 1, i),
+                created_at=now, updated_at=now,
+                deleted_at=now if i in (2, 5) else None,
+            )
+            for i in range(1, 8)
+        ]
+        self.fetches = []
+        patcher = mock.patch.object(
+            QuerySet, '_fetch_all', fetch_from(self.stores, self.fetches)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_soft_deleted_stores_are_hidden(self):
+        """Test the list serializes the live stores like StoreSerializer."""
+        res = self.client.get(STORES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        live = [store for store in self.stores if store.deleted_at is None]
+        self.assertEqual(
+            res.json()['results'],
+            [dict(item) for item in StoreSerializer(live, many=True).data]
+        )
+        self.assertEqual(
+            [store['id'] for store in res.json()['results']], [1, 3, 4, 6, 7]
+        )
+
+    def test_cursors_walk_every_page(self):
+        """Test next and previous cursors page through the live stores."""
+        pages = []
+        url = f'{STORES_URL}?page_size=2'
+        while url:
+            body = self.client.get(url).json()
+            pages.append([store['id'] for store in body['results']])
+            url = body['next']
+        self.assertEqual(pages, [[1, 3], [4, 6], [7]])
+
+        body = self.client.get(body['previous']).json()
+        self.assertEqual([store['id'] for store in body['results']], [4, 6])
+
+        res = self.client.get(STORES_URL, {'ordering': '-id', 'page_size': 2})
+        self.assertEqual(
+            [store['id'] for store in res.json()['results']], [7, 6]
+        )
+
+    def test_filters_apply_to_the_page(self):
+        """Test list filters narrow the rows read."""
+        res = self.client.get(STORES_URL, {'franchise': '1'})
+        self.assertEqual(
+            [store['id'] for store in res.json()['results']], [1, 3, 7]
+        )
+
+    def test_pages_are_cached(self):
+        """Test an identical request is served from the cache."""
+        first = self.client.get(STORES_URL, {'status': 'true'})
+        second = self.client.get(STORES_URL, {'status': 'true'})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(self.fetches), 1)
+
+        self.client.get(STORES_URL, {'status': 'false'})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_version_bump_invalidates(self):
+        """Test a store write makes the next request hit the database."""
+        self.client.get(STORES_URL)
+        bump_version(STORES_VERSION)
+        self.client.get(STORES_URL)
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_auth_required(self):
+        """Test authentication is required."""
+        res = APIClient().get(STORES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
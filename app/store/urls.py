@@ -0,0 +1,17 @@
+"""
+URL mappings for the store API.
+"""
+from django.urls import path
+
+from store import views
+
+
+app_name = 'store'
+
+urlpatterns = [
+    path('', views.StoreListView.as_view(), name='list'),
+    path('nearest/', views.NearestStoreView.as_view(), name='nearest'),
+    path('search/', views.StoreSearchView.as_view(), name='search'),
+    path('export/', views.StoreExportView.as_view(), name='export'),
+    path('ingest/', views.StoreIngestView.as_view(), name='ingest'),
+]
@@ -1,3 +1,282 @@
-from django.shortcuts import render
+"""
+Views for the store API.
+"""
+import hashlib
 
-# Create your views here.
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import authentication, generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.services.documents import CNPJ, clean_document
+from core.services.versions import get_version
+from store import models
+from store.serializers import (
+    NearestStoreQuerySerializer,
+    NearestStoreSerializer,
+    StoreExportQuerySerializer,
+    StoreIngestResultSerializer,
+    StoreIngestSerializer,
+    StoreSearchQuerySerializer,
+    StoreSearchResultSerializer,
+    StoreSerializer,
+    store_rows,
+)
+from store.services import export
+from store.services.geo import nearest_stores
+from store.services.ingest import guess_format, ingest_store_data
+from store.services.lookup import STORES_VERSION
+from store.services.search import search_stores
+
+# Seconds a rendered store list page stays cached.
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+
+class StoreCursorPagination(CursorPagination):
+    """Keyset pagination on `id`, without COUNT(*).
+
+    The cursor only holds the first ordering column, so it must be unique and
+    immutable: updated_at is neither (an import stamps every row it writes
+    with the same value), so clients syncing changes filter on
+    `updated_since` instead of ordering by it.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    orderings = {
+        'id': ('id',),
+        '-id': ('-id',),
+    }
+    ordering = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get('ordering', self.ordering)
+        if value not in self.orderings:
+            raise ValidationError(
+                {'ordering': f"Must be one of {', '.join(self.orderings)}"}
+            )
+        return self.orderings[value]
+
+
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+@extend_schema(parameters=[
+    OpenApiParameter('status', OpenApiTypes.BOOL),
+    OpenApiParameter('franchise', OpenApiTypes.INT),
+    OpenApiParameter('cnpj', OpenApiTypes.STR),
+    OpenApiParameter('updated_since', OpenApiTypes.DATETIME),
+    OpenApiParameter(
+        'ordering', OpenApiTypes.STR,
+        enum=list(StoreCursorPagination.orderings)
+    ),
+])
+class StoreListView(generics.ListAPIView):
+    """List the active stores.
+
+    Rendered JSON pages are cached under the `stores` version, which every
+    store write bumps, so stable data is served without touching the
+    database.
+    """
+    serializer_class = StoreSerializer
+    pagination_class = StoreCursorPagination
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Filter stores by status, franchise, cnpj and updated_since."""
+        params = self.request.query_params
+        queryset = models.Stores.objects.all()
+
+        if 'status' in params:
+            value = _BOOLEANS.get(params['status'].lower())
+            if value is None:
+                raise ValidationError({'status': 'Must be true or false'})
+            queryset = queryset.filter(status=value)
+
+        if 'franchise' in params:
+            if not params['franchise'].isdigit():
+                raise ValidationError({'franchise': 'Must be an integer'})
+            queryset = queryset.filter(franchise_id=int(params['franchise']))
+
+        if 'cnpj' in params:
+            cnpj, reason = clean_document(
+                params['cnpj'], kinds=(CNPJ,), check_digits=False
+            )
+            if reason:
+                raise ValidationError({'cnpj': reason})
+            queryset = queryset.filter(cnpj=cnpj)
+
+        if 'updated_since' in params:
+            try:
+                since = parse_datetime(params['updated_since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError(
+                    {'updated_since': 'Must be an ISO 8601 datetime'}
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            queryset = queryset.filter(updated_at__gte=since)
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Serialize the page from row tuples, see `store_rows`."""
+        queryset = store_rows.values_list(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(store_rows.many(page))
+
+    def _cache_key(self, request):
+        query = '&'.join(sorted(
+            f"{key}={value}" for key, values in request.query_params.lists()
+            for value in values
+        ))
+        digest = hashlib.sha1(
+            f"{request.get_host()}?{query}".encode()
+        ).hexdigest()
+        version = get_version(STORES_VERSION)
+        return f"store:list:v{version}:{digest}"
+
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        key = self._cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().get(request, *args, **kwargs)
+
+        def store(rendered):
+            if rendered.status_code != 200:
+                return
+            cache.set(
+                key, (rendered.content, rendered['Content-Type']),
+                timeout=PAGE_CACHE_TIMEOUT
+            )
+
+        response.add_post_render_callback(store)
+        return response
+
+
+class NearestStoreView(APIView):
+    """List the active stores closest to a point."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        parameters=[NearestStoreQuerySerializer],
+        responses=NearestStoreSerializer(many=True),
+    )
+    def get(self, request):
+        query = NearestStoreQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        results = nearest_stores(
+            params['lat'], params['lng'], params['k'], params['radius']
+        )
+        return Response([
+            {
+                'store_id': point.store_id,
+                'cnpj': point.cnpj,
+                'name': point.name,
+                'city': point.city,
+                'state': point.state,
+                'lat': point.lat,
+                'lng': point.lng,
+                'distance_km': round(distance, 3),
+            }
+            for distance, point in results
+        ])
+
+
+class StoreSearchView(APIView):
+    """Search live stores by name prefix, fuzzy name or CNPJ fragment."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        parameters=[StoreSearchQuerySerializer],
+        responses=StoreSearchResultSerializer(many=True),
+    )
+    def get(self, request):
+        query = StoreSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        return Response([
+            {
+                **result.entry._asdict(),
+                'match': result.match,
+                'score': result.score,
+            }
+            for result in search_stores(params['q'], params['limit'])
+        ])
+
+
+class StoreExportView(APIView):
+    """Stream every active store with its social and address data."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        parameters=[StoreExportQuerySerializer],
+        responses={(200, 'text/csv'): OpenApiTypes.BINARY},
+    )
+    def get(self, request):
+        query = StoreExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        file_format = query.validated_data['file_format']
+        compress = query.validated_data['gzip']
+
+        response = StreamingHttpResponse(
+            export.export_stores(file_format, compress),
+            content_type=export.content_type(file_format, compress),
+        )
+        filename = export.export_filename(file_format, compress)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class StoreIngestView(APIView):
+    """Upsert store social or address rows from a CSV or NDJSON file."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request={'multipart/form-data': StoreIngestSerializer},
+        responses=StoreIngestResultSerializer,
+    )
+    def post(self, request):
+        upload = StoreIngestSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        params = upload.validated_data
+
+        file = params['file']
+        file_format = params.get('file_format') or guess_format(file.name)
+        if file_format is None:
+            raise ValidationError(
+                {'file_format': 'Could not be guessed from the file name'}
+            )
+
+        try:
+            result = ingest_store_data(params['target'], file, file_format)
+        except ValueError as e:
+            raise ValidationError({'file': str(e)})
+        return Response(result)
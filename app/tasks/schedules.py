@@ -22,4 +22,10 @@ CELERY_BEAT_SCHEDULE = {
         "options": COMMON_OPTIONS,
     }
     for task in TASKS
-}
\ No newline at end of file
+}
+
+CELERY_BEAT_SCHEDULE["refresh_cigam_token"] = {
+    "task": "tasks.tasks.refresh_cigam_token",
+    "schedule": crontab(minute="*/2"),
+    "options": {"expires": 60},
+}
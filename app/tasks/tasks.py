@@ -3,6 +3,8 @@ from celery import shared_task
 from django.core.management import call_command
 import logging
 
+from core.services.cigam_client import CigamClient
+
 logger = logging.getLogger(__name__)
 
 # @shared_task
@@ -15,4 +17,9 @@ logger = logging.getLogger(__name__)
 
 # @shared_task
 # def run_cigam_employees():
-#     call_command("call_cigam", type="employees")
\ No newline at end of file
+#     call_command("call_cigam", type="employees")
+
+@shared_task
+def refresh_cigam_token():
+    """Renew the Cigam token before `expiraEm` so requests never wait on it."""
+    CigamClient().refresh_token()